@@ -1,7 +1,19 @@
 """
 PlugPep: A protein binder design pipeline.
 """
+import logging
+
 from .config import AgentConfig
-from .agent_graph import AgentState
 
 __version__ = "0.1.0"
+
+def __getattr__(name):
+    # AgentState is imported on first use, so light commands such as
+    # "plugpep submit" do not load the workflow tools and their dependencies
+    if name == "AgentState":
+        from .agent_graph import AgentState
+        return AgentState
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Stay silent unless the application configures logging, e.g. through AgentConfig
+logging.getLogger(__name__).addHandler(logging.NullHandler())
@@ -17,9 +17,9 @@ import re
 # Import actual tool implementations
 from plugpep.tools.alphafold_retrieve import fetch_alphafold_files
 from plugpep.tools.extract_backbone import extract_backbone as extract_backbone_fn
+from plugpep.tools.pocket_detection import detect_pockets
+from plugpep.serialization import dump, load
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Define state types
@@ -95,9 +95,13 @@ def initialize_state(query: str) -> AgentState:
         "output": {}
     }
 
+def workflow_root() -> str:
+    """Directory holding workflow directories, from PLUGPEP_WORKFLOW_ROOT; defaults to the working directory."""
+    return os.getenv("PLUGPEP_WORKFLOW_ROOT") or os.getcwd()
+
 def create_workflow_directory(workflow_id: str) -> str:
     """Create a directory for the workflow."""
-    workflow_dir = os.path.join(os.getcwd(), workflow_id)
+    workflow_dir = os.path.join(workflow_root(), workflow_id)
     os.makedirs(workflow_dir, exist_ok=True)
     return workflow_dir
 
@@ -125,13 +129,25 @@ def llm_planning(state: AgentState) -> AgentState:
 def fpocket(state: AgentState) -> AgentState:
     """Execute FPocket step."""
     try:
-        # Implementation of FPocket
+        alphafold_step = state["steps"].get("alphafold_retrieve", {})
+        pdb_path = (alphafold_step.get("output") or {}).get("pdb_path") or alphafold_step.get("output_path")
+        if not pdb_path:
+            raise ValueError("No structure available from alphafold_retrieve")
+
+        result = detect_pockets(pdb_path)
+        if not result["success"]:
+            raise RuntimeError(result["error"])
+
+        # Imported here, since the node utilities import this module
+        from plugpep.nodes.utils import save_json_result
+        output_path = save_json_result(state["workflow_dir"], "pockets", result, filename="pockets.json")
+
         state["steps"]["fpocket"] = {
             "success": True,
             "error": None,
             "status": "completed",
-            "input_path": None,
-            "output_path": None
+            "input_path": pdb_path,
+            "output_path": output_path
         }
     except Exception as e:
         state["steps"]["fpocket"] = {
@@ -228,12 +244,18 @@ def agent_orchestrator(state: AgentState) -> AgentState:
 
     return state
 
-def save_state(state: AgentState, file_path: str) -> None:
-    """Save the workflow state to a file."""
-    with open(file_path, "w") as f:
-        json.dump(state, f, indent=2, cls=DateTimeEncoder)
+def save_state(state: AgentState, file_path: str, format: Optional[str] = None, pretty: Optional[bool] = None) -> None:
+    """Save the workflow state to a file.
+
+    Args:
+        state: Workflow state
+        file_path: Output file path
+        format: "orjson", "msgpack" or "json"; None to choose by suffix or
+            PLUGPEP_STATE_FORMAT, see plugpep.serialization
+        pretty: Indent JSON output; None for PLUGPEP_PRETTY_JSON
+    """
+    dump(state, file_path, format=format, pretty=pretty)
 
 def load_state(file_path: str) -> AgentState:
-    """Load the workflow state from a file."""
-    with open(file_path, "r") as f:
-        return json.load(f)
+    """Load the workflow state from a file written in any supported format."""
+    return load(file_path)
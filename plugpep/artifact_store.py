@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Artifact Store for Protein Binder Design Pipeline
+
+Artifacts such as AlphaFold models and extracted backbones are stored once,
+as blobs named by the SHA-256 digest of their content. Workflow directories
+hold hardlinks to the blobs, or reflinks or copies when hardlinks are not
+possible, so thousands of runs on the same targets share one copy of each
+file. Blobs are made read-only, since every link shares their content.
+
+Named references map stable names, e.g. AlphaFold file names, to digests, so
+a file that is already stored can be linked into a new workflow instead of
+being downloaded again.
+
+The store is configured from environment variables:
+    PLUGPEP_ARTIFACT_STORE: store directory, or "0", "false" or "off" to disable it
+"""
+
+import os
+import uuid
+import errno
+import shutil
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Default store location, overridable with PLUGPEP_ARTIFACT_STORE
+DEFAULT_STORE_PATH = os.path.join(Path.home(), ".cache", "plugpep", "artifacts")
+
+# Bytes read at a time while hashing
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Linux ioctl that clones a file's extents (reflink) on btrfs, XFS and similar
+FICLONE = 0x40049409
+
+def file_digest(path: str) -> str:
+    """Hex SHA-256 digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _reflink(source: str, dest: str) -> bool:
+    """Clone a file with a reflink. Returns False where unsupported."""
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(source, "rb") as src, open(dest, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return True
+    except OSError:
+        if os.path.exists(dest):
+            os.remove(dest)
+        return False
+
+def link_or_copy(source: str, dest: str) -> str:
+    """Make dest share source's content: hardlink, else reflink, else copy.
+
+    dest is replaced atomically if it exists.
+
+    Returns:
+        "hardlink", "reflink" or "copy"
+    """
+    tmp_path = os.path.join(os.path.dirname(os.path.abspath(dest)), f".{os.path.basename(dest)}.{uuid.uuid4().hex[:12]}.tmp")
+    try:
+        try:
+            os.link(source, tmp_path)
+            method = "hardlink"
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+            if _reflink(source, tmp_path):
+                method = "reflink"
+            else:
+                shutil.copyfile(source, tmp_path)
+                method = "copy"
+        os.replace(tmp_path, dest)
+        return method
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class ArtifactStore:
+    """SHA-256 content-addressed blob store with named references."""
+
+    def __init__(self, root: str = DEFAULT_STORE_PATH):
+        """Open or create a store.
+
+        Args:
+            root: Store directory, holding blobs/ and refs/
+        """
+        self.root = root
+        self.blobs_dir = os.path.join(root, "blobs")
+        self.refs_dir = os.path.join(root, "refs")
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        os.makedirs(self.refs_dir, exist_ok=True)
+
+    def blob_path(self, digest: str) -> str:
+        """Path of a blob, fanned out by the first two hex digits."""
+        return os.path.join(self.blobs_dir, digest[:2], digest)
+
+    def has(self, digest: str) -> bool:
+        """Check whether a blob is stored."""
+        return os.path.exists(self.blob_path(digest))
+
+    def ingest(self, path: str) -> str:
+        """Store a file's content and replace the file with a link to the blob.
+
+        A file whose content is already stored is replaced by a link to the
+        existing blob; otherwise the file itself becomes the blob.
+
+        Args:
+            path: File to store
+
+        Returns:
+            Hex SHA-256 digest of the content
+        """
+        digest = file_digest(path)
+        blob = self.blob_path(digest)
+        if os.path.exists(blob):
+            if not os.path.samefile(path, blob):
+                link_or_copy(blob, path)
+            return digest
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        try:
+            # Share the file's inode; link_or_copy falls back to a copy across file systems
+            link_or_copy(path, blob)
+            os.chmod(blob, 0o444)
+        except FileExistsError:
+            pass
+        return digest
+
+    def materialize(self, digest: str, dest: str) -> str:
+        """Link a stored blob to a path.
+
+        Args:
+            digest: Digest of the blob
+            dest: Destination path; parent directories are created
+
+        Returns:
+            The destination path
+
+        Raises:
+            FileNotFoundError: If the blob is not stored
+        """
+        blob = self.blob_path(digest)
+        if not os.path.exists(blob):
+            raise FileNotFoundError(f"Artifact {digest} not found in {self.root}")
+        os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+        link_or_copy(blob, dest)
+        return dest
+
+    def _read_refs(self) -> Dict[str, str]:
+        """Digests of the named references, by reference file name."""
+        refs = {}
+        for name in os.listdir(self.refs_dir):
+            if name.endswith(".tmp"):
+                continue
+            try:
+                with open(os.path.join(self.refs_dir, name), "r") as f:
+                    refs[name] = f.read().strip()
+            except OSError:
+                continue
+        return refs
+
+    def referenced_digests(self) -> set:
+        """Digests that named references point at."""
+        return set(self._read_refs().values())
+
+    def prune(self, keep_refs: bool = True, dry_run: bool = False) -> Dict[str, int]:
+        """Delete blobs that no workflow links to.
+
+        A blob whose only link is the store itself is unreferenced. Blobs
+        copied or reflinked into workflows also have a single link; deleting
+        them is safe, since those workflows hold their own copies.
+
+        Args:
+            keep_refs: Keep blobs that named references point at, so cached
+                AlphaFold models are not downloaded again. Otherwise those
+                blobs are deleted together with their references.
+            dry_run: Only report what would be deleted
+
+        Returns:
+            Dictionary with the number of deleted blobs and freed bytes
+        """
+        refs = self._read_refs()
+        referenced = set(refs.values()) if keep_refs else set()
+        deleted_digests = set()
+        deleted = freed = 0
+        for root, dirs, files in os.walk(self.blobs_dir):
+            for digest in files:
+                path = os.path.join(root, digest)
+                try:
+                    st = os.lstat(path)
+                except OSError:
+                    continue
+                if st.st_nlink > 1 or digest in referenced:
+                    continue
+                if not dry_run:
+                    try:
+                        os.remove(path)
+                    except OSError as e:
+                        logger.warning("Could not delete blob %s: %s", path, e)
+                        continue
+                deleted_digests.add(digest)
+                deleted += 1
+                freed += st.st_size
+        if not dry_run:
+            for name, digest in refs.items():
+                if digest in deleted_digests:
+                    try:
+                        os.remove(os.path.join(self.refs_dir, name))
+                    except OSError:
+                        pass
+        return {"blobs": deleted, "bytes": freed}
+
+    def _ref_path(self, name: str) -> str:
+        return os.path.join(self.refs_dir, name.replace("/", "_"))
+
+    def get_ref(self, name: str) -> Optional[str]:
+        """Digest of a named reference, or None if unset or its blob is gone."""
+        try:
+            with open(self._ref_path(name), "r") as f:
+                digest = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return digest if self.has(digest) else None
+
+    def set_ref(self, name: str, digest: str) -> None:
+        """Point a named reference at a digest."""
+        path = self._ref_path(name)
+        tmp_path = f"{path}.{uuid.uuid4().hex[:12]}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(digest)
+        os.replace(tmp_path, path)
+
+_default_store: Optional[ArtifactStore] = None
+
+def get_artifact_store() -> Optional[ArtifactStore]:
+    """Get the process-wide artifact store.
+
+    Returns:
+        The shared store, or None if disabled or unavailable
+    """
+    global _default_store
+    root = os.getenv("PLUGPEP_ARTIFACT_STORE", DEFAULT_STORE_PATH)
+    if root.lower() in ("0", "false", "off", "no"):
+        return None
+    if _default_store is None or _default_store.root != root:
+        try:
+            _default_store = ArtifactStore(root)
+        except OSError as e:
+            logger.warning("Artifact store unavailable: %s", e)
+            return None
+    return _default_store
+
+def store_artifact(path: Optional[str]) -> Optional[str]:
+    """Ingest a file into the shared store, if enabled.
+
+    Failures are logged and never fail the calling step.
+
+    Returns:
+        The file's digest, or None if the store is disabled or ingestion failed
+    """
+    store = get_artifact_store()
+    if store is None or not path or not os.path.isfile(path):
+        return None
+    try:
+        return store.ingest(path)
+    except OSError as e:
+        logger.warning("Could not store artifact %s: %s", path, e)
+        return None
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Command Line Interface for Protein Binder Design Pipeline
+
+    plugpep worker [--concurrency N]           run queued workflows until stopped
+    plugpep submit QUERY | --query-file FILE   queue a workflow
+    plugpep jobs [--status S]                  list queued and finished jobs
+    plugpep status JOB_ID                      show one job
+    plugpep cancel JOB_ID                      cancel a job that has not started
+
+Submitting only inserts a row into the job queue; the workflow modules are
+imported by the worker alone.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+from .job_queue import JOB_STATUSES, get_job_queue
+
+def _format_time(timestamp) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp)) if timestamp else "-"
+
+def _json_object(text: str) -> dict:
+    """Parse --options; argparse reports the error if it is not a JSON object."""
+    try:
+        value = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise argparse.ArgumentTypeError(f"invalid JSON: {e}")
+    if not isinstance(value, dict):
+        raise argparse.ArgumentTypeError("must be a JSON object")
+    return value
+
+def _run_worker(args) -> int:
+    from .config import AgentConfig
+    from .agent_graph import workflow_root
+    from .worker import serve
+
+    root = workflow_root()
+    config = AgentConfig(
+        output_dir=os.path.join(root, "output"),
+        log_dir=os.path.join(root, "logs"),
+        debug=args.debug
+    )
+    serve(get_job_queue(args.queue), concurrency=args.concurrency, config=config.to_dict())
+    return 0
+
+def _submit(args) -> int:
+    if args.query_file:
+        try:
+            with open(args.query_file, "r") as f:
+                query = f.read().strip()
+        except OSError as e:
+            print(f"Error reading query file: {str(e)}")
+            return 1
+    else:
+        query = args.query
+    queue = get_job_queue(args.queue)
+    job = queue.enqueue(query, options=args.options, priority=args.priority)
+    print(job["job_id"])
+    if not args.wait:
+        return 0
+
+    while job["status"] in ("queued", "running"):
+        time.sleep(1.0)
+        job = queue.get(job["job_id"])
+    print(f"{job['status']}: {job['workflow_dir'] or '-'}")
+    if job["error"]:
+        print(f"Error: {job['error']}")
+    return 0 if job["status"] == "completed" else 1
+
+def main():
+    """Entry point of the plugpep command."""
+    parser = argparse.ArgumentParser(prog='plugpep', description='Protein binder design pipeline')
+    parser.add_argument('--queue', help='Path of the job queue database')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    worker_parser = commands.add_parser('worker', help='Run queued workflows until SIGTERM or SIGINT')
+    worker_parser.add_argument('--concurrency', '-n', type=int, help='Workflows run at a time')
+    worker_parser.add_argument('--debug', action='store_true', help='Log at debug level')
+
+    submit_parser = commands.add_parser('submit', help='Queue a workflow and print its job ID')
+    group = submit_parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('query', nargs='?', help='Query string')
+    group.add_argument('--query-file', help='Path to the file containing the query')
+    submit_parser.add_argument('--options', type=_json_object, help='Additional workflow input as a JSON object')
+    submit_parser.add_argument('--priority', type=int, default=0, help='Higher priorities run first')
+    submit_parser.add_argument('--wait', action='store_true', help='Wait for the workflow to finish')
+
+    jobs_parser = commands.add_parser('jobs', help='List jobs, most recent first')
+    jobs_parser.add_argument('--status', choices=JOB_STATUSES)
+    jobs_parser.add_argument('--limit', type=int, default=50)
+
+    status_parser = commands.add_parser('status', help='Show a job')
+    status_parser.add_argument('job_id')
+
+    cancel_parser = commands.add_parser('cancel', help='Cancel a job that has not started')
+    cancel_parser.add_argument('job_id')
+
+    args = parser.parse_args()
+
+    if args.command == 'worker':
+        return _run_worker(args)
+    if args.command == 'submit':
+        return _submit(args)
+
+    queue = get_job_queue(args.queue)
+    if args.command == 'jobs':
+        for job in queue.list(status=args.status, limit=args.limit):
+            print(f"{job['job_id']:<14} {job['status']:<10} {_format_time(job['created_at'])}  {job['query'][:60]}")
+        return 0
+    if args.command == 'status':
+        job = queue.get(args.job_id)
+        if job is None:
+            print(f"Error: unknown job {args.job_id}")
+            return 1
+        print(json.dumps(job, indent=2))
+        return 0
+
+    if not queue.cancel(args.job_id):
+        print(f"Error: job {args.job_id} is not queued")
+        return 1
+    print(f"Cancelled {args.job_id}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -15,11 +15,15 @@ class AgentConfig:
     debug: bool = False
 
     def __post_init__(self):
-        """Initialize paths."""
+        """Initialize paths and logging."""
         # Create output and log directories
         Path(self.output_dir).mkdir(parents=True, exist_ok=True)
         Path(self.log_dir).mkdir(parents=True, exist_ok=True)
 
+        # Log at DEBUG level in debug mode, to the console and log_dir
+        from .logging_utils import configure_logging
+        configure_logging(self)
+
     @classmethod
     def from_dict(cls, config_dict: Dict) -> 'AgentConfig':
         """Create configuration from a dictionary."""
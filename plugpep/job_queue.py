@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Durable Workflow Job Queue for Protein Binder Design Pipeline
+
+Workflow jobs are queued in a local SQLite database (WAL mode), shared by
+the processes that submit jobs and the workers that run them. Submitting a
+query is a single insert; it imports nothing but the standard library.
+
+Workers claim jobs atomically and update a heartbeat while they run them.
+Jobs whose worker stopped sending heartbeats, e.g. because it was killed,
+are put back in the queue, up to MAX_ATTEMPTS times; their workflow then
+resumes from its journal.
+
+The queue is configured from environment variables:
+    PLUGPEP_QUEUE_PATH: database file path
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Default queue location, overridable with PLUGPEP_QUEUE_PATH
+DEFAULT_QUEUE_PATH = os.path.join(Path.home(), ".cache", "plugpep", "queue.sqlite")
+
+# Seconds without a heartbeat after which a running job is taken to be abandoned
+STALE_JOB_TIMEOUT = 300
+
+# Times a job is started before it is failed instead of requeued
+MAX_ATTEMPTS = 3
+
+JOB_STATUSES = ("queued", "running", "completed", "failed", "cancelled")
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS jobs (
+        job_id TEXT PRIMARY KEY,
+        query TEXT NOT NULL,
+        options TEXT,
+        priority INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL,
+        workflow_id TEXT NOT NULL,
+        workflow_dir TEXT,
+        worker TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        created_at REAL NOT NULL,
+        started_at REAL,
+        finished_at REAL,
+        heartbeat_at REAL
+    )""",
+    "CREATE INDEX IF NOT EXISTS jobs_queued ON jobs (status, priority DESC, created_at)"
+)
+
+def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+    job = dict(row)
+    job["options"] = json.loads(job["options"]) if job["options"] else {}
+    return job
+
+class JobQueue:
+    """SQLite queue of workflow jobs."""
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH):
+        """Open or create a queue.
+
+        Args:
+            path: Path to the SQLite database. Parent directories are created.
+        """
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection; the busy timeout serializes concurrent writers."""
+        conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def enqueue(
+        self,
+        query: str,
+        options: Optional[Dict[str, Any]] = None,
+        priority: int = 0,
+        workflow_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Submit a workflow job.
+
+        Args:
+            query: Workflow query
+            options: Additional workflow input, e.g. backbone_options
+            priority: Jobs with a higher priority are run first
+            workflow_id: Workflow ID; a new one is generated if None
+
+        Returns:
+            The queued job
+
+        Raises:
+            ValueError: If options is not a dictionary
+        """
+        if options is not None and not isinstance(options, dict):
+            raise ValueError(f"Job options must be a dictionary, not {type(options).__name__}")
+        job_id = uuid.uuid4().hex[:12]
+        workflow_id = workflow_id or f"workflow_{job_id}"
+        conn = self._connect()
+        try:
+            conn.execute(
+                """INSERT INTO jobs (job_id, query, options, priority, status, workflow_id, created_at)
+                   VALUES (?, ?, ?, ?, 'queued', ?, ?)""",
+                (job_id, query, json.dumps(options) if options else None, priority, workflow_id, time.time())
+            )
+        finally:
+            conn.close()
+        return self.get(job_id)
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Take the next queued job for a worker.
+
+        Args:
+            worker: Worker identifier recorded with the job
+
+        Returns:
+            The claimed job, now running, or None if the queue is empty
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT job_id FROM jobs WHERE status = 'queued' ORDER BY priority DESC, created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute(
+                """UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1,
+                       started_at = ?, heartbeat_at = ?, error = NULL
+                   WHERE job_id = ?""",
+                (worker, now, now, row["job_id"])
+            )
+            job = _row_to_job(conn.execute("SELECT * FROM jobs WHERE job_id = ?", (row["job_id"],)).fetchone())
+            conn.execute("COMMIT")
+            return job
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def heartbeat(self, job_ids: Iterable[str]) -> None:
+        """Mark running jobs as alive."""
+        job_ids = list(job_ids)
+        if not job_ids:
+            return
+        conn = self._connect()
+        try:
+            conn.executemany(
+                "UPDATE jobs SET heartbeat_at = ? WHERE job_id = ? AND status = 'running'",
+                [(time.time(), job_id) for job_id in job_ids]
+            )
+        finally:
+            conn.close()
+
+    def finish(
+        self,
+        job_id: str,
+        status: str,
+        error: Optional[str] = None,
+        workflow_dir: Optional[str] = None
+    ) -> None:
+        """Record the outcome of a job.
+
+        Args:
+            job_id: Job ID
+            status: "completed", "failed", or "queued" to put the job back in the queue
+            error: Error message of a failed job
+            workflow_dir: Workflow directory of the job
+        """
+        if status not in JOB_STATUSES:
+            raise ValueError(f"Invalid job status: {status}")
+        conn = self._connect()
+        try:
+            conn.execute(
+                """UPDATE jobs SET status = ?, error = ?, workflow_dir = COALESCE(?, workflow_dir),
+                       finished_at = ?, worker = CASE WHEN ? = 'queued' THEN NULL ELSE worker END
+                   WHERE job_id = ?""",
+                (status, error, workflow_dir, time.time() if status != "queued" else None, status, job_id)
+            )
+        finally:
+            conn.close()
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started.
+
+        Returns:
+            True if the job was queued and is now cancelled
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE job_id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def requeue_stale(self, timeout: float = STALE_JOB_TIMEOUT) -> int:
+        """Put back running jobs whose worker stopped sending heartbeats.
+
+        Jobs that were already started MAX_ATTEMPTS times are failed instead.
+
+        Returns:
+            Number of requeued or failed jobs
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            failed = conn.execute(
+                """UPDATE jobs SET status = 'failed', finished_at = ?, error = 'Worker stopped responding'
+                   WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?""",
+                (now, now - timeout, MAX_ATTEMPTS)
+            ).rowcount
+            requeued = conn.execute(
+                """UPDATE jobs SET status = 'queued', worker = NULL
+                   WHERE status = 'running' AND heartbeat_at < ?""",
+                (now - timeout,)
+            ).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        if failed or requeued:
+            logger.warning("Requeued %d and failed %d abandoned jobs", requeued, failed)
+        return failed + requeued
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job, or None if unknown."""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            return _row_to_job(row) if row is not None else None
+        finally:
+            conn.close()
+
+    def list(self, status: Optional[str] = None, limit: Optional[int] = 100) -> List[Dict[str, Any]]:
+        """List jobs, most recently created first.
+
+        Args:
+            status: Only jobs with this status
+            limit: Maximum number of jobs; None for all
+        """
+        sql = "SELECT * FROM jobs"
+        params: List[Any] = []
+        if status:
+            sql += " WHERE status = ?"
+            params.append(status)
+        sql += " ORDER BY created_at DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        conn = self._connect()
+        try:
+            return [_row_to_job(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        conn = self._connect()
+        try:
+            return {row["status"]: row["n"] for row in conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")}
+        finally:
+            conn.close()
+
+def get_job_queue(path: Optional[str] = None) -> JobQueue:
+    """Open the job queue at path, or at PLUGPEP_QUEUE_PATH."""
+    return JobQueue(path or os.getenv("PLUGPEP_QUEUE_PATH", DEFAULT_QUEUE_PATH))
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Workflow Event Journal for Protein Binder Design Pipeline
+
+Workflow progress is persisted as an append-only JSON Lines journal in the
+workflow directory. Each line is one event; after every step, only the parts
+of the state that the step changed are appended and fsync'd, which is much
+cheaper than rewriting the full state. Every few events, and when the
+workflow ends, the full state is written as a snapshot to state.json with an
+atomic rename, and a snapshot marker is appended to the journal.
+
+recover_state rebuilds the latest state after a crash: it loads the snapshot
+and replays the events after the last snapshot marker. A line torn by a
+crash during an append is ignored, so at most the interrupted step is lost.
+
+The journal is configured from environment variables:
+    PLUGPEP_JOURNAL: set to "0", "false" or "off" to disable journaling
+    PLUGPEP_JOURNAL_SNAPSHOT_EVERY: events between snapshots
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Optional, List
+
+from .serialization import dumps, loads, dump, load, json_format
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FILENAME = "journal.jsonl"
+SNAPSHOT_FILENAME = "state.json"
+
+# Step events between snapshots, overridable with PLUGPEP_JOURNAL_SNAPSHOT_EVERY
+DEFAULT_SNAPSHOT_EVERY = 5
+
+def journaling_enabled() -> bool:
+    """Whether workflows keep a journal, from PLUGPEP_JOURNAL."""
+    return os.getenv("PLUGPEP_JOURNAL", "1").lower() not in ("0", "false", "off", "no")
+
+class WorkflowJournal:
+    """Append-only event journal and snapshots of one workflow directory."""
+
+    def __init__(self, workflow_dir: str, snapshot_every: Optional[int] = None):
+        """Open the journal of a workflow directory for appending.
+
+        Args:
+            workflow_dir: Workflow directory holding the journal and snapshot
+            snapshot_every: Step events between snapshots; None reads
+                PLUGPEP_JOURNAL_SNAPSHOT_EVERY
+        """
+        if snapshot_every is None:
+            snapshot_every = int(os.getenv("PLUGPEP_JOURNAL_SNAPSHOT_EVERY", DEFAULT_SNAPSHOT_EVERY))
+        self.workflow_dir = workflow_dir
+        self.path = os.path.join(workflow_dir, JOURNAL_FILENAME)
+        self.snapshot_path = os.path.join(workflow_dir, SNAPSHOT_FILENAME)
+        self.snapshot_every = max(1, snapshot_every)
+        os.makedirs(workflow_dir, exist_ok=True)
+        self._seq = _last_seq(self.path)
+        self._file = open(self.path, "ab")
+        if self._file.tell() > 0:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    # Terminate a line torn by a crash, so the next event starts a line of its own
+                    self._file.write(b"\n")
+        self._since_snapshot = 0
+        # Digests of the state sections as last journaled, to detect what a step changed
+        self._journaled: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def append(self, event: Dict[str, Any]) -> int:
+        """Append one event and fsync it.
+
+        Returns:
+            Sequence number of the event
+        """
+        with self._lock:
+            self._seq += 1
+            # The journal is always JSON Lines, whatever the state format
+            line = dumps({"seq": self._seq, "time": time.time(), **event}, format=json_format(), pretty=False)
+            self._file.write(line + b"\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            return self._seq
+
+    def _changes(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Top-level keys and steps whose content changed since the last event."""
+        changed: Dict[str, Any] = {"set": {}, "steps": {}}
+        sections = [(key, value, "set") for key, value in state.items() if key != "steps"]
+        sections += [(f"steps.{name}", value, "steps") for name, value in (state.get("steps") or {}).items()]
+        for key, value, kind in sections:
+            digest = hashlib.blake2b(dumps(value, format=json_format(), pretty=False), digest_size=16).digest()
+            if self._journaled.get(key) != digest:
+                self._journaled[key] = digest
+                changed[kind][key.split(".", 1)[-1] if kind == "steps" else key] = value
+        return changed
+
+    def record_start(self, state: Dict[str, Any]) -> None:
+        """Journal the state a workflow run starts from."""
+        self.append({"type": "workflow_started", "step": state.get("current_step"), **self._changes(state)})
+
+    def record_step(self, step: str, state: Dict[str, Any], next_step: Optional[str]) -> None:
+        """Journal the changes of a finished step and snapshot periodically.
+
+        Args:
+            step: Name of the step that ran
+            state: Workflow state after the step
+            next_step: Step to resume from, the failed step itself, or None when done
+        """
+        success = bool((state.get("steps") or {}).get(step, {}).get("success"))
+        self.append({
+            "type": "step_completed" if success else "step_failed",
+            "step": step,
+            "next_step": next_step,
+            **self._changes(state)
+        })
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_every:
+            self.snapshot(state)
+
+    def snapshot(self, state: Dict[str, Any]) -> None:
+        """Write the full state atomically and mark it in the journal."""
+        dump(state, self.snapshot_path, durable=True)
+        self.append({"type": "snapshot", "path": SNAPSHOT_FILENAME})
+        self._since_snapshot = 0
+
+    def close(self) -> None:
+        """Close the journal file."""
+        with self._lock:
+            self._file.close()
+
+def read_events(path: str) -> List[Dict[str, Any]]:
+    """Read the events of a journal, skipping a line torn by a crash.
+
+    Args:
+        path: Journal file path
+
+    Returns:
+        Events in order
+    """
+    events = []
+    if not os.path.exists(path):
+        return events
+    with open(path, "rb") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                events.append(loads(line, format="json"))
+            except ValueError:
+                logger.warning("Skipping unreadable journal line %d in %s", number, path)
+    return events
+
+def _last_seq(path: str) -> int:
+    events = read_events(path)
+    return events[-1]["seq"] if events else 0
+
+def recover_state(workflow_dir: str) -> Optional[Dict[str, Any]]:
+    """Rebuild the latest workflow state from the snapshot and the journal.
+
+    The returned state's "current_step" is the step to resume from: the step
+    after the last completed one, or the step that failed. It is None when
+    the journal shows that the workflow finished.
+
+    Args:
+        workflow_dir: Workflow directory
+
+    Returns:
+        The recovered state, or None if there is neither a snapshot nor a journal
+    """
+    snapshot_path = os.path.join(workflow_dir, SNAPSHOT_FILENAME)
+    events = read_events(os.path.join(workflow_dir, JOURNAL_FILENAME))
+
+    state: Optional[Dict[str, Any]] = None
+    replay = events
+    last_snapshot = max((i for i, e in enumerate(events) if e.get("type") == "snapshot"), default=None)
+    if last_snapshot is not None or (os.path.exists(snapshot_path) and not events):
+        state = load(snapshot_path)
+        replay = events[last_snapshot + 1:] if last_snapshot is not None else []
+
+    for event in replay:
+        if state is None:
+            state = {}
+        state.update(event.get("set") or {})
+        if event.get("steps"):
+            state.setdefault("steps", {}).update(event["steps"])
+
+    step_events = [e for e in events if e.get("type") in ("step_completed", "step_failed")]
+    if state is not None and step_events:
+        state["current_step"] = step_events[-1].get("next_step")
+    return state
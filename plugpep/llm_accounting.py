@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+LLM Call Accounting for Protein Binder Design Pipeline
+
+This module records prompt and completion tokens, time to first token, total
+latency, retries and estimated cost of every LLM call. Calls are measured with
+LLMCallTimer and delivered to every active collect_llm_calls() block, so a
+workflow step or a batch of requests can gather the calls it made, even when
+they run on worker threads with a copied context.
+
+Token counts come from the provider's usage metadata. When a provider does
+not report usage, they are estimated from the text length and the record is
+flagged as estimated.
+
+Retries are counted by retry_llm_call(), which retries transient provider
+errors itself: all attempts of a call share one timer, so the call is
+recorded once with its number of retries and its latency across attempts.
+Provider clients must therefore not retry internally.
+"""
+
+import os
+import json
+import time
+import logging
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Tuple, Iterator, Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+# Estimated USD price per million (prompt, completion) tokens. Models can be
+# added or overridden with PLUGPEP_LLM_PRICES, a JSON object of the same form.
+DEFAULT_PRICES = {
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-pro": (1.25, 5.00)
+}
+
+# Rough characters per token, used when the provider reports no usage
+CHARS_PER_TOKEN = 4
+
+# Retries of a failed call, overridable with PLUGPEP_LLM_MAX_RETRIES
+DEFAULT_MAX_RETRIES = 3
+
+# Seconds before the first retry, doubled for each further retry
+RETRY_BASE_DELAY = 1.0
+
+T = TypeVar("T")
+
+# Call lists of the enclosing collect_llm_calls() blocks, innermost last
+_collectors: contextvars.ContextVar[Tuple[List[Dict[str, Any]], ...]] = contextvars.ContextVar(
+    "plugpep_llm_collectors", default=()
+)
+
+# Call being run by retry_llm_call(): its shared timer and the prompt of its attempts
+_retried_call: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "plugpep_llm_retried_call", default=None
+)
+
+def get_model_prices() -> Dict[str, Tuple[float, float]]:
+    """Get the price table, including overrides from PLUGPEP_LLM_PRICES."""
+    prices = dict(DEFAULT_PRICES)
+    overrides = os.getenv("PLUGPEP_LLM_PRICES")
+    if overrides:
+        try:
+            prices.update({model: tuple(price) for model, price in json.loads(overrides).items()})
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"Ignoring invalid PLUGPEP_LLM_PRICES: {str(e)}")
+    return prices
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """Estimate the cost of a call in USD, or None for a model without a known price."""
+    price = get_model_prices().get(model)
+    if price is None:
+        return None
+    return (prompt_tokens * price[0] + completion_tokens * price[1]) / 1e6
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a text."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+@contextmanager
+def collect_llm_calls() -> Iterator[List[Dict[str, Any]]]:
+    """Collect the records of all LLM calls made inside the block.
+
+    Blocks can be nested; each call is delivered to every enclosing block.
+
+    Yields:
+        List that receives one record per finished call
+    """
+    calls: List[Dict[str, Any]] = []
+    token = _collectors.set(_collectors.get() + (calls,))
+    try:
+        yield calls
+    finally:
+        _collectors.reset(token)
+
+def record_llm_call(record: Dict[str, Any]) -> None:
+    """Deliver a call record to the active collectors and log it."""
+    for calls in _collectors.get():
+        calls.append(record)
+    logger.info(
+        "LLM call %s/%s: %d+%d tokens, %.2fs, retries=%d",
+        record["provider"], record["model"], record["prompt_tokens"],
+        record["completion_tokens"], record["latency_s"], record["retries"]
+    )
+
+class LLMCallTimer:
+    """Measures a single LLM call from start to finish."""
+
+    def __init__(self, model: str, provider: str = "google"):
+        self.model = model
+        self.provider = provider
+        self.retries = 0
+        self._start = time.perf_counter()
+        self._first_token: Optional[float] = None
+
+    def token(self) -> None:
+        """Mark the arrival of a streamed token; only the first one is timed."""
+        if self._first_token is None:
+            self._first_token = time.perf_counter()
+
+    def retry(self) -> None:
+        """Count a retried request."""
+        self.retries += 1
+
+    def finish(
+        self,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        prompt_text: str = "",
+        completion_text: str = "",
+        success: bool = True,
+        error: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Finish the call and record it.
+
+        Args:
+            prompt_tokens: Prompt tokens reported by the provider
+            completion_tokens: Completion tokens reported by the provider
+            prompt_text: Prompt text, used to estimate unreported prompt tokens
+            completion_text: Completion text, used to estimate unreported completion tokens
+            success: Whether the call succeeded
+            error: Error message if the call failed
+
+        Returns:
+            Call record with provider, model, token counts, latencies, retries and cost
+        """
+        end = time.perf_counter()
+        estimated = prompt_tokens is None or completion_tokens is None
+        if prompt_tokens is None:
+            prompt_tokens = estimate_tokens(prompt_text)
+        if completion_tokens is None:
+            completion_tokens = estimate_tokens(completion_text)
+        cost = estimate_cost(self.model, prompt_tokens, completion_tokens)
+        record = {
+            "provider": self.provider,
+            "model": self.model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "estimated_tokens": estimated,
+            "time_to_first_token_s": round(self._first_token - self._start, 4) if self._first_token else None,
+            "latency_s": round(end - self._start, 4),
+            "retries": self.retries,
+            "cost_usd": round(cost, 8) if cost is not None else None,
+            "success": success,
+            "error": error
+        }
+        record_llm_call(record)
+        return record
+
+def start_llm_call(model: str, provider: str = "google", prompt_text: str = "") -> LLMCallTimer:
+    """Get the timer of a call attempt that is starting.
+
+    Inside retry_llm_call(), every attempt returns the call's shared timer
+    and each attempt after the first counts as a retry.
+
+    Args:
+        model: Model name
+        provider: Provider name
+        prompt_text: Prompt text, used to estimate the prompt tokens of a failed call
+    """
+    call = _retried_call.get()
+    if call is None:
+        return LLMCallTimer(model, provider=provider)
+    if call["timer"] is None:
+        call["timer"] = LLMCallTimer(model, provider=provider)
+    else:
+        call["timer"].retry()
+    call["prompt_text"] = prompt_text
+    return call["timer"]
+
+def finish_failed_llm_call(timer: LLMCallTimer, error: BaseException, prompt_text: str = "") -> None:
+    """Record a failed call attempt, unless retry_llm_call() records the outcome of the whole call."""
+    if _retried_call.get() is None:
+        timer.finish(completion_tokens=0, prompt_text=prompt_text, success=False, error=str(error))
+
+def retry_llm_call(
+    call: Callable[[], T],
+    retryable: Callable[[BaseException], bool],
+    max_retries: Optional[int] = None
+) -> T:
+    """Run an LLM call, retrying failures with exponential backoff.
+
+    Callbacks that measure the attempts with start_llm_call() and
+    finish_failed_llm_call() record the call once: on success with its
+    number of retries, or as failed once no retry is left.
+
+    Args:
+        call: Function making the request
+        retryable: Whether an error is transient and worth retrying
+        max_retries: Maximum number of retries; None for PLUGPEP_LLM_MAX_RETRIES
+
+    Returns:
+        The result of call
+    """
+    if max_retries is None:
+        max_retries = int(os.getenv("PLUGPEP_LLM_MAX_RETRIES", DEFAULT_MAX_RETRIES))
+    state: Dict[str, Any] = {"timer": None, "prompt_text": ""}
+    token = _retried_call.set(state)
+    try:
+        for attempt in range(max_retries + 1):
+            try:
+                return call()
+            except Exception as e:
+                if attempt < max_retries and retryable(e):
+                    delay = RETRY_BASE_DELAY * 2 ** attempt
+                    logger.warning(f"LLM call failed ({str(e)}), retrying in {delay:.0f}s")
+                    time.sleep(delay)
+                    continue
+                if state["timer"] is not None:
+                    state["timer"].finish(completion_tokens=0, prompt_text=state["prompt_text"],
+                                          success=False, error=str(e))
+                raise
+    finally:
+        _retried_call.reset(token)
+
+def summarize_llm_calls(calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate call records, e.g. of one step, one workflow or one batch.
+
+    Args:
+        calls: Call records as returned by LLMCallTimer.finish
+
+    Returns:
+        Dictionary with call and failure counts, token totals, total and
+        maximum latency, mean time to first token, retries and total cost
+    """
+    first_token_times = [c["time_to_first_token_s"] for c in calls if c.get("time_to_first_token_s") is not None]
+    costs = [c["cost_usd"] for c in calls if c.get("cost_usd") is not None]
+    prompt_tokens = sum(c["prompt_tokens"] for c in calls)
+    completion_tokens = sum(c["completion_tokens"] for c in calls)
+    return {
+        "calls": len(calls),
+        "failed": sum(1 for c in calls if not c.get("success", True)),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "latency_s": round(sum(c["latency_s"] for c in calls), 4),
+        "max_latency_s": max((c["latency_s"] for c in calls), default=0.0),
+        "mean_time_to_first_token_s": round(sum(first_token_times) / len(first_token_times), 4) if first_token_times else None,
+        "retries": sum(c["retries"] for c in calls),
+        "cost_usd": round(sum(costs), 8) if costs else None
+    }
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+LLM Response Cache for Protein Binder Design Pipeline
+
+This module provides a persistent, disk-backed cache of LLM responses keyed by
+model, prompt messages and generation parameters. Planning calls are made with
+deterministic settings, so a repeated request can be answered from the cache.
+
+The cache is a SQLite database in WAL mode, which makes it safe to share
+between concurrent processes. Entries expire after a TTL, and the least
+recently used entries are evicted when the cache exceeds its entry or size
+limits.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+logger = logging.getLogger(__name__)
+
+# Default cache location, overridable with PLUGPEP_LLM_CACHE_PATH
+DEFAULT_CACHE_PATH = os.path.join(Path.home(), ".cache", "plugpep", "llm_cache.sqlite")
+
+# Default limits, overridable with PLUGPEP_LLM_CACHE_TTL / _MAX_ENTRIES / _MAX_BYTES
+DEFAULT_TTL = 30 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+class LLMResponseCache:
+    """Disk-backed LLM response cache with TTL and LRU size eviction."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl: Optional[float] = DEFAULT_TTL,
+        max_entries: Optional[int] = DEFAULT_MAX_ENTRIES,
+        max_bytes: Optional[int] = DEFAULT_MAX_BYTES
+    ):
+        """Initialize the cache.
+
+        Args:
+            path: Path to the SQLite cache file. Parent directories are created.
+            ttl: Seconds before an entry expires. None disables expiry.
+            max_entries: Maximum number of entries kept. None disables the limit.
+            max_bytes: Maximum total size of cached responses. None disables the limit.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection; the busy timeout serializes concurrent writers."""
+        return sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+
+    @staticmethod
+    def make_key(model: str, messages: Any, params: Dict[str, Any]) -> str:
+        """Build the cache key for a request.
+
+        Args:
+            model: Model name
+            messages: Prompt messages (any JSON-serializable value)
+            params: Generation parameters
+
+        Returns:
+            Hex SHA-256 digest of the canonical JSON request
+        """
+        payload = json.dumps(
+            {"model": model, "messages": messages, "params": params},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, or None if missing or expired."""
+        now = time.time()
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache lookup failed: {str(e)}")
+            return None
+        try:
+            row = conn.execute(
+                "SELECT response, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            response, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute(
+                "UPDATE responses SET last_access = ?, hits = hits + 1 WHERE key = ?",
+                (now, key)
+            )
+            return response
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache lookup failed: {str(e)}")
+            return None
+        finally:
+            conn.close()
+
+    def set(self, key: str, response: str, model: Optional[str] = None) -> None:
+        """Store a response and evict entries beyond the cache limits.
+
+        A failed write is logged and otherwise ignored; the cache is never
+        allowed to fail the calling workflow step.
+        """
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl is not None else None
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache write failed: {str(e)}")
+            return
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                """INSERT OR REPLACE INTO responses
+                   (key, model, response, size, created_at, expires_at, last_access, hits)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, 0)""",
+                (key, model, response, len(response.encode("utf-8")), now, expires_at, now)
+            )
+            self._evict(conn, now)
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            logger.warning(f"LLM cache write failed: {str(e)}")
+        finally:
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries, then least recently used ones over the limits."""
+        conn.execute("DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        if self.max_entries is not None:
+            conn.execute(
+                """DELETE FROM responses WHERE key IN (
+                       SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                   )""",
+                (self.max_entries,)
+            )
+        if self.max_bytes is not None:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                doomed: List[str] = []
+                for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC"):
+                    doomed.append(key)
+                    excess -= size
+                    if excess <= 0:
+                        break
+                conn.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key in doomed])
+
+    def clear(self) -> None:
+        """Remove all cached responses."""
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM responses")
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of entries, total size and total hits."""
+        conn = self._connect()
+        try:
+            entries, size, hits = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM responses"
+            ).fetchone()
+        finally:
+            conn.close()
+        return {"path": self.path, "entries": entries, "bytes": size, "hits": hits}
+
+_default_cache: Optional[LLMResponseCache] = None
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Get the process-wide LLM response cache.
+
+    The cache is configured from environment variables:
+        PLUGPEP_LLM_CACHE: set to "0", "false" or "off" to disable caching
+        PLUGPEP_LLM_CACHE_PATH: cache file path
+        PLUGPEP_LLM_CACHE_TTL: entry lifetime in seconds
+        PLUGPEP_LLM_CACHE_MAX_ENTRIES: maximum number of entries
+        PLUGPEP_LLM_CACHE_MAX_BYTES: maximum total response size
+
+    Returns:
+        The shared cache, or None if caching is disabled or unavailable
+    """
+    global _default_cache
+    if os.getenv("PLUGPEP_LLM_CACHE", "1").lower() in ("0", "false", "off", "no"):
+        return None
+    if _default_cache is None:
+        try:
+            _default_cache = LLMResponseCache(
+                path=os.getenv("PLUGPEP_LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+                ttl=float(os.getenv("PLUGPEP_LLM_CACHE_TTL", DEFAULT_TTL)),
+                max_entries=int(os.getenv("PLUGPEP_LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                max_bytes=int(os.getenv("PLUGPEP_LLM_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+            )
+        except (OSError, sqlite3.Error, ValueError) as e:
+            logger.warning(f"LLM response cache unavailable: {str(e)}")
+            return None
+    return _default_cache
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+LLM Record/Replay Cassettes for Protein Binder Design Pipeline
+
+A cassette is a JSON Lines file of LLM exchanges keyed by a hash of the model
+parameters and prompt messages. In record mode, CassetteLLM forwards calls to
+a real chat model and appends each exchange to the cassette; in replay mode it
+answers from the cassette without network access or an API key, optionally
+reproducing the recorded latency. Replayed responses are the real model
+output, so they exercise the same parsing code as live runs, which makes
+cassettes suitable for benchmarks and regression tests of the planning stage.
+
+get_llm() returns a CassetteLLM when PLUGPEP_LLM_CASSETTE is set:
+    PLUGPEP_LLM_CASSETTE: cassette file path
+    PLUGPEP_LLM_CASSETTE_MODE: "replay", "record" or "auto" (default; replay
+        recorded prompts and record new ones)
+    PLUGPEP_LLM_REPLAY_LATENCY: "0" (default, no delay), "recorded" to
+        reproduce the recorded timings, or a fixed delay in seconds
+
+When benchmarking planning, also disable the response caches
+(PLUGPEP_LLM_CACHE=0, PLUGPEP_QUERY_CACHE=0) so every run reaches the model.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterator, List
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from .llm_cache import LLMResponseCache
+from .llm_accounting import LLMCallTimer
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_MODES = ("replay", "record", "auto")
+
+# Characters per chunk when a response is replayed as a stream
+REPLAY_CHUNK_SIZE = 16
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode when a prompt was never recorded."""
+    pass
+
+def _message_dict(message: Any) -> Dict[str, str]:
+    """Convert a prompt message to a role/content dictionary for hashing."""
+    if isinstance(message, dict):
+        return {"role": message.get("role", ""), "content": str(message.get("content", ""))}
+    if isinstance(message, (list, tuple)) and len(message) == 2:
+        return {"role": str(message[0]), "content": str(message[1])}
+    return {"role": getattr(message, "type", "user"), "content": str(getattr(message, "content", message))}
+
+def _response_text(content: Any) -> str:
+    """Flatten message content to text."""
+    if isinstance(content, list):
+        return "".join(part if isinstance(part, str) else part.get("text", "") for part in content)
+    return str(content)
+
+class Cassette:
+    """Exchanges of one cassette file, loaded once and appended to on record."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.interactions: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.interactions[entry["key"]] = entry
+                    except (ValueError, KeyError):
+                        continue
+            logger.info("Loaded %d LLM exchanges from cassette %s", len(self.interactions), path)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the recorded exchange for a key, if any."""
+        return self.interactions.get(key)
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        """Store an exchange and append it to the cassette file."""
+        with self._lock:
+            self.interactions[entry["key"]] = entry
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+class CassetteLLM:
+    """Chat model stand-in that records or replays exchanges of a real model."""
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        params: Dict[str, Any],
+        llm: Optional[Any] = None,
+        mode: str = "auto",
+        latency: Optional[str] = None
+    ):
+        """Initialize the cassette model.
+
+        Args:
+            cassette: Cassette to record to and replay from
+            params: Generation parameters of the model, part of the exchange key
+            llm: Real chat model used for recording. Required unless mode is "replay".
+            mode: "replay", "record" or "auto"
+            latency: "recorded", a delay in seconds, or None for no delay
+        """
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unsupported cassette mode: {mode}")
+        if mode != "replay" and llm is None:
+            raise ValueError(f"A model is required to record in cassette mode '{mode}'")
+        self.cassette = cassette
+        self.params = params
+        self.llm = llm
+        self.mode = mode
+        self.latency = latency
+
+    def _key(self, messages: List[Any]) -> str:
+        return LLMResponseCache.make_key(
+            self.params.get("model", ""), [_message_dict(m) for m in messages], self.params
+        )
+
+    def _replay_delays(self, entry: Dict[str, Any]) -> Optional[List[float]]:
+        """Time to first token and total latency to reproduce, or None for no delay."""
+        if not self.latency or self.latency == "0":
+            return None
+        if self.latency == "recorded":
+            total = entry.get("latency_s") or 0.0
+            first = entry.get("time_to_first_token_s")
+            return [first if first is not None else total, total]
+        total = float(self.latency)
+        return [total, total]
+
+    def _lookup(self, messages: List[Any]) -> Optional[Dict[str, Any]]:
+        """Find the recorded exchange of a prompt, honouring the mode."""
+        key = self._key(messages)
+        entry = self.cassette.get(key) if self.mode != "record" else None
+        if entry is None and self.mode == "replay":
+            raise CassetteMiss(f"No recorded LLM exchange for prompt {key[:12]} in {self.cassette.path}")
+        return entry
+
+    def _record(self, messages: List[Any], text: str, latency: float, first_token: Optional[float]) -> None:
+        self.cassette.record({
+            "key": self._key(messages),
+            "model": self.params.get("model"),
+            "messages": [_message_dict(m) for m in messages],
+            "response": text,
+            "latency_s": round(latency, 4),
+            "time_to_first_token_s": round(first_token, 4) if first_token is not None else None,
+            "recorded_at": time.time()
+        })
+
+    def invoke(self, messages: List[Any], **kwargs: Any) -> AIMessage:
+        """Return the recorded response of a prompt, or call the model and record it."""
+        entry = self._lookup(messages)
+        if entry is not None:
+            timer = LLMCallTimer(self.params.get("model", ""), provider="cassette")
+            delays = self._replay_delays(entry)
+            if delays:
+                time.sleep(delays[1])
+            timer.finish(prompt_text=json.dumps(entry["messages"]), completion_text=entry["response"])
+            return AIMessage(content=entry["response"])
+
+        start = time.perf_counter()
+        response = self.llm.invoke(messages, **kwargs)
+        self._record(messages, _response_text(response.content), time.perf_counter() - start, None)
+        return response
+
+    def stream(self, messages: List[Any], **kwargs: Any) -> Iterator[AIMessageChunk]:
+        """Stream the recorded response of a prompt, or stream from the model and record it."""
+        entry = self._lookup(messages)
+        if entry is not None:
+            timer = LLMCallTimer(self.params.get("model", ""), provider="cassette")
+            text = entry["response"]
+            chunks = [text[i:i + REPLAY_CHUNK_SIZE] for i in range(0, len(text), REPLAY_CHUNK_SIZE)] or [""]
+            delays = self._replay_delays(entry)
+            for i, chunk in enumerate(chunks):
+                if delays:
+                    # First chunk after the time to first token, the rest spread evenly
+                    time.sleep(delays[0] if i == 0 else (delays[1] - delays[0]) / max(len(chunks) - 1, 1))
+                timer.token()
+                yield AIMessageChunk(content=chunk)
+            timer.finish(prompt_text=json.dumps(entry["messages"]), completion_text=text)
+            return
+
+        start = time.perf_counter()
+        first_token = None
+        parts: List[str] = []
+        for chunk in self.llm.stream(messages, **kwargs):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            parts.append(_response_text(chunk.content))
+            yield chunk
+        self._record(messages, "".join(parts), time.perf_counter() - start, first_token)
+
+_cassettes: Dict[str, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+def get_cassette(path: str) -> Cassette:
+    """Get the process-wide cassette of a file."""
+    path = os.path.abspath(path)
+    with _cassettes_lock:
+        cassette = _cassettes.get(path)
+        if cassette is None:
+            cassette = _cassettes[path] = Cassette(path)
+        return cassette
+
+def cassette_settings() -> Optional[Dict[str, Any]]:
+    """Read the cassette configuration from the environment, or None if disabled."""
+    path = os.getenv("PLUGPEP_LLM_CASSETTE")
+    if not path:
+        return None
+    return {
+        "path": path,
+        "mode": os.getenv("PLUGPEP_LLM_CASSETTE_MODE", "auto").lower(),
+        "latency": os.getenv("PLUGPEP_LLM_REPLAY_LATENCY")
+    }
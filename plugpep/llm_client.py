@@ -3,34 +3,151 @@
 LLM Client for Protein Binder Design Pipeline
 
 This module provides a client for interacting with various LLM providers.
+Requests can be issued synchronously with generate() or concurrently with
+agenerate()/generate_many(). Concurrent requests share per-process provider
+clients and a worker thread pool, and are queued behind a per-provider
+concurrency limit. Every result carries the usage record of its call, and
+each batch is summarized once it completes.
 """
 
 import os
 import json
 import logging
+import asyncio
+import threading
+import functools
+import weakref
+import contextvars
 import requests
 import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, Literal, List, Union
 
+from .llm_accounting import LLMCallTimer, collect_llm_calls, summarize_llm_calls, retry_llm_call
+
 logger = logging.getLogger(__name__)
 
+# Default number of in-flight requests per provider, overridable with
+# PLUGPEP_<PROVIDER>_CONCURRENCY (e.g. PLUGPEP_GOOGLE_CONCURRENCY=16)
+DEFAULT_CONCURRENCY = {
+    "google": 8,
+    "openai": 8,
+    "anthropic": 4
+}
+
+class ProviderLimiter:
+    """FIFO concurrency limit for one provider on one event loop."""
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.active = 0
+        self.queued = 0
+        # Conflicting caps requested by other clients, each logged once
+        self.ignored_caps: set = set()
+
+    async def __aenter__(self) -> "ProviderLimiter":
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        self.active += 1
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+# Per-process state shared by all LLMClient instances
+_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, ProviderLimiter]]" = weakref.WeakKeyDictionary()
+_pool_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_size = 0
+# Highest concurrency cap of the clients created per provider
+_client_caps: Dict[str, int] = {}
+
+def _configured_concurrency(provider: str) -> int:
+    """Concurrency cap of a provider from PLUGPEP_<PROVIDER>_CONCURRENCY or DEFAULT_CONCURRENCY."""
+    return int(os.environ.get(
+        f"PLUGPEP_{provider.upper()}_CONCURRENCY",
+        DEFAULT_CONCURRENCY.get(provider, 4)
+    ))
+
+def _register_cap(provider: str, max_concurrency: int) -> None:
+    """Record a client's concurrency cap, so the worker pool has a thread for each slot."""
+    with _pool_lock:
+        _client_caps[provider] = max(_client_caps.get(provider, 0), max_concurrency)
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Get the worker pool that runs blocking provider calls.
+
+    The pool has one thread per concurrency slot of every provider. When a
+    client raises a cap, a larger pool replaces it; calls already running
+    finish on the old pool.
+    """
+    global _executor, _executor_size
+    with _pool_lock:
+        providers = set(DEFAULT_CONCURRENCY) | set(_client_caps)
+        size = sum(max(_configured_concurrency(p), _client_caps.get(p, 0)) for p in providers)
+        if _executor is None or _executor_size < size:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="plugpep-llm")
+            _executor_size = size
+        return _executor
+
+def _get_limiter(provider: str, max_concurrency: int) -> ProviderLimiter:
+    """Get the limiter of a provider for the running event loop.
+
+    There is one limiter per provider and loop, created with the cap of the
+    first client that uses it. A limiter is never replaced while requests
+    may hold or wait for its slots, so clients asking for another cap share
+    it and the conflict is logged.
+    """
+    loop = asyncio.get_running_loop()
+    limiters = _limiters.setdefault(loop, {})
+    limiter = limiters.get(provider)
+    if limiter is None:
+        limiter = limiters[provider] = ProviderLimiter(max_concurrency)
+    elif limiter.max_concurrency != max_concurrency and max_concurrency not in limiter.ignored_caps:
+        limiter.ignored_caps.add(max_concurrency)
+        logger.warning(
+            f"Ignoring max_concurrency={max_concurrency} for {provider}: requests on this event loop "
+            f"are already limited to {limiter.max_concurrency}"
+        )
+    return limiter
+
 class LLMClient:
     """Client for interacting with LLM providers."""
 
-    def __init__(self, provider: Literal["google", "openai", "anthropic"] = "google"):
+    def __init__(self, provider: Literal["google", "openai", "anthropic"] = "google",
+                 max_concurrency: Optional[int] = None):
         """Initialize the LLM client.
 
         Args:
             provider: The LLM provider to use. Currently supports "google", "openai", or "anthropic".
+            max_concurrency: Maximum number of concurrent requests to the provider
+                within one event loop. Defaults to PLUGPEP_<PROVIDER>_CONCURRENCY
+                or DEFAULT_CONCURRENCY. All clients of a provider on one event
+                loop share the cap of the first one that sends a request.
         """
         self.provider = provider
         self.api_key = self._get_api_key()
+        if max_concurrency is None:
+            max_concurrency = _configured_concurrency(provider)
+        self.max_concurrency = max_concurrency
+        _register_cap(provider, max_concurrency)
 
     def _get_api_key(self) -> str:
         """Get the API key for the selected provider."""
         if self.provider == "google":
             api_key = os.environ.get("GOOGLE_API_KEY")
             if not api_key:
+                # Replaying a cassette needs no credentials
+                if os.environ.get("PLUGPEP_LLM_CASSETTE") and \
+                        os.environ.get("PLUGPEP_LLM_CASSETTE_MODE", "auto").lower() == "replay":
+                    return ""
                 raise ValueError("GOOGLE_API_KEY environment variable not set")
             return api_key
         elif self.provider == "openai":
@@ -61,33 +178,122 @@ class LLMClient:
                 - success: Boolean indicating if the request was successful.
                 - content: The generated text if successful.
                 - error: Error message if unsuccessful.
+                - usage: Summary of the provider calls made (tokens, latency, retries, cost).
+        """
+        with collect_llm_calls() as calls:
+            try:
+                if self.provider == "google":
+                    result = self._generate_google(prompt, system_prompt, temperature, max_tokens)
+                elif self.provider == "openai":
+                    result = self._generate_openai(prompt, system_prompt, temperature, max_tokens)
+                elif self.provider == "anthropic":
+                    result = self._generate_anthropic(prompt, system_prompt, temperature, max_tokens)
+                else:
+                    result = {"success": False, "error": f"Unsupported provider: {self.provider}"}
+            except Exception as e:
+                logger.error(f"Error generating text: {str(e)}")
+                result = {"success": False, "error": str(e)}
+        result["usage"] = summarize_llm_calls(calls)
+        return result
+
+    async def agenerate(self, prompt: str, system_prompt: Optional[str] = None,
+                        temperature: float = 0.7, max_tokens: int = 2000) -> Dict[str, Any]:
+        """Generate text asynchronously.
+
+        Waits in the provider's FIFO queue until a concurrency slot is free,
+        then runs the request on the shared worker pool.
+
+        Args:
+            prompt: The prompt to send to the LLM.
+            system_prompt: Optional system prompt to set the context.
+            temperature: Controls randomness in the output (0.0 to 1.0).
+            max_tokens: Maximum number of tokens to generate.
+
+        Returns:
+            The same dictionary as generate().
+        """
+        limiter = _get_limiter(self.provider, self.max_concurrency)
+        async with limiter:
+            loop = asyncio.get_running_loop()
+            # Run in a copy of the caller's context so its call collectors see the request
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(
+                _get_executor(),
+                functools.partial(context.run, self.generate, prompt, system_prompt, temperature, max_tokens)
+            )
+
+    async def agenerate_many(self, prompts: List[str], system_prompt: Optional[str] = None,
+                             temperature: float = 0.7, max_tokens: int = 2000) -> List[Dict[str, Any]]:
+        """Generate text for many prompts concurrently.
+
+        Args:
+            prompts: The prompts to send to the LLM.
+            system_prompt: Optional system prompt shared by all requests.
+            temperature: Controls randomness in the output (0.0 to 1.0).
+            max_tokens: Maximum number of tokens to generate.
+
+        Returns:
+            One generate() result per prompt, in input order. The usage of the
+            whole batch is logged; wrap the call in collect_llm_calls() to
+            keep the individual call records.
+        """
+        with collect_llm_calls() as calls:
+            results = await asyncio.gather(*(
+                self.agenerate(prompt, system_prompt, temperature, max_tokens)
+                for prompt in prompts
+            ))
+        usage = summarize_llm_calls(calls)
+        logger.info(
+            f"Batch of {len(results)} {self.provider} requests: {usage['total_tokens']} tokens, "
+            f"max latency {usage['max_latency_s']:.2f}s, retries={usage['retries']}, cost={usage['cost_usd']}"
+        )
+        return results
+
+    def generate_many(self, prompts: List[str], system_prompt: Optional[str] = None,
+                      temperature: float = 0.7, max_tokens: int = 2000) -> List[Dict[str, Any]]:
+        """Synchronous wrapper around agenerate_many().
+
+        Must not be called from a running event loop; use agenerate_many() there.
         """
+        return asyncio.run(self.agenerate_many(prompts, system_prompt, temperature, max_tokens))
+
+    def queue_stats(self) -> Dict[str, int]:
+        """Return active and queued request counts for this provider on the running loop."""
         try:
-            if self.provider == "google":
-                return self._generate_google(prompt, system_prompt, temperature, max_tokens)
-            elif self.provider == "openai":
-                return self._generate_openai(prompt, system_prompt, temperature, max_tokens)
-            elif self.provider == "anthropic":
-                return self._generate_anthropic(prompt, system_prompt, temperature, max_tokens)
-            else:
-                return {"success": False, "error": f"Unsupported provider: {self.provider}"}
-        except Exception as e:
-            logger.error(f"Error generating text: {str(e)}")
-            return {"success": False, "error": str(e)}
+            limiter = _limiters.get(asyncio.get_running_loop(), {}).get(self.provider)
+        except RuntimeError:
+            limiter = None
+        if limiter is None:
+            return {"active": 0, "queued": 0, "max_concurrency": self.max_concurrency}
+        return {"active": limiter.active, "queued": limiter.queued, "max_concurrency": limiter.max_concurrency}
+
+    def _get_provider_client(self, **params: Any) -> Any:
+        """Get the provider client shared by this process."""
+        if self.provider == "google":
+            # get_llm keeps one client per parameter set for the whole process
+            from .prompts import get_llm
+            return get_llm(**params)
+        raise ValueError(f"No client available for provider: {self.provider}")
 
     def _generate_google(self, prompt: str, system_prompt: Optional[str],
                         temperature: float, max_tokens: int) -> Dict[str, Any]:
-        """Generate text using Google's PaLM API."""
-        # This is a placeholder for the actual Google PaLM API implementation
-        # In a real implementation, you would use the Google PaLM API client
-
-        # For now, we'll simulate a response
-        logger.info("Simulating Google PaLM API response")
-
-        # Simulate a successful response
+        """Generate text using Google's Gemini API through the pooled client."""
+        # Free text: only planning requests a JSON response
+        llm = self._get_provider_client(temperature=temperature, max_output_tokens=max_tokens, json_output=False)
+
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        from .prompts import is_retryable_error
+        response = retry_llm_call(lambda: llm.invoke(messages), is_retryable_error)
+        content = response.content if hasattr(response, "content") else str(response)
+        if isinstance(content, list):
+            content = "".join(str(part) for part in content)
         return {
             "success": True,
-            "content": f"Simulated response to: {prompt}\n\nThis is a placeholder for the actual Google PaLM API response."
+            "content": content
         }
 
     def _generate_openai(self, prompt: str, system_prompt: Optional[str],
@@ -98,11 +304,14 @@ class LLMClient:
 
         # For now, we'll simulate a response
         logger.info("Simulating OpenAI API response")
+        timer = LLMCallTimer(model="simulated", provider="openai")
 
         # Simulate a successful response
+        content = f"Simulated response to: {prompt}\n\nThis is a placeholder for the actual OpenAI API response."
+        timer.finish(prompt_text=(system_prompt or "") + prompt, completion_text=content)
         return {
             "success": True,
-            "content": f"Simulated response to: {prompt}\n\nThis is a placeholder for the actual OpenAI API response."
+            "content": content
         }
 
     def _generate_anthropic(self, prompt: str, system_prompt: Optional[str],
@@ -113,11 +322,14 @@ class LLMClient:
 
         # For now, we'll simulate a response
         logger.info("Simulating Anthropic Claude API response")
+        timer = LLMCallTimer(model="simulated", provider="anthropic")
 
         # Simulate a successful response
+        content = f"Simulated response to: {prompt}\n\nThis is a placeholder for the actual Anthropic Claude API response."
+        timer.finish(prompt_text=(system_prompt or "") + prompt, completion_text=content)
         return {
             "success": True,
-            "content": f"Simulated response to: {prompt}\n\nThis is a placeholder for the actual Anthropic Claude API response."
+            "content": content
         }
 
     def parse_response(self, response: Dict[str, Any], expected_sections: List[str]) -> Dict[str, Any]:
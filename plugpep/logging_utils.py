@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Logging Policy for Protein Binder Design Pipeline
+
+Package modules only create loggers; handlers and levels are configured once,
+by configure_logging(), which AgentConfig calls with its debug flag. Records
+carry the workflow ID and step of the code that emitted them, set with
+workflow_context(). The console gets readable text and the log file gets
+one JSON object per line.
+
+Debug records can be sampled: with PLUGPEP_LOG_DEBUG_SAMPLE=N only every Nth
+record of each debug message is kept, which bounds the output of hot loops
+in batch runs. Hot paths log with %-style arguments so that nothing is
+formatted for records that are filtered out.
+"""
+
+import os
+import json
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .config import AgentConfig
+
+PACKAGE_LOGGER = "plugpep"
+
+# Name of the log file written to AgentConfig.log_dir
+LOG_FILENAME = "plugpep.log"
+
+# Keep one of every N records per debug message, overridable with PLUGPEP_LOG_DEBUG_SAMPLE
+DEFAULT_DEBUG_SAMPLE = 1
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(workflow_id)s/%(step)s] %(message)s"
+
+_workflow_id: contextvars.ContextVar[str] = contextvars.ContextVar("plugpep_workflow_id", default="-")
+_step: contextvars.ContextVar[str] = contextvars.ContextVar("plugpep_step", default="-")
+
+@contextmanager
+def workflow_context(workflow_id: Optional[str] = None, step: Optional[str] = None) -> Iterator[None]:
+    """Tag log records emitted inside the block with a workflow ID and/or step."""
+    tokens = []
+    if workflow_id is not None:
+        tokens.append((_workflow_id, _workflow_id.set(workflow_id)))
+    if step is not None:
+        tokens.append((_step, _step.set(step)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+class ContextFilter(logging.Filter):
+    """Adds the current workflow ID and step to each record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.workflow_id = _workflow_id.get()
+        record.step = _step.get()
+        return True
+
+class DebugSampler(logging.Filter):
+    """Keeps one of every `every` DEBUG records per message template."""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._counts: Dict[Tuple[str, Any], int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.DEBUG or self.every == 1:
+            return True
+        key = (record.name, record.msg)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % self.every == 0
+
+class JSONFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "workflow_id": getattr(record, "workflow_id", "-"),
+            "step": getattr(record, "step", "-"),
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+# Handlers installed by configure_logging, replaced on reconfiguration
+_handlers: list = []
+
+def configure_logging(config: "AgentConfig") -> None:
+    """Configure the package loggers from an agent configuration.
+
+    Sets the level of the plugpep logger (DEBUG when config.debug, otherwise
+    INFO, or PLUGPEP_LOG_LEVEL if set) and installs a console handler and a
+    JSON lines file handler in config.log_dir. Calling it again replaces the
+    handlers from the previous call. The root logger is left alone.
+
+    Args:
+        config: Agent configuration
+    """
+    level = os.getenv("PLUGPEP_LOG_LEVEL", "DEBUG" if config.debug else "INFO").upper()
+    sample = int(os.getenv("PLUGPEP_LOG_DEBUG_SAMPLE", DEFAULT_DEBUG_SAMPLE))
+
+    package_logger = logging.getLogger(PACKAGE_LOGGER)
+    for handler in _handlers:
+        package_logger.removeHandler(handler)
+        handler.close()
+    _handlers.clear()
+
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(TEXT_FORMAT))
+    _handlers.append(console)
+    if config.log_dir:
+        file_handler = logging.FileHandler(os.path.join(config.log_dir, LOG_FILENAME))
+        file_handler.setFormatter(JSONFormatter())
+        _handlers.append(file_handler)
+
+    for handler in _handlers:
+        handler.addFilter(ContextFilter())
+        handler.addFilter(DebugSampler(sample))
+        package_logger.addHandler(handler)
+    package_logger.setLevel(level)
+    # Records are handled here; do not duplicate them through root handlers
+    package_logger.propagate = False
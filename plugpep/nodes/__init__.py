@@ -8,10 +8,12 @@ from .orchestrator_node import agent_orchestrator
 from .extract_backbone_node import extract_backbone
 from .llm_node import llm_planning
 from .alphafold_retrieve_node import alphafold_retrieve
+from .fpocket_node import fpocket
 
 __all__ = [
     'agent_orchestrator',
     'extract_backbone',
     'llm_planning',
-    'alphafold_retrieve'
+    'alphafold_retrieve',
+    'fpocket'
 ]
@@ -8,14 +8,92 @@ from the AlphaFold database.
 
 import os
 import logging
-from typing import Dict, Any, Optional
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
 from ..agent_graph import AgentState
-from ..tools.alphafold_retrieve import fetch_alphafold_files
+from ..tools.alphafold_retrieve import fetch_alphafold_files, validate_uniprot_id
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Background downloads started before alphafold_retrieve runs,
+# keyed by UniProt ID and output directory
+_prefetches: Dict[Tuple[str, str], Future] = {}
+_prefetch_lock = threading.Lock()
+_prefetch_executor: Optional[ThreadPoolExecutor] = None
+
+def start_alphafold_prefetch(uniprot_id: str, output_dir: str) -> bool:
+    """Start fetching a structure in the background.
+
+    alphafold_retrieve picks up the download instead of starting its own when
+    it runs for the same UniProt ID and output directory.
+
+    Args:
+        uniprot_id: UniProt ID to fetch
+        output_dir: Directory to save files in
+
+    Returns:
+        True if a new download was started
+    """
+    global _prefetch_executor
+    if not validate_uniprot_id(uniprot_id):
+        return False
+    key = (uniprot_id, os.path.abspath(output_dir))
+    with _prefetch_lock:
+        if key in _prefetches:
+            return False
+        if _prefetch_executor is None:
+            _prefetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="alphafold-prefetch")
+        os.makedirs(output_dir, exist_ok=True)
+        # Run in a copy of the caller's context to keep its logging context
+        _prefetches[key] = _prefetch_executor.submit(
+            contextvars.copy_context().run, fetch_alphafold_files, uniprot_id=uniprot_id, output_dir=output_dir
+        )
+    logger.info(f"Started background AlphaFold fetch for {uniprot_id}")
+    return True
+
+def take_alphafold_prefetch(uniprot_id: str, output_dir: str) -> Optional[Future]:
+    """Remove and return the background download for a UniProt ID, if any."""
+    with _prefetch_lock:
+        return _prefetches.pop((uniprot_id, os.path.abspath(output_dir)), None)
+
+def _remove_prefetched_files(future: Future) -> None:
+    """Delete the files of a finished download that is no longer wanted."""
+    if future.cancelled():
+        return
+    result = future.result()
+    for key in ("pdb_path", "cif_path", "pae_path"):
+        path = result.get(key)
+        if path and os.path.exists(path):
+            os.remove(path)
+
+def discard_alphafold_prefetches(output_dir: str, keep: Optional[str] = None) -> int:
+    """Drop the background downloads into a directory, except one.
+
+    Pending downloads are cancelled; running ones are left to finish and
+    their files removed, so only the kept structure ends up in output_dir.
+
+    Args:
+        output_dir: Directory the downloads were started for
+        keep: UniProt ID whose download is kept for alphafold_retrieve
+
+    Returns:
+        Number of downloads discarded
+    """
+    output_dir = os.path.abspath(output_dir)
+    with _prefetch_lock:
+        doomed = [
+            key for key in _prefetches
+            if key[1] == output_dir and key[0] != keep
+        ]
+        futures = [_prefetches.pop(key) for key in doomed]
+    for (uniprot_id, _), future in zip(doomed, futures):
+        if not future.cancel():
+            future.add_done_callback(_remove_prefetched_files)
+        logger.info(f"Discarded background AlphaFold fetch for {uniprot_id}")
+    return len(futures)
+
 def alphafold_retrieve(state: AgentState) -> AgentState:
     """Retrieve protein structure from AlphaFold DB.
 
@@ -62,11 +140,16 @@ def alphafold_retrieve(state: AgentState) -> AgentState:
         output_dir = os.path.join(workflow_dir, "alphafold")
         os.makedirs(output_dir, exist_ok=True)
 
-        # Retrieve structure from AlphaFold
-        result = fetch_alphafold_files(
-            uniprot_id=uniprot_id,
-            output_dir=output_dir
-        )
+        # Retrieve structure from AlphaFold, reusing a download started during planning
+        prefetch = take_alphafold_prefetch(uniprot_id, output_dir)
+        if prefetch is not None:
+            logger.info(f"Waiting for background AlphaFold fetch of {uniprot_id}")
+            result = prefetch.result()
+        else:
+            result = fetch_alphafold_files(
+                uniprot_id=uniprot_id,
+                output_dir=output_dir
+            )
 
         # Update state with structure information
         return merge_state(state, {
@@ -77,6 +160,7 @@ def alphafold_retrieve(state: AgentState) -> AgentState:
                         "pdb_path": result.get("pdb_path"),
                         "cif_path": result.get("cif_path"),
                         "pae_path": result.get("pae_path"),
+                        "digests": result.get("digests"),
                         "confidence_score": result.get("confidence_score", 0.0),
                         "source": "alphafold"
                     }
@@ -5,15 +5,16 @@ Extract Backbone Node for Protein Binder Design Pipeline
 This module implements the extract_backbone node for backbone extraction.
 """
 
+import os
 import logging
 from typing import Dict, Any
 from pathlib import Path
 
 from .utils import update_node_state, save_json_result
 from ..agent_graph import AgentState
+from ..artifact_store import store_artifact
+from ..tools.compression import artifact_compression, compressed_path
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def extract_backbone(state: AgentState) -> AgentState:
@@ -35,16 +36,33 @@ def extract_backbone(state: AgentState) -> AgentState:
         output_dir = Path(workflow_dir) / "backbone"
         output_dir.mkdir(parents=True, exist_ok=True)
 
-        # Set output path for backbone PDB
-        output_path = str(output_dir / "backbone.pdb")
+        # Set output path for backbone PDB, compressed per PLUGPEP_ARTIFACT_COMPRESSION. A previous
+        # output may be a link into the artifact store, so it is removed rather than overwritten in place.
+        output_path = compressed_path(str(output_dir / "backbone.pdb"), artifact_compression())
+        if os.path.lexists(output_path):
+            os.remove(output_path)
+
+        # Optional selection and confidence trimming settings supplied with the workflow input
+        options = state.get("input", {}).get("backbone_options") or {}
 
         # Run backbone extraction using the tool
         from ..tools.extract_backbone import extract_backbone as extract_backbone_tool
-        result = extract_backbone_tool(pdb_path, output_path)
+        result = extract_backbone_tool(
+            pdb_path,
+            output_path,
+            plddt_threshold=options.get("plddt_threshold"),
+            min_segment_length=options.get("min_segment_length", 1),
+            max_segments=options.get("max_segments"),
+            chains=options.get("chains"),
+            residue_range=options.get("residue_range")
+        )
 
         if not result["success"]:
             raise Exception(f"Backbone extraction failed: {result['error']}")
 
+        # Deduplicate the backbone across workflows of the same target
+        backbone_digest = store_artifact(output_path)
+
         # Save results to file
         output_json = save_json_result(
             workflow_dir=workflow_dir,
@@ -53,13 +71,46 @@ def extract_backbone(state: AgentState) -> AgentState:
             filename="backbone.json"
         )
 
+        # Per-residue dihedrals and secondary structure of the extracted backbone
+        from ..tools.backbone_geometry import analyze_backbone
+        geometry = analyze_backbone(output_path)
+        if geometry["success"]:
+            geometry_json = save_json_result(
+                workflow_dir=workflow_dir,
+                node_name="backbone",
+                result=geometry,
+                filename="geometry.json"
+            )
+            secondary_structure = {
+                key: value for key, value in geometry["summary"].items()
+                if key != "sequence_ss"
+            }
+        else:
+            logger.warning(f"Backbone geometry analysis failed: {geometry['error']}")
+            geometry_json = None
+            secondary_structure = None
+
         # Update state with success and completed status
         state = update_node_state(
             state=state,
             node_name="extract_backbone",
             success=True,
             input_path=pdb_path,
-            output_path=output_path
+            output_path=output_path,
+            output_data={
+                "backbone_pdb": output_path,
+                "backbone_digest": backbone_digest,
+                "result_json": output_json,
+                "chains": result.get("chains"),
+                "residue_range": result.get("residue_range"),
+                "plddt_threshold": result.get("plddt_threshold"),
+                "residues_total": result.get("residues_total"),
+                "residues_kept": result.get("residues_kept"),
+                "kept_ranges": result.get("kept_ranges", []),
+                "trimmed_ranges": result.get("trimmed_ranges", []),
+                "geometry_json": geometry_json,
+                "secondary_structure": secondary_structure
+            }
         )
         state["steps"]["extract_backbone"]["status"] = "completed"
 
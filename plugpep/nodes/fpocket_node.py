@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+FPocket Node for Protein Binder Design Pipeline
+
+This module implements the fpocket node that detects binding pockets in the
+retrieved structure using the built-in alpha sphere pocket detector.
+"""
+
+import inspect
+import logging
+from pathlib import Path
+
+from .utils import update_node_state, save_json_result
+from ..agent_graph import AgentState
+
+logger = logging.getLogger(__name__)
+
+# Number of top-ranked pockets summarized in the state
+SUMMARY_POCKETS = 5
+
+def fpocket(state: AgentState) -> AgentState:
+    """Pocket detection node."""
+    logger.info("Running pocket detection")
+    workflow_dir = state["workflow_dir"]
+
+    try:
+        # Get the PDB file path from AlphaFold retrieve step
+        alphafold_output = state["steps"]["alphafold_retrieve"].get("output", {})
+        if not alphafold_output:
+            raise KeyError("No output found in alphafold_retrieve step")
+
+        pdb_path = alphafold_output.get("pdb_path")
+        if not pdb_path:
+            raise KeyError("No pdb_path found in alphafold_retrieve output")
+
+        # Run pocket detection using the tool
+        from ..tools.pocket_detection import detect_pockets, write_pocket_pdb
+
+        # Optional detection settings supplied with the workflow input
+        options = state.get("input", {}).get("pocket_options") or {}
+        if not isinstance(options, dict):
+            raise ValueError("pocket_options must be a dictionary")
+        allowed = set(inspect.signature(detect_pockets).parameters) - {"input_pdb"}
+        unknown = sorted(set(options) - allowed)
+        if unknown:
+            raise ValueError(
+                f"Unknown pocket_options: {', '.join(unknown)}; expected any of {', '.join(sorted(allowed))}"
+            )
+
+        result = detect_pockets(pdb_path, **options)
+
+        if not result["success"]:
+            raise Exception(f"Pocket detection failed: {result['error']}")
+
+        # Save ranked pockets and their sphere centres
+        output_json = save_json_result(
+            workflow_dir=workflow_dir,
+            node_name="pockets",
+            result=result,
+            filename="pockets.json"
+        )
+        pockets_pdb = write_pocket_pdb(
+            result["pockets"],
+            str(Path(workflow_dir) / "pockets" / "pockets.pdb")
+        )
+
+        # Keep only a compact summary of the best pockets in the state
+        top_pockets = [
+            {
+                "rank": pocket["rank"],
+                "score": pocket["score"],
+                "n_spheres": pocket["n_spheres"],
+                "mean_plddt": pocket["mean_plddt"],
+                "center": pocket["center"],
+                "residues": [f"{res['chain']}:{res['res_name']}{res['res_num']}" for res in pocket["residues"]]
+            }
+            for pocket in result["pockets"][:SUMMARY_POCKETS]
+        ]
+
+        state = update_node_state(
+            state=state,
+            node_name="fpocket",
+            success=True,
+            input_path=pdb_path,
+            output_path=output_json,
+            output_data={
+                "pockets_json": output_json,
+                "pockets_pdb": pockets_pdb,
+                "n_pockets": len(result["pockets"]),
+                "top_pockets": top_pockets
+            }
+        )
+        state["steps"]["fpocket"]["status"] = "completed"
+
+        logger.info(f"Pocket detection completed: {len(result['pockets'])} pockets")
+        return state
+
+    except Exception as e:
+        logger.error(f"Error in pocket detection: {str(e)}")
+        state = update_node_state(
+            state=state,
+            node_name="fpocket",
+            success=False,
+            error=str(e)
+        )
+        state["steps"]["fpocket"]["status"] = "failed"
+        return state
@@ -8,7 +8,7 @@ This module implements the LLM node for planning and report generation.
 import json
 import logging
 import re
-from typing import Dict, Any, List, Optional, cast
+from typing import Dict, Any, List, Optional, Callable, cast
 from pathlib import Path
 from datetime import datetime
 import os
@@ -18,14 +18,25 @@ from langchain.prompts import ChatPromptTemplate, PromptTemplate, HumanMessagePr
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
 
-from ..prompts import load_prompt, get_llm, get_planning_prompt
+from ..prompts import load_prompt, get_llm, get_llm_params, get_planning_prompt, is_retryable_error
+from ..prompts.registry import get_prompt_registry
+from ..llm_cache import get_llm_cache
+from ..llm_accounting import collect_llm_calls, summarize_llm_calls, retry_llm_call
+from ..utils.target_index import resolve_target, get_target_index
+from ..utils.query_cache import get_query_cache
+from ..utils.streaming_json import StreamingJSONParser
+from ..tools.alphafold_retrieve import validate_uniprot_id
 from .utils import update_node_state, save_json_result
 from ..agent_graph import AgentState
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# UniProt accession format (https://www.uniprot.org/help/accession_numbers)
+UNIPROT_ACCESSION_PATTERN = r'[OPQ][0-9][A-Z0-9]{3}[0-9]|[A-NR-Z][0-9]([A-Z][A-Z0-9]{2}[0-9]){1,2}'
+
+# Past queries at least this similar contribute speculative candidates
+SPECULATIVE_MIN_SIMILARITY = 0.5
+
 class ProteinIdentification(BaseModel):
     """Protein identification output schema."""
     uniprot_id: str = Field(description="UniProt ID of the target protein")
@@ -119,29 +130,51 @@ def get_response_text(response: Any) -> str:
         logger.error(f"Error extracting response text: {str(e)}")
         return str(response)
 
+def stream_response_text(
+    llm: Any,
+    prompt: Any,
+    on_field: Optional[Callable[[str, Any], None]] = None
+) -> str:
+    """Stream an LLM response, reporting top-level JSON fields as they complete.
+
+    Args:
+        llm: Chat model supporting stream()
+        prompt: Prompt messages
+        on_field: Called with (key, value) for each completed field of the response object
+
+    Returns:
+        Complete response text
+    """
+    parser = StreamingJSONParser()
+    for chunk in llm.stream(prompt):
+        content = getattr(chunk, "content", chunk)
+        if isinstance(content, list):
+            content = "".join(part if isinstance(part, str) else part.get("text", "") for part in content)
+        for key, value in parser.feed(content):
+            if on_field:
+                on_field(key, value)
+    return parser.text.strip()
+
 def clean_json_text(text: str) -> str:
     """Clean text to ensure it's valid JSON."""
     # Remove any leading/trailing whitespace
     text = text.strip()
-    logger.info(f"After strip: {text}")
 
     # If the text starts with a newline and quotes, remove them
     if text.startswith('\n'):
         text = text.lstrip('\n')
     if text.startswith('"') and text.endswith('"'):
         text = text[1:-1]
-    logger.info(f"After quote removal: {text}")
 
     # If the text contains escaped quotes, unescape them
     text = text.replace('\\"', '"')
-    logger.info(f"After quote unescaping: {text}")
 
     # Find the first '{' and last '}'
     start = text.find('{')
     end = text.rfind('}')
     if start != -1 and end != -1:
         text = text[start:end+1]
-    logger.info(f"After JSON extraction: {text}")
+    logger.debug("Cleaned JSON text: %s", text)
 
     return text
 
@@ -157,11 +190,9 @@ def parse_json_response(response_text: str) -> Dict[str, Any]:
     try:
         # Clean the response text
         cleaned_text = clean_json_text(response_text)
-        logger.info(f"Cleaned text: {cleaned_text}")
 
         # Parse JSON
         data = json.loads(cleaned_text)
-        logger.info(f"Parsed data: {data}")
 
         # Validate required fields
         required_fields = ["uniprot_id", "target_name", "target_description",
@@ -183,37 +214,69 @@ def parse_json_response(response_text: str) -> Dict[str, Any]:
 
         return response_data.dict()
     except json.JSONDecodeError as e:
-        logger.error(f"Error parsing JSON response: {str(e)}")
-        logger.error(f"Response text: {response_text}")
+        logger.error("Error parsing JSON response: %s", e)
+        logger.debug("Response text: %s", response_text)
         # Try to extract information using regex as fallback
-        uniprot_match = re.search(r'[OPQ][0-9][A-Z0-9]{3}[0-9]|[A-NR-Z][0-9]([A-Z][A-Z0-9]{2}[0-9]){1,2}', response_text)
+        uniprot_match = re.search(UNIPROT_ACCESSION_PATTERN, response_text)
         if uniprot_match:
-            uniprot_id = uniprot_match.group(0)
-            # For blood clotting queries, default to Factor X
-            if "prothrombin" in response_text.lower() or "thrombin" in response_text.lower():
-                return ProteinIdentification(
-                    uniprot_id="P00742",
-                    target_name="Coagulation factor X",
-                    target_description="Coagulation factor X (F10) is a vitamin K-dependent serine protease that plays a crucial role in blood coagulation. It specifically converts prothrombin (factor II) to thrombin by cleaving two peptide bonds, initiating the final common pathway of the coagulation cascade.",
-                    organism="Homo sapiens",
-                    confidence=0.95,
-                    validation_steps=[
-                        "Verify serine protease domain",
-                        "Confirm vitamin K-dependent gamma-carboxylation sites",
-                        "Check interaction sites with factor Va and prothrombin"
-                    ]
-                ).dict()
+            # Fall back to a known target mentioned in the response
+            resolved = resolve_target(response_text)
+            if resolved:
+                return resolved
         raise ValueError("Invalid JSON response from LLM")
     except Exception as e:
-        logger.error(f"Error parsing response: {str(e)}")
-        logger.error(f"Response text: {response_text}")
+        logger.error("Error parsing response: %s", e)
+        logger.debug("Response text: %s", response_text)
         raise
 
-def llm_planning(state: AgentState) -> AgentState:
+def speculative_candidates(query: str, limit: int = 2) -> List[str]:
+    """Guess likely UniProt IDs for a query before planning finishes.
+
+    Candidates come, in order, from accessions written in the query, phrase
+    matches in the target index at any confidence, and the results of the
+    most similar past queries. Guesses are only good for prefetching; the
+    planning result decides which one is used.
+
+    Args:
+        query: User query
+        limit: Maximum number of candidates
+
+    Returns:
+        Distinct valid UniProt IDs, most likely first
+    """
+    candidates = [match.group(0) for match in re.finditer(rf'\b(?:{UNIPROT_ACCESSION_PATTERN})\b', query)]
+    matches = sorted(
+        get_target_index().find_matches(query),
+        key=lambda match: (match["confidence"], len(match["phrase"])),
+        reverse=True
+    )
+    candidates.extend(match["uniprot_id"] for match in matches)
+    query_cache = get_query_cache()
+    if query_cache:
+        candidates.extend(
+            entry["result"].get("uniprot_id")
+            for _, entry in query_cache.nearest(query, limit=limit, min_similarity=SPECULATIVE_MIN_SIMILARITY)
+        )
+
+    unique: List[str] = []
+    for uniprot_id in candidates:
+        if uniprot_id and uniprot_id not in unique and validate_uniprot_id(uniprot_id):
+            unique.append(uniprot_id)
+    return unique[:limit]
+
+def llm_planning(
+    state: AgentState,
+    on_uniprot_id: Optional[Callable[[str], None]] = None
+) -> AgentState:
     """Generate a plan for target validation using LLM.
 
+    The response is streamed and parsed incrementally, so the UniProt ID is
+    known before the model has finished describing the target.
+
     Args:
         state: Current agent state containing the query
+        on_uniprot_id: Called with the UniProt ID as soon as a valid one
+            arrives in the streamed response, e.g. to start structure retrieval
 
     Returns:
         Updated agent state with planning results
@@ -240,49 +303,55 @@ def llm_planning(state: AgentState) -> AgentState:
         state["steps"]["llm_planning"]["error"] = error_msg
         return state
 
+    # Records of the LLM calls made by this step
+    llm_calls: List[Dict[str, Any]] = []
+
     try:
-        # First check for BCL-2 since it's our primary target
-        query_lower = query.lower()
-        if any(x in query_lower for x in ["bcl-2", "bcl2", "b-cell lymphoma 2", "bcl 2"]):
-            response_data = ProteinIdentification(
-                uniprot_id="P10415",
-                target_name="B-cell lymphoma 2",
-                target_description="BCL-2 is a key regulator of apoptosis that inhibits cell death",
-                organism="Homo sapiens",
-                confidence=1.0,
-                validation_steps=[
-                    "Check sequence identity",
-                    "Verify structure quality",
-                    "Assess binding interface"
-                ]
-            ).dict()
-        # Check for blood clotting queries
-        elif any(x in query_lower for x in ["prothrombin", "thrombin", "blood clotting", "coagulation"]):
-            response_data = ProteinIdentification(
-                uniprot_id="P00742",
-                target_name="Coagulation factor X",
-                target_description="Coagulation factor X (F10) is a vitamin K-dependent serine protease that plays a crucial role in blood coagulation. It specifically converts prothrombin (factor II) to thrombin by cleaving two peptide bonds, initiating the final common pathway of the coagulation cascade.",
-                organism="Homo sapiens",
-                confidence=0.95,
-                validation_steps=[
-                    "Verify serine protease domain",
-                    "Confirm vitamin K-dependent gamma-carboxylation sites",
-                    "Check interaction sites with factor Va and prothrombin"
-                ]
-            ).dict()
+        # Known targets are resolved from the local synonym index without the LLM
+        response_data = resolve_target(query)
+        if response_data:
+            logger.info("Resolved target locally via phrase '%s'", response_data["matched_phrase"])
         else:
+            # Rephrasings of earlier queries reuse their identification
+            query_cache = get_query_cache()
+            response_data = query_cache.lookup(query) if query_cache else None
+            if response_data:
+                logger.info("Reusing planning result of similar query '%s' (similarity %s)",
+                            response_data["matched_query"], response_data["similarity"])
+
+        if not response_data:
             # Generate planning prompt for other proteins
             prompt = get_planning_prompt(query)
 
-            # Get LLM instance
-            llm = get_llm()
-
-            # Get LLM response and ensure we have a string
-            response = llm.invoke(prompt)
-            logger.info(f"Raw LLM response: {response}")
-
-            response_text = get_response_text(response)
-            logger.info(f"Extracted response text: {response_text}")
+            # Identical requests are answered from the persistent response cache
+            llm_params = get_llm_params()
+            cache = get_llm_cache()
+            cache_key = cache.make_key(llm_params["model"], prompt, llm_params) if cache else None
+            response_text = cache.get(cache_key) if cache else None
+
+            from_cache = response_text is not None
+            if from_cache:
+                logger.info("Using cached LLM response")
+            else:
+                # Get LLM instance
+                llm = get_llm()
+
+                fields_reported: List[str] = []
+
+                def on_field(key: str, value: Any) -> None:
+                    fields_reported.append(key)
+                    if key == "uniprot_id" and on_uniprot_id and isinstance(value, str) and validate_uniprot_id(value):
+                        logger.info("UniProt ID %s received before end of response", value)
+                        on_uniprot_id(value)
+
+                # Stream the response, handing over the UniProt ID as soon as it arrives
+                with collect_llm_calls() as llm_calls:
+                    response_text = retry_llm_call(
+                        lambda: stream_response_text(llm, prompt, on_field=on_field),
+                        # A stream is only restarted before any field was handed over
+                        lambda e: not fields_reported and is_retryable_error(e)
+                    )
+                logger.debug("LLM response text: %s", response_text)
 
             if not response_text:
                 raise ValueError("Empty response from LLM")
@@ -290,10 +359,14 @@ def llm_planning(state: AgentState) -> AgentState:
             # Parse JSON response
             try:
                 response_data = parse_json_response(response_text)
-                logger.info(f"Parsed response data: {response_data}")
+                logger.info("Identified target %s (%s)", response_data["uniprot_id"], response_data["target_name"])
+                # Only responses that parse are worth replaying
+                if cache and not from_cache:
+                    cache.set(cache_key, response_text, model=llm_params["model"])
+                if query_cache:
+                    query_cache.add(query, response_data)
             except Exception as e:
-                logger.error(f"Error parsing JSON response: {str(e)}")
-                logger.error(f"Response text: {response_text}")
+                logger.error("Error parsing JSON response: %s", e)
                 raise
 
         # Save results
@@ -302,7 +375,10 @@ def llm_planning(state: AgentState) -> AgentState:
             node_name="llm_planning",
             output_path="planning",
             output_data=response_data,
-            success=True
+            success=True,
+            llm_calls=llm_calls,
+            llm_usage=summarize_llm_calls(llm_calls),
+            prompt_versions=get_prompt_registry().versions() if llm_calls else {}
         )
 
         return state
@@ -316,7 +392,9 @@ def llm_planning(state: AgentState) -> AgentState:
             output_path="planning",
             output_data={},
             success=False,
-            error=error_msg
+            error=error_msg,
+            llm_calls=llm_calls,
+            llm_usage=summarize_llm_calls(llm_calls)
         )
         state["steps"]["llm_planning"]["success"] = False
         state["steps"]["llm_planning"]["status"] = "failed"
@@ -338,6 +416,7 @@ def llm_report(state: AgentState) -> AgentState:
         # Get information from completed steps
         planning_output = state.get("steps", {}).get("llm_planning", {}).get("output", {})
         alphafold_output = state.get("steps", {}).get("alphafold_retrieve", {}).get("output", {})
+        pocket_output = state.get("steps", {}).get("fpocket", {}).get("output") or {}
         backbone_output = state.get("steps", {}).get("extract_backbone", {})
 
         # Create report structure
@@ -370,11 +449,20 @@ def llm_report(state: AgentState) -> AgentState:
                     },
                     "confidence_score": alphafold_output.get("confidence_score", 0.0)
                 },
+                "pocket_detection": {
+                    "n_pockets": pocket_output.get("n_pockets", 0),
+                    "top_pockets": pocket_output.get("top_pockets", []),
+                    "output_file": os.path.basename(pocket_output.get("pockets_json", ""))
+                },
                 "backbone_extraction": {
                     "input_file": os.path.basename(backbone_output.get("input_path", "")),
                     "output_file": os.path.basename(backbone_output.get("output_path", "")),
                     "status": backbone_output.get("status", "Unknown")
-                }
+                },
+                "llm_usage": summarize_llm_calls([
+                    call for info in state.get("steps", {}).values()
+                    for call in info.get("llm_calls") or []
+                ])
             },
             "recommendations": {
                 "next_steps": [
@@ -384,7 +472,6 @@ def llm_report(state: AgentState) -> AgentState:
                 ],
                 "improvements": [
                     "Add structure quality assessment",
-                    "Include binding site prediction",
                     "Consider multiple conformations"
                 ]
             },
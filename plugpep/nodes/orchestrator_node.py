@@ -5,24 +5,34 @@ Orchestrator Node for Protein Binder Design Pipeline
 This module implements the orchestrator node that manages the workflow execution.
 """
 
+import os
+import time
 import logging
 from typing import Dict, Any, List, Optional, Callable, cast, TYPE_CHECKING
 from datetime import datetime
 from ..agent_graph import AgentState, StepState
+from ..llm_accounting import summarize_llm_calls
+from ..journal import WorkflowJournal, journaling_enabled
+from ..registry import get_workflow_registry
+from ..logging_utils import workflow_context
 
 if TYPE_CHECKING:
     from .extract_backbone_node import extract_backbone
     from .llm_node import llm_planning
     from .alphafold_retrieve_node import alphafold_retrieve
+    from .fpocket_node import fpocket
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Number of likely targets whose structures are prefetched while planning runs,
+# overridable per workflow with input["speculative_prefetch"]; 0 disables it
+SPECULATIVE_PREFETCH = int(os.getenv("PLUGPEP_SPECULATIVE_PREFETCH", "0"))
+
 # Node function mapping - using string references to avoid circular imports
 NODE_FUNCTIONS = {
     "llm_planning": "llm_planning",
     "alphafold_retrieve": "alphafold_retrieve",
+    "fpocket": "fpocket",
     "extract_backbone": "extract_backbone",
     "llm_report": "llm_report"
 }
@@ -32,6 +42,7 @@ def get_next_step(current_step: str) -> Optional[str]:
     step_order = [
         "llm_planning",
         "alphafold_retrieve",
+        "fpocket",
         "extract_backbone",
         "llm_report"
     ]
@@ -61,12 +72,31 @@ def orchestrate_workflow(
     node_functions: Optional[Dict[str, str]] = None
 ) -> AgentState:
     """Orchestrate the workflow execution."""
+    # Tag every record logged during the run with the workflow ID
+    with workflow_context(workflow_id=state.get("workflow_id") or "-"):
+        return _run_workflow(state, end_node, node_functions)
+
+def _run_workflow(
+    state: AgentState,
+    end_node: Optional[str],
+    node_functions: Optional[Dict[str, str]]
+) -> AgentState:
+    """Run workflow steps from the current step until end_node or the last step."""
     if node_functions is None:
         node_functions = NODE_FUNCTIONS
 
     current_step = state.get("current_step", "llm_planning")
     logger.info(f"Starting workflow from step: {current_step}")
 
+    # Journal each step's changes, so a crashed run can be recovered with recover_state
+    journal = None
+    if state.get("workflow_dir") and journaling_enabled():
+        journal = WorkflowJournal(state["workflow_dir"])
+        journal.record_start(state)
+    registry = get_workflow_registry()
+    if registry:
+        registry.record_start(state)
+
     while True:
         if current_step == end_node:
             break
@@ -76,6 +106,7 @@ def orchestrate_workflow(
             break
 
         logger.info(f"Executing step: {current_step}")
+        started_at = time.time()
         try:
             # Import node function here to avoid circular imports
             if current_step == "extract_backbone":
@@ -87,6 +118,9 @@ def orchestrate_workflow(
             elif current_step == "alphafold_retrieve":
                 from .alphafold_retrieve_node import alphafold_retrieve
                 node_func = alphafold_retrieve
+            elif current_step == "fpocket":
+                from .fpocket_node import fpocket
+                node_func = fpocket
             elif current_step == "llm_report":
                 from .llm_node import llm_report
                 node_func = llm_report
@@ -96,7 +130,32 @@ def orchestrate_workflow(
                 module = __import__(f".{module_name}_node", fromlist=[module_name], package="plugpep.nodes")
                 node_func = getattr(module, module_name)
 
-            state = node_func(state)
+            with workflow_context(step=current_step):
+                workflow_dir = state.get("workflow_dir")
+                if (current_step == "llm_planning" and workflow_dir
+                        and get_next_step(current_step) == "alphafold_retrieve"
+                        and end_node != "alphafold_retrieve"):
+                    from .alphafold_retrieve_node import start_alphafold_prefetch, discard_alphafold_prefetches
+                    alphafold_dir = os.path.join(workflow_dir, "alphafold")
+
+                    # Speculatively fetch the likeliest targets while the LLM is busy
+                    n_candidates = int(state.get("input", {}).get("speculative_prefetch", SPECULATIVE_PREFETCH) or 0)
+                    if n_candidates > 0:
+                        from .llm_node import speculative_candidates
+                        for uniprot_id in speculative_candidates(state["input"].get("query", ""), limit=n_candidates):
+                            start_alphafold_prefetch(uniprot_id, alphafold_dir)
+
+                    # Start structure retrieval as soon as planning streams a UniProt ID
+                    state = node_func(
+                        state,
+                        on_uniprot_id=lambda uniprot_id: start_alphafold_prefetch(uniprot_id, alphafold_dir)
+                    )
+
+                    # Promote the download of the planned target and drop the others
+                    planned_id = (state["steps"].get("llm_planning", {}).get("output") or {}).get("uniprot_id")
+                    discard_alphafold_prefetches(alphafold_dir, keep=planned_id)
+                else:
+                    state = node_func(state)
         except Exception as e:
             logger.error(f"Error in step {current_step}: {str(e)}")
             state = merge_state(state, {
@@ -107,14 +166,35 @@ def orchestrate_workflow(
                     }
                 }
             })
+            if journal:
+                journal.record_step(current_step, state, next_step=current_step)
+            if registry:
+                registry.record_step(state, current_step, started_at, time.time())
             break
 
         next_step = get_next_step(current_step)
+        if journal:
+            journal.record_step(current_step, state, next_step=next_step)
+        if registry:
+            registry.record_step(state, current_step, started_at, time.time())
         if next_step is None:
             break
 
         current_step = next_step
 
+    # Workflow-wide LLM usage, aggregated over the per-step call records
+    if "logs" in state:
+        state["logs"]["llm_usage"] = summarize_llm_calls([
+            call for info in state.get("steps", {}).values()
+            for call in info.get("llm_calls") or []
+        ])
+
+    if journal:
+        journal.snapshot(state)
+        journal.close()
+    if registry:
+        registry.record_finish(state)
+
     return state
 
 def agent_orchestrator(state: AgentState) -> AgentState:
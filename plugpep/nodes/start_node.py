@@ -12,8 +12,6 @@ from typing import Dict, Any, cast
 from .utils import create_workflow_dirs, initialize_workflow_state, update_node_state
 from ..agent_graph import AgentState
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def start_workflow(state: Dict[str, Any]) -> AgentState:
@@ -3,15 +3,14 @@ Utility functions for node implementations.
 """
 
 import os
-import json
 import logging
 from typing import Dict, Any, Optional, cast
 from datetime import datetime
 from pathlib import Path
 from ..agent_graph import AgentState
+from ..serialization import dump, json_format
+from ..tools.compression import artifact_compression, compressed_path
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def update_node_state(
@@ -71,27 +70,32 @@ def save_json_result(
     workflow_dir: str,
     node_name: str,
     result: Dict[str, Any],
-    filename: str = "result.json"
+    filename: str = "result.json",
+    pretty: Optional[bool] = None
 ) -> str:
     """Save node results to a JSON file.
 
+    The file is compressed according to PLUGPEP_ARTIFACT_COMPRESSION, e.g.
+    to result.json.zst.
+
     Args:
         workflow_dir: Base workflow directory
         node_name: Name of the node
         result: Result data to save
         filename: Name of the output file
+        pretty: Indent the JSON; None for PLUGPEP_PRETTY_JSON
 
     Returns:
-        Path to the saved file
+        Path to the saved file, including any compression suffix
     """
     output_dir = Path(workflow_dir) / node_name
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    output_path = output_dir / filename
-    with open(output_path, "w") as f:
-        json.dump(result, f, indent=2)
+    output_path = compressed_path(str(output_dir / filename), artifact_compression())
+    # Results are always JSON, also when states are saved as msgpack
+    dump(result, output_path, format=json_format(), pretty=pretty)
 
-    return str(output_path)
+    return output_path
 
 def create_workflow_dirs(workflow_dir: str) -> None:
     """Create standard workflow directory structure.
@@ -102,6 +106,7 @@ def create_workflow_dirs(workflow_dir: str) -> None:
     dirs = [
         "input",
         "alphafold",
+        "pockets",
         "backbone",
         "llm"
     ]
@@ -119,6 +124,7 @@ def initialize_workflow_state() -> Dict[str, Any]:
         "steps": {
             "llm_planning": {"success": False, "error": None},
             "alphafold_retrieve": {"success": False, "error": None},
+            "fpocket": {"success": False, "error": None},
             "extract_backbone": {"success": False, "error": None},
             "llm_report": {"success": False, "error": None}
         },
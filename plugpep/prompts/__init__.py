@@ -1,95 +1,217 @@
 """Prompt templates and LLM configuration for the protein binder design pipeline."""
 
 import os
+import json
+import hashlib
+import threading
+from uuid import UUID
 from typing import Dict, Any, Optional, List
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import PromptTemplate
+from langchain_core.callbacks import BaseCallbackHandler
 from dotenv import load_dotenv
 
+from ..llm_accounting import LLMCallTimer, start_llm_call, finish_failed_llm_call
+from ..llm_cassette import CassetteLLM, cassette_settings, get_cassette
+from .registry import DEFAULT_FEW_SHOT, format_examples, get_prompt_registry
+
 # Load environment variables
 load_dotenv()
 
+# LLM clients shared by the whole process, keyed by parameters and API key
+_llm_pool: Dict[str, ChatGoogleGenerativeAI] = {}
+_llm_pool_lock = threading.Lock()
+
+# HTTP status codes of transient Gemini API errors: rate limits and server errors
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Whether a Gemini API error is transient and worth retrying with retry_llm_call()."""
+    for attribute in ("code", "status_code"):
+        code = getattr(error, attribute, None)
+        if isinstance(code, int):
+            return code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (TimeoutError, ConnectionError))
+
+class LLMAccountingHandler(BaseCallbackHandler):
+    """Records tokens, latency and retries of every call of a pooled client.
+
+    Attempts made inside retry_llm_call() are recorded as one call.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self._timers: Dict[UUID, LLMCallTimer] = {}
+        self._prompts: Dict[UUID, str] = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]],
+                            *, run_id: UUID, **kwargs: Any) -> None:
+        prompt_text = "".join(
+            str(getattr(message, "content", message)) for batch in messages for message in batch
+        )
+        with self._lock:
+            self._timers[run_id] = start_llm_call(self.model, provider="google", prompt_text=prompt_text)
+            self._prompts[run_id] = prompt_text
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        timer = self._timers.get(run_id)
+        if timer:
+            timer.token()
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            timer = self._timers.pop(run_id, None)
+            prompt_text = self._prompts.pop(run_id, "")
+        if timer is None:
+            return
+        prompt_tokens = completion_tokens = None
+        completion_text = ""
+        for generations in response.generations:
+            for generation in generations:
+                completion_text += generation.text
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    prompt_tokens = (prompt_tokens or 0) + usage.get("input_tokens", 0)
+                    completion_tokens = (completion_tokens or 0) + usage.get("output_tokens", 0)
+        timer.finish(prompt_tokens, completion_tokens, prompt_text=prompt_text, completion_text=completion_text)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            timer = self._timers.pop(run_id, None)
+            prompt_text = self._prompts.pop(run_id, "")
+        if timer:
+            finish_failed_llm_call(timer, error, prompt_text=prompt_text)
+
 def load_prompt(template_name: str) -> PromptTemplate:
     """Load a prompt template from the prompts directory.
 
+    Templates are compiled once per process by the prompt registry.
+
     Args:
         template_name: Name of the template file without extension
 
     Returns:
         PromptTemplate instance
     """
-    template_path = os.path.join(os.path.dirname(__file__), f"{template_name}.txt")
-    with open(template_path, "r") as f:
-        template = f.read()
-    return PromptTemplate(template=template, input_variables=["query"])
+    return get_prompt_registry().get(template_name).template
 
-def get_planning_prompt(query: str) -> List[Dict[str, str]]:
+def get_planning_prompt(query: str, n_examples: Optional[int] = None) -> List[Dict[str, str]]:
     """Generate a planning prompt for target validation.
 
+    Only the few-shot examples most relevant to the query are included.
+
     Args:
         query: User query about target protein
+        n_examples: Number of few-shot examples. Defaults to
+            PLUGPEP_FEW_SHOT_EXAMPLES or DEFAULT_FEW_SHOT.
 
     Returns:
         List of messages for the LLM
     """
-    template = load_prompt("planning")
-    formatted_template = template.format(query=query)
+    if n_examples is None:
+        n_examples = int(os.getenv("PLUGPEP_FEW_SHOT_EXAMPLES", DEFAULT_FEW_SHOT))
+    registry = get_prompt_registry()
+    examples = registry.examples("planning").select(query, n_examples)
     return [
         {
             "role": "system",
-            "content": """You are a protein identification expert specializing in enzymatic functions and molecular mechanisms.
-When given a query about a protein's function, you must:
-1. Focus on the specific enzymatic activity or molecular mechanism described
-2. Match the description to the most well-characterized protein with that exact function
-3. For enzymatic activities, identify the specific chemical reaction and substrate
-4. For receptor functions, identify the specific ligand and signaling pathway
-5. Always verify the UniProt ID is correct and active
-6. ALWAYS respond with valid JSON in the exact format shown in the examples
-
-IMPORTANT RULES:
-1. When a query mentions breaking down bacterial cell walls, this ALWAYS refers to Lysozyme C (P61626)
-2. When a query mentions bacterial cell wall degradation, this ALWAYS refers to Lysozyme C (P61626)
-3. When a query mentions peptidoglycan hydrolysis, this ALWAYS refers to Lysozyme C (P61626)
-4. When a query mentions converting prothrombin to thrombin, this ALWAYS refers to Coagulation factor X (P00742)
-5. When a query mentions blood clotting factors, use their canonical names (e.g., Factor X, not F10)
-6. NEVER suggest alternative proteins for these specific functions unless explicitly requested
-7. ALWAYS include validation steps specific to the protein's function
-8. ALWAYS format the response as a single JSON object with no additional text"""
+            "content": registry.get("planning_system").text.strip()
         },
         {
             "role": "user",
-            "content": formatted_template
+            "content": registry.get("planning").format(query=query, examples=format_examples(examples))
         }
     ]
 
+def get_llm_params(
+    model: str = "gemini-2.0-flash",
+    temperature: float = 0.0,  # Keep temperature at 0 for deterministic output
+    json_output: bool = True,
+    **kwargs: Any
+) -> Dict[str, Any]:
+    """Get the generation parameters used by get_llm.
+
+    Args:
+        model: Name of the Google model to use
+        temperature: Sampling temperature (0.0 for deterministic output)
+        json_output: Request a JSON object response, as planning does
+        **kwargs: Additional arguments to pass to ChatGoogleGenerativeAI
+
+    Returns:
+        Dictionary of model and generation parameters, without credentials
+    """
+    params = {
+        "model": model,
+        "temperature": temperature,
+        "convert_system_message_to_human": False,  # Keep system message separate
+        "top_p": 1.0,  # Use maximum precision
+        "top_k": 1,  # Only consider the most likely token
+        "max_output_tokens": 2048,
+    }
+    if json_output:
+        params["response_mime_type"] = "application/json"  # Request JSON response
+        params["response_format"] = {"type": "json_object"}  # Specify JSON object format
+    return {**params, **kwargs}
+
 def get_llm(
     model: str = "gemini-2.0-flash",
     temperature: float = 0.0,  # Keep temperature at 0 for deterministic output
+    json_output: bool = True,
     **kwargs: Any
-) -> ChatGoogleGenerativeAI:
+) -> Any:
     """Get an instance of the language model.
 
+    Instances are pooled per process: calls with the same parameters return
+    the same client, so its HTTP connections stay warm across requests.
+    Every call is measured by an LLMAccountingHandler.
+
+    When PLUGPEP_LLM_CASSETTE is set, the client is wrapped in a CassetteLLM
+    that records and replays exchanges (see plugpep.llm_cassette); replay
+    mode needs no API key.
+
     Args:
         model: Name of the Google model to use
         temperature: Sampling temperature (0.0 for deterministic output)
+        json_output: Request a JSON object response, as planning does
         **kwargs: Additional arguments to pass to ChatGoogleGenerativeAI
 
     Returns:
-        Configured ChatGoogleGenerativeAI instance
+        Configured ChatGoogleGenerativeAI instance, or a CassetteLLM
     """
+    params = get_llm_params(model=model, temperature=temperature, json_output=json_output, **kwargs)
+
+    settings = cassette_settings()
+    if settings:
+        llm = _get_pooled_llm(params) if settings["mode"] != "replay" else None
+        return CassetteLLM(
+            get_cassette(settings["path"]),
+            params,
+            llm=llm,
+            mode=settings["mode"],
+            latency=settings["latency"]
+        )
+    return _get_pooled_llm(params)
+
+def _get_pooled_llm(params: Dict[str, Any]) -> ChatGoogleGenerativeAI:
+    """Get the pooled client for a set of generation parameters."""
     google_api_key = os.getenv("GOOGLE_API_KEY")
     if not google_api_key:
         raise ValueError("GOOGLE_API_KEY not found in environment variables")
 
-    return ChatGoogleGenerativeAI(
-        model=model,
-        temperature=temperature,
-        google_api_key=google_api_key,
-        convert_system_message_to_human=False,  # Keep system message separate
-        top_p=1.0,  # Use maximum precision
-        top_k=1,  # Only consider the most likely token
-        max_output_tokens=2048,
-        response_mime_type="application/json",  # Request JSON response
-        response_format={"type": "json_object"},  # Specify JSON object format
-        **kwargs
-    )
+    pool_key = hashlib.sha256(
+        (json.dumps(params, sort_keys=True, default=str) + google_api_key).encode("utf-8")
+    ).hexdigest()
+
+    with _llm_pool_lock:
+        llm = _llm_pool.get(pool_key)
+        if llm is None:
+            llm = ChatGoogleGenerativeAI(
+                google_api_key=google_api_key,
+                callbacks=[LLMAccountingHandler(params["model"])],
+                # Retried by retry_llm_call(), which counts the attempts
+                max_retries=0,
+                **params
+            )
+            _llm_pool[pool_key] = llm
+    return llm
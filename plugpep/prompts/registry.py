@@ -0,0 +1,155 @@
+"""Registry of compiled prompt templates and few-shot examples.
+
+Templates are read from the prompts directory and compiled once per process.
+Each template is versioned by a hash of its source, so step records can tell
+which prompt produced a response. Few-shot examples live next to their
+template in <name>_examples.json, and only the examples most relevant to a
+query are included in a prompt instead of all of them.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+from langchain.prompts import PromptTemplate
+
+from ..utils.query_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+PROMPTS_DIR = os.path.dirname(__file__)
+
+# Few-shot examples per prompt, overridable with PLUGPEP_FEW_SHOT_EXAMPLES
+DEFAULT_FEW_SHOT = 2
+
+def content_version(text: str) -> str:
+    """Short content hash used as the version of a template or example set."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+class CompiledPrompt:
+    """A prompt template compiled once from its source file."""
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.text = text
+        self.version = content_version(text)
+        self.template = PromptTemplate.from_template(text)
+
+    def format(self, **kwargs: Any) -> str:
+        """Fill in the template variables."""
+        return self.template.format(**kwargs)
+
+class ExampleSelector:
+    """Picks the few-shot examples most similar to a query.
+
+    Examples are ranked by cosine similarity of TF-IDF character n-grams
+    between the query and each example's query, target name and target
+    description. Without scikit-learn, examples are taken in file order.
+    """
+
+    def __init__(self, examples: List[Dict[str, Any]]):
+        self.examples = examples
+        self.version = content_version(json.dumps(examples, sort_keys=True))
+        self._vectorizer = None
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    def _fit(self) -> bool:
+        """Fit the vectorizer on first use. Returns False if unavailable."""
+        if self._matrix is not None:
+            return True
+        try:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+        except ImportError:
+            logger.warning("scikit-learn is not installed; few-shot examples are not ranked")
+            return False
+        self._vectorizer = TfidfVectorizer(analyzer="char_wb", ngram_range=(3, 5), sublinear_tf=True)
+        self._matrix = self._vectorizer.fit_transform([
+            normalize_query(" ".join([
+                example["query"],
+                example["response"].get("target_name", ""),
+                example["response"].get("target_description", "")
+            ]))
+            for example in self.examples
+        ])
+        return True
+
+    def select(self, query: str, k: int) -> List[Dict[str, Any]]:
+        """Select the k examples most relevant to a query, most relevant first."""
+        if k <= 0 or not self.examples:
+            return []
+        with self._lock:
+            if not self._fit():
+                return self.examples[:k]
+            scores = (self._matrix @ self._vectorizer.transform([normalize_query(query)]).T).toarray().ravel()
+        # Stable sort keeps file order among equally relevant examples
+        order = sorted(range(len(self.examples)), key=lambda i: -scores[i])
+        return [self.examples[i] for i in order[:k]]
+
+def format_examples(examples: List[Dict[str, Any]]) -> str:
+    """Render few-shot examples as query and JSON response pairs."""
+    return "\n\n".join(
+        f'Query: "{example["query"]}"\n{json.dumps(example["response"], indent=2)}'
+        for example in examples
+    )
+
+class PromptRegistry:
+    """Loads, compiles and caches the prompt templates of a directory."""
+
+    def __init__(self, directory: str = PROMPTS_DIR):
+        self.directory = directory
+        self._prompts: Dict[str, CompiledPrompt] = {}
+        self._examples: Dict[str, ExampleSelector] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CompiledPrompt:
+        """Get the compiled template <name>.txt."""
+        prompt = self._prompts.get(name)
+        if prompt is None:
+            with self._lock:
+                prompt = self._prompts.get(name)
+                if prompt is None:
+                    with open(os.path.join(self.directory, f"{name}.txt"), "r") as f:
+                        prompt = CompiledPrompt(name, f.read())
+                    self._prompts[name] = prompt
+                    logger.info(f"Compiled prompt '{name}' version {prompt.version}")
+        return prompt
+
+    def examples(self, name: str) -> ExampleSelector:
+        """Get the few-shot examples of a template from <name>_examples.json."""
+        selector = self._examples.get(name)
+        if selector is None:
+            with self._lock:
+                selector = self._examples.get(name)
+                if selector is None:
+                    path = os.path.join(self.directory, f"{name}_examples.json")
+                    examples: List[Dict[str, Any]] = []
+                    if os.path.exists(path):
+                        with open(path, "r") as f:
+                            examples = json.load(f).get("examples", [])
+                    selector = self._examples[name] = ExampleSelector(examples)
+        return selector
+
+    def versions(self) -> Dict[str, str]:
+        """Versions of the templates and example sets loaded so far."""
+        versions = {name: prompt.version for name, prompt in self._prompts.items()}
+        versions.update({f"{name}_examples": selector.version for name, selector in self._examples.items()})
+        return versions
+
+    def clear(self) -> None:
+        """Forget all compiled templates, e.g. after editing prompt files."""
+        with self._lock:
+            self._prompts.clear()
+            self._examples.clear()
+
+_default_registry: Optional[PromptRegistry] = None
+
+def get_prompt_registry() -> PromptRegistry:
+    """Get the process-wide registry of the packaged prompts."""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = PromptRegistry()
+    return _default_registry
@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+Workflow Registry for Protein Binder Design Pipeline
+
+This module indexes workflow runs in a SQLite database as they progress: the
+workflow ID and directory, query, resolved UniProt ID and target, overall
+status and disk usage, and per-step status, error, timings and artifact
+paths, including the artifact store blobs each run links to and their sizes.
+Questions such as "which runs for P00742 failed at alphafold_retrieve
+last week" become a single indexed query instead of a walk over every state
+file.
+
+The registry is shared by concurrent processes (WAL mode). Registry errors
+are logged and never fail a workflow. Existing workflow directories can be
+imported from their state files.
+
+Command line interface:
+    python -m plugpep.registry list [--uniprot-id ID] [--status S] [--failed-step STEP] [--since 7d]
+    python -m plugpep.registry show WORKFLOW_ID
+    python -m plugpep.registry import DIR [DIR ...]
+
+The registry is configured from environment variables:
+    PLUGPEP_REGISTRY: set to "0", "false" or "off" to disable the registry
+    PLUGPEP_REGISTRY_PATH: database file path
+"""
+
+import os
+import re
+import sys
+import glob
+import time
+import sqlite3
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default registry location, overridable with PLUGPEP_REGISTRY_PATH
+DEFAULT_REGISTRY_PATH = os.path.join(Path.home(), ".cache", "plugpep", "workflows.sqlite")
+
+# State files looked for when importing workflow directories
+STATE_FILENAMES = ("state.json", "state.msgpack")
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS workflows (
+        workflow_id TEXT PRIMARY KEY,
+        workflow_dir TEXT,
+        query TEXT,
+        uniprot_id TEXT,
+        target_name TEXT,
+        status TEXT NOT NULL,
+        current_step TEXT,
+        error TEXT,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        size_bytes INTEGER
+    )""",
+    """CREATE TABLE IF NOT EXISTS steps (
+        workflow_id TEXT NOT NULL,
+        step TEXT NOT NULL,
+        status TEXT NOT NULL,
+        error TEXT,
+        started_at REAL,
+        finished_at REAL,
+        duration_s REAL,
+        PRIMARY KEY (workflow_id, step)
+    )""",
+    """CREATE TABLE IF NOT EXISTS artifacts (
+        workflow_id TEXT NOT NULL,
+        step TEXT NOT NULL,
+        path TEXT NOT NULL,
+        PRIMARY KEY (workflow_id, step, path)
+    )""",
+    """CREATE TABLE IF NOT EXISTS workflow_blobs (
+        workflow_id TEXT NOT NULL,
+        step TEXT NOT NULL,
+        digest TEXT NOT NULL,
+        size_bytes INTEGER NOT NULL,
+        PRIMARY KEY (workflow_id, step, digest)
+    )""",
+    "CREATE INDEX IF NOT EXISTS workflows_uniprot_id ON workflows (uniprot_id)",
+    "CREATE INDEX IF NOT EXISTS workflows_status ON workflows (status, updated_at)",
+    "CREATE INDEX IF NOT EXISTS workflows_updated_at ON workflows (updated_at)",
+    "CREATE INDEX IF NOT EXISTS steps_step_status ON steps (step, status)"
+)
+
+# Columns added after the first release, created in older databases on open
+MIGRATIONS = {
+    "size_bytes": "ALTER TABLE workflows ADD COLUMN size_bytes INTEGER"
+}
+
+def _step_status(info: Dict[str, Any]) -> str:
+    """Status of a step entry; entries that never ran are pending."""
+    if info.get("status"):
+        return info["status"]
+    if info.get("success"):
+        return "completed"
+    return "failed" if info.get("error") else "pending"
+
+def _artifact_paths(info: Dict[str, Any]) -> List[str]:
+    """File paths recorded by a step: its input and output paths and *_path outputs."""
+    paths = [info.get("input_path"), info.get("output_path")]
+    output = info.get("output")
+    if isinstance(output, dict):
+        paths += [value for key, value in output.items() if key.endswith("_path")]
+    return list(dict.fromkeys(p for p in paths if isinstance(p, str) and p))
+
+def _artifact_blobs(info: Dict[str, Any]) -> List[Tuple[str, int]]:
+    """Artifact store digests recorded by a step, with the sizes of their files.
+
+    AlphaFold files are recorded as output["digests"] keyed like their *_path
+    outputs, and the backbone as output["backbone_digest"].
+    """
+    output = info.get("output")
+    if not isinstance(output, dict):
+        return []
+    pairs = []
+    digests = output.get("digests")
+    if isinstance(digests, dict):
+        pairs += [(digest, output.get(f"{kind}_path")) for kind, digest in digests.items()]
+    pairs.append((output.get("backbone_digest"), output.get("backbone_pdb")))
+    blobs = []
+    for digest, path in pairs:
+        if not digest or not isinstance(path, str):
+            continue
+        try:
+            blobs.append((digest, os.lstat(path).st_size))
+        except OSError:
+            continue
+    return blobs
+
+def parse_duration(text: str) -> Optional[float]:
+    """Parse a duration such as "30m", "12h" or "7d" to seconds, or None if not a duration."""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhdw])", text.strip())
+    if not match:
+        return None
+    return float(match.group(1)) * {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}[match.group(2)]
+
+def parse_since(text: str) -> float:
+    """Parse a relative age such as "30m", "12h" or "7d", or a Unix time, to a Unix time."""
+    seconds = parse_duration(text)
+    if seconds is not None:
+        return time.time() - seconds
+    return float(text)
+
+def reclaimable_bytes(workflow_dir: str) -> int:
+    """Bytes freed by deleting a workflow directory.
+
+    Files with other hardlinks, e.g. into the artifact store, are not counted,
+    since deleting the directory does not free them. Symlinks are not followed.
+    """
+    total = 0
+    for root, dirs, files in os.walk(workflow_dir):
+        for name in files:
+            try:
+                st = os.lstat(os.path.join(root, name))
+            except OSError:
+                continue
+            if st.st_nlink == 1:
+                total += st.st_size
+    return total
+
+class WorkflowRegistry:
+    """SQLite index of workflow runs, steps and artifacts."""
+
+    def __init__(self, path: str = DEFAULT_REGISTRY_PATH):
+        """Open or create a registry.
+
+        Args:
+            path: Path to the SQLite database. Parent directories are created.
+        """
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(workflows)")}
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(statement)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection; the busy timeout serializes concurrent writers."""
+        conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _write(self, statements: List[tuple]) -> None:
+        """Run statements in one transaction, logging instead of raising on errors."""
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            logger.warning("Workflow registry write failed: %s", e)
+            return
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for sql, params in statements:
+                conn.execute(sql, params)
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            logger.warning("Workflow registry write failed: %s", e)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _workflow_statement(state: Dict[str, Any], status: str, now: float, current_step: Optional[str] = None) -> tuple:
+        planning = (state.get("steps") or {}).get("llm_planning") or {}
+        output = planning.get("output") or {}
+        errors = [info.get("error") for info in (state.get("steps") or {}).values() if info.get("error")]
+        return (
+            """INSERT INTO workflows
+               (workflow_id, workflow_dir, query, uniprot_id, target_name, status, current_step, error, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (workflow_id) DO UPDATE SET
+                   workflow_dir = excluded.workflow_dir, query = excluded.query,
+                   uniprot_id = COALESCE(excluded.uniprot_id, workflows.uniprot_id),
+                   target_name = COALESCE(excluded.target_name, workflows.target_name),
+                   status = excluded.status, current_step = excluded.current_step,
+                   error = excluded.error, updated_at = excluded.updated_at""",
+            (
+                state.get("workflow_id"), state.get("workflow_dir"), (state.get("input") or {}).get("query"),
+                output.get("uniprot_id"), output.get("target_name"), status, current_step or state.get("current_step"),
+                errors[-1] if errors else None, now, now
+            )
+        )
+
+    @staticmethod
+    def _step_statements(
+        workflow_id: str,
+        step: str,
+        info: Dict[str, Any],
+        started_at: Optional[float] = None,
+        finished_at: Optional[float] = None
+    ) -> List[tuple]:
+        duration = finished_at - started_at if started_at is not None and finished_at is not None else None
+        statements = [(
+            """INSERT INTO steps (workflow_id, step, status, error, started_at, finished_at, duration_s)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (workflow_id, step) DO UPDATE SET
+                   status = excluded.status, error = excluded.error,
+                   started_at = COALESCE(excluded.started_at, steps.started_at),
+                   finished_at = COALESCE(excluded.finished_at, steps.finished_at),
+                   duration_s = COALESCE(excluded.duration_s, steps.duration_s)""",
+            (workflow_id, step, _step_status(info), info.get("error"), started_at, finished_at, duration)
+        )]
+        statements += [
+            ("INSERT OR IGNORE INTO artifacts (workflow_id, step, path) VALUES (?, ?, ?)", (workflow_id, step, path))
+            for path in _artifact_paths(info)
+        ]
+        # Shared blobs are indexed with their sizes, so garbage collection never walks the store
+        statements.append(("DELETE FROM workflow_blobs WHERE workflow_id = ? AND step = ?", (workflow_id, step)))
+        statements += [
+            ("INSERT OR REPLACE INTO workflow_blobs (workflow_id, step, digest, size_bytes) VALUES (?, ?, ?, ?)",
+             (workflow_id, step, digest, size_bytes))
+            for digest, size_bytes in _artifact_blobs(info)
+        ]
+        return statements
+
+    def record_start(self, state: Dict[str, Any]) -> None:
+        """Register a workflow run as running."""
+        if state.get("workflow_id"):
+            self._write([self._workflow_statement(state, "running", time.time())])
+
+    def record_step(self, state: Dict[str, Any], step: str, started_at: float, finished_at: float) -> None:
+        """Record the outcome and timing of a step that ran.
+
+        Args:
+            state: Workflow state after the step
+            step: Step name
+            started_at: Unix time the step started
+            finished_at: Unix time the step finished
+        """
+        if not state.get("workflow_id"):
+            return
+        info = (state.get("steps") or {}).get(step) or {}
+        self._write(
+            [self._workflow_statement(state, "running", finished_at, current_step=step)]
+            + self._step_statements(state["workflow_id"], step, info, started_at, finished_at)
+        )
+
+    def record_finish(self, state: Dict[str, Any]) -> None:
+        """Mark a run as completed, or failed if any of its steps failed, and record its size."""
+        if not state.get("workflow_id"):
+            return
+        failed = any(_step_status(info) == "failed" for info in (state.get("steps") or {}).values())
+        statements = [self._workflow_statement(state, "failed" if failed else "completed", time.time())]
+        # Measured once, when the run stops writing, so garbage collection never rescans it
+        if state.get("workflow_dir") and os.path.isdir(state["workflow_dir"]):
+            statements.append(self._size_statement(state["workflow_id"], reclaimable_bytes(state["workflow_dir"])))
+        self._write(statements)
+
+    @staticmethod
+    def _size_statement(workflow_id: str, size_bytes: int) -> tuple:
+        return ("UPDATE workflows SET size_bytes = ? WHERE workflow_id = ?", (size_bytes, workflow_id))
+
+    def set_size(self, workflow_id: str, size_bytes: int) -> None:
+        """Record the disk usage of a run's directory."""
+        self._write([self._size_statement(workflow_id, size_bytes)])
+
+    def remove(self, workflow_ids: Iterable[str]) -> None:
+        """Remove runs, their steps, artifacts and blob links from the registry."""
+        statements = []
+        for workflow_id in workflow_ids:
+            statements += [
+                (f"DELETE FROM {table} WHERE workflow_id = ?", (workflow_id,))
+                for table in ("workflow_blobs", "artifacts", "steps", "workflows")
+            ]
+        if statements:
+            self._write(statements)
+
+    def index_state(self, state: Dict[str, Any], updated_at: Optional[float] = None) -> None:
+        """Index a complete state, e.g. loaded from an existing workflow directory.
+
+        Step timings are taken from logs["timestamps"] where available.
+        """
+        if not state.get("workflow_id"):
+            return
+        steps = state.get("steps") or {}
+        failed = any(_step_status(info) == "failed" for info in steps.values())
+        pending = any(_step_status(info) == "pending" for info in steps.values())
+        status = "failed" if failed else ("incomplete" if pending else "completed")
+        now = updated_at if updated_at is not None else time.time()
+        statements = [self._workflow_statement(state, status, now)]
+        timestamps = (state.get("logs") or {}).get("timestamps") or {}
+        for step, info in steps.items():
+            finished_at = None
+            if step in timestamps:
+                try:
+                    finished_at = datetime.fromisoformat(timestamps[step]).timestamp()
+                except (TypeError, ValueError):
+                    pass
+            statements += self._step_statements(state["workflow_id"], step, info, finished_at=finished_at)
+        self._write(statements)
+
+    def query(
+        self,
+        uniprot_id: Optional[str] = None,
+        status: Optional[str] = None,
+        failed_step: Optional[str] = None,
+        query_text: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: Optional[int] = 100
+    ) -> List[Dict[str, Any]]:
+        """Find workflow runs, most recently updated first.
+
+        Args:
+            uniprot_id: Resolved UniProt ID
+            status: Workflow status: running, completed, failed or incomplete
+            failed_step: Name of a step that failed
+            query_text: Substring of the query
+            since: Earliest last update, as a Unix time
+            until: Latest last update, as a Unix time
+            limit: Maximum number of runs; None for all
+
+        Returns:
+            Workflow rows as dictionaries
+        """
+        sql = "SELECT w.* FROM workflows w"
+        conditions: List[str] = []
+        params: List[Any] = []
+        if failed_step:
+            sql += " JOIN steps s ON s.workflow_id = w.workflow_id AND s.step = ? AND s.status = 'failed'"
+            params.append(failed_step)
+        for condition, value in (
+            ("w.uniprot_id = ?", uniprot_id),
+            ("w.status = ?", status),
+            ("w.query LIKE ?", f"%{query_text}%" if query_text else None),
+            ("w.updated_at >= ?", since),
+            ("w.updated_at <= ?", until)
+        ):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY w.updated_at DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        conn = self._connect()
+        try:
+            return [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def get(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        """Get a run with its steps and their artifacts, or None if unknown."""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM workflows WHERE workflow_id = ?", (workflow_id,)).fetchone()
+            if row is None:
+                return None
+            run = dict(row)
+            run["steps"] = [
+                dict(step) for step in
+                conn.execute("SELECT * FROM steps WHERE workflow_id = ? ORDER BY COALESCE(started_at, finished_at)", (workflow_id,))
+            ]
+            artifacts: Dict[str, List[str]] = {}
+            for step, path in conn.execute("SELECT step, path FROM artifacts WHERE workflow_id = ?", (workflow_id,)):
+                artifacts.setdefault(step, []).append(path)
+            for step in run["steps"]:
+                step["artifacts"] = artifacts.get(step["step"], [])
+            return run
+        finally:
+            conn.close()
+
+    def blob_links(self) -> Dict[str, Dict[str, int]]:
+        """Artifact store blobs each run links to.
+
+        Returns:
+            Dictionary mapping workflow IDs to the digests and sizes of their blobs
+        """
+        conn = self._connect()
+        try:
+            links: Dict[str, Dict[str, int]] = {}
+            for workflow_id, digest, size_bytes in conn.execute(
+                "SELECT workflow_id, digest, MAX(size_bytes) FROM workflow_blobs GROUP BY workflow_id, digest"
+            ):
+                links.setdefault(workflow_id, {})[digest] = size_bytes
+            return links
+        finally:
+            conn.close()
+
+    def import_workflow_dirs(self, roots: Iterable[str]) -> int:
+        """Index workflow directories from their state files.
+
+        Args:
+            roots: Workflow directories, or directories containing them
+
+        Returns:
+            Number of indexed workflows
+        """
+        from .serialization import load
+
+        count = 0
+        for root in roots:
+            candidates = [os.path.join(root, name) for name in STATE_FILENAMES]
+            candidates += [p for name in STATE_FILENAMES for p in glob.glob(os.path.join(root, "*", name))]
+            for path in candidates:
+                if not os.path.isfile(path):
+                    continue
+                try:
+                    state = load(path)
+                except (OSError, ValueError, ImportError) as e:
+                    logger.warning("Skipping unreadable state file %s: %s", path, e)
+                    continue
+                state.setdefault("workflow_dir", os.path.dirname(os.path.abspath(path)))
+                state.setdefault("workflow_id", os.path.basename(state["workflow_dir"]))
+                self.index_state(state, updated_at=os.path.getmtime(path))
+                if os.path.isdir(state["workflow_dir"]):
+                    self.set_size(state["workflow_id"], reclaimable_bytes(state["workflow_dir"]))
+                count += 1
+        return count
+
+_default_registry: Optional[WorkflowRegistry] = None
+
+def get_workflow_registry() -> Optional[WorkflowRegistry]:
+    """Get the process-wide workflow registry.
+
+    Returns:
+        The shared registry, or None if disabled or unavailable
+    """
+    global _default_registry
+    if os.getenv("PLUGPEP_REGISTRY", "1").lower() in ("0", "false", "off", "no"):
+        return None
+    if _default_registry is None:
+        try:
+            _default_registry = WorkflowRegistry(os.getenv("PLUGPEP_REGISTRY_PATH", DEFAULT_REGISTRY_PATH))
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("Workflow registry unavailable: %s", e)
+            return None
+    return _default_registry
+
+def _format_time(timestamp: Optional[float]) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp)) if timestamp else "-"
+
+def main():
+    """Command line interface for the workflow registry."""
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Query the workflow registry')
+    parser.add_argument('--db', default=os.getenv("PLUGPEP_REGISTRY_PATH", DEFAULT_REGISTRY_PATH),
+                        help='Path of the registry database')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    list_parser = commands.add_parser('list', help='List workflow runs, most recent first')
+    list_parser.add_argument('--uniprot-id', help='Resolved UniProt ID')
+    list_parser.add_argument('--status', choices=['running', 'completed', 'failed', 'incomplete'])
+    list_parser.add_argument('--failed-step', help='Only runs where this step failed')
+    list_parser.add_argument('--query', help='Substring of the query')
+    list_parser.add_argument('--since', help='Updated since, e.g. 12h, 7d or a Unix time')
+    list_parser.add_argument('--until', help='Updated until, e.g. 1d or a Unix time')
+    list_parser.add_argument('--limit', type=int, default=50)
+    list_parser.add_argument('--json', action='store_true', help='Print JSON instead of a table')
+
+    show_parser = commands.add_parser('show', help='Show a run with its steps and artifacts')
+    show_parser.add_argument('workflow_id')
+
+    import_parser = commands.add_parser('import', help='Index existing workflow directories')
+    import_parser.add_argument('dirs', nargs='+', help='Workflow directories or their parents')
+
+    args = parser.parse_args()
+    registry = WorkflowRegistry(args.db)
+
+    if args.command == 'list':
+        runs = registry.query(
+            uniprot_id=args.uniprot_id,
+            status=args.status,
+            failed_step=args.failed_step,
+            query_text=args.query,
+            since=parse_since(args.since) if args.since else None,
+            until=parse_since(args.until) if args.until else None,
+            limit=args.limit
+        )
+        if args.json:
+            print(json.dumps(runs, indent=2))
+            return 0
+        for run in runs:
+            print(f"{run['workflow_id']:<32} {run['status']:<10} {run['uniprot_id'] or '-':<10} "
+                  f"{_format_time(run['updated_at'])}  {(run['query'] or '')[:60]}")
+        return 0
+
+    if args.command == 'show':
+        run = registry.get(args.workflow_id)
+        if run is None:
+            print(f"Error: unknown workflow {args.workflow_id}")
+            return 1
+        print(json.dumps(run, indent=2))
+        return 0
+
+    count = registry.import_workflow_dirs(args.dirs)
+    print(f"Indexed {count} workflows into {args.db}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Workflow Retention and Garbage Collection for Protein Binder Design Pipeline
+
+Every run creates a workflow directory that is never cleaned up. This module
+deletes old workflow directories according to a retention policy:
+
+    max_age: delete runs last updated longer ago than this
+    max_bytes: delete the oldest runs until the rest fit in this many bytes
+    keep_last: never delete the N most recent runs of each target
+    keep_failed: keep failed runs this long for debugging, then delete them
+
+Candidates and their sizes come from the workflow registry, where each run's
+size is recorded when it finishes, so no directory tree is rescanned. Runs
+that are still running are never deleted. Deleting a directory only removes
+its own links to artifact store blobs; blobs are pruned afterwards once no
+workflow links to them any more, together with the named references that
+point at them, so the store does not grow without bound. Such files are
+downloaded again when a later run needs them. Under max_bytes, each blob that
+runs link to counts once toward the total, and is freed with the last run
+linking to it; the registry indexes these links and the blob sizes too.
+Directories created before the registry existed can be indexed first with
+    python -m plugpep.registry import DIR
+
+Command line interface:
+    python -m plugpep.retention [--max-age 30d] [--max-bytes 50G] [--keep-last 3] [--keep-failed 14d] [--dry-run]
+
+Default policies are configured from environment variables:
+    PLUGPEP_RETENTION_MAX_AGE: e.g. "30d"
+    PLUGPEP_RETENTION_MAX_BYTES: e.g. "50G"
+    PLUGPEP_RETENTION_KEEP_LAST: runs kept per target
+    PLUGPEP_RETENTION_KEEP_FAILED: e.g. "14d"
+"""
+
+import os
+import re
+import sys
+import time
+import shutil
+import logging
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, Tuple, Set
+
+from .artifact_store import ArtifactStore, get_artifact_store
+from .registry import WorkflowRegistry, get_workflow_registry, parse_duration, reclaimable_bytes
+
+logger = logging.getLogger(__name__)
+
+# Runs still marked as running without an update for this long are taken to
+# have crashed, and are treated like incomplete runs
+STALE_RUNNING_AGE = 7 * 86400
+
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+def parse_size(text: str) -> int:
+    """Parse a size such as "500M", "50G" or a number of bytes."""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?", text.strip(), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid size: {text}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+def _parse_seconds(text: str) -> float:
+    seconds = parse_duration(text)
+    if seconds is None:
+        raise ValueError(f"Invalid duration: {text}")
+    return seconds
+
+@dataclass
+class RetentionPolicy:
+    """Retention policy for workflow directories. Unset limits do not apply."""
+    max_age: Optional[float] = None  # seconds
+    max_bytes: Optional[int] = None
+    keep_last: Optional[int] = None  # runs per target
+    keep_failed: Optional[float] = None  # seconds
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        """Policy from the PLUGPEP_RETENTION_* environment variables."""
+        max_age = os.getenv("PLUGPEP_RETENTION_MAX_AGE")
+        max_bytes = os.getenv("PLUGPEP_RETENTION_MAX_BYTES")
+        keep_last = os.getenv("PLUGPEP_RETENTION_KEEP_LAST")
+        keep_failed = os.getenv("PLUGPEP_RETENTION_KEEP_FAILED")
+        return cls(
+            max_age=_parse_seconds(max_age) if max_age else None,
+            max_bytes=parse_size(max_bytes) if max_bytes else None,
+            keep_last=int(keep_last) if keep_last else None,
+            keep_failed=_parse_seconds(keep_failed) if keep_failed else None
+        )
+
+    def is_empty(self) -> bool:
+        return self.max_age is None and self.max_bytes is None and self.keep_failed is None
+
+def _is_deletable_dir(run: Dict[str, Any]) -> bool:
+    """Only delete real directories named after their workflow, never e.g. a home directory."""
+    workflow_dir = run.get("workflow_dir")
+    return bool(
+        workflow_dir
+        and os.path.basename(os.path.normpath(workflow_dir)) == run["workflow_id"]
+        and os.path.isdir(workflow_dir)
+        and not os.path.islink(workflow_dir)
+    )
+
+def _release_blobs(run: Dict[str, Any], blobs: Dict[str, Tuple[int, int]], links: Dict[str, int]) -> int:
+    """Drop a deleted run's links to shared blobs; returns the bytes of the blobs left without links."""
+    freed = 0
+    for digest in run.get("blobs", ()):
+        if digest in links:
+            links[digest] -= 1
+            if links[digest] == 0:
+                freed += blobs[digest][0]
+    return freed
+
+def _shared_blobs(blob_links: Dict[str, Dict[str, int]], exclude: Set[str]) -> Dict[str, Tuple[int, int]]:
+    """Size and number of linking runs of each blob, from WorkflowRegistry.blob_links()."""
+    blobs: Dict[str, Tuple[int, int]] = {}
+    for workflow_id, digests in blob_links.items():
+        if workflow_id in exclude:
+            continue
+        for digest, size_bytes in digests.items():
+            n_links = blobs[digest][1] if digest in blobs else 0
+            blobs[digest] = (size_bytes, n_links + 1)
+    return blobs
+
+def plan_deletions(
+    runs: List[Dict[str, Any]],
+    policy: RetentionPolicy,
+    now: Optional[float] = None,
+    blobs: Optional[Dict[str, Tuple[int, int]]] = None
+) -> List[Dict[str, Any]]:
+    """Choose the runs to delete under a policy.
+
+    Args:
+        runs: Registry rows of finished runs with a known size_bytes, and
+            optionally the digests of the shared blobs they link to as "blobs"
+        policy: Retention policy
+        now: Current Unix time
+        blobs: Shared blobs counted toward max_bytes, mapping digests to
+            their size and the number of registered runs linking to them
+
+    Returns:
+        Runs to delete, oldest first, each with a "reason"
+    """
+    now = time.time() if now is None else now
+    runs = sorted(runs, key=lambda run: run["updated_at"], reverse=True)
+
+    # The most recent runs of each target are always kept
+    protected = set()
+    if policy.keep_last:
+        seen: Dict[Any, int] = {}
+        for run in runs:
+            target = run.get("uniprot_id") or run.get("query")
+            seen[target] = seen.get(target, 0) + 1
+            if seen[target] <= policy.keep_last:
+                protected.add(run["workflow_id"])
+
+    deletions: Dict[str, str] = {}
+    retained_failed = set()
+    for run in runs:
+        if run["workflow_id"] in protected:
+            continue
+        age = now - run["updated_at"]
+        if run["status"] == "failed" and policy.keep_failed is not None:
+            if age > policy.keep_failed:
+                deletions[run["workflow_id"]] = "failed_expired"
+            else:
+                retained_failed.add(run["workflow_id"])
+        elif policy.max_age is not None and age > policy.max_age:
+            deletions[run["workflow_id"]] = "max_age"
+
+    if policy.max_bytes is not None:
+        blobs = blobs or {}
+        # Links left to each shared blob once the runs chosen so far are deleted
+        links = {digest: n_links for digest, (size, n_links) in blobs.items()}
+        for run in runs:
+            if run["workflow_id"] in deletions:
+                _release_blobs(run, blobs, links)
+        total = sum(run["size_bytes"] for run in runs if run["workflow_id"] not in deletions)
+        total += sum(blobs[digest][0] for digest, n_links in links.items() if n_links > 0)
+        # Oldest first, and failed runs within their retention period only when nothing else is left
+        candidates = sorted(
+            (run for run in runs if run["workflow_id"] not in deletions and run["workflow_id"] not in protected),
+            key=lambda run: (run["workflow_id"] in retained_failed, run["updated_at"])
+        )
+        for run in candidates:
+            if total <= policy.max_bytes:
+                break
+            deletions[run["workflow_id"]] = "max_bytes"
+            total -= run["size_bytes"] + _release_blobs(run, blobs, links)
+
+    return [
+        {**run, "reason": deletions[run["workflow_id"]]}
+        for run in reversed(runs) if run["workflow_id"] in deletions
+    ]
+
+def collect_garbage(
+    policy: RetentionPolicy,
+    registry: Optional[WorkflowRegistry] = None,
+    store: Optional[ArtifactStore] = None,
+    prune_artifacts: bool = True,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """Delete workflow directories according to a retention policy.
+
+    Args:
+        policy: Retention policy
+        registry: Workflow registry; None for the shared registry
+        store: Artifact store to prune; None for the shared store
+        prune_artifacts: Delete artifact store blobs no workflow links to any
+            more, and count the blobs workflows link to toward max_bytes
+        dry_run: Only report what would be deleted
+
+    Returns:
+        Dictionary containing:
+        - success: bool indicating if garbage collection ran
+        - deleted: Deleted runs with workflow_id, workflow_dir, size_bytes and reason
+        - freed_bytes: Bytes freed by deleting workflow directories
+        - remaining_bytes: Total size of the remaining finished runs and of
+          the blobs they link to, when counted toward max_bytes
+        - artifacts: Number of pruned blobs and their bytes
+        - error: error message if garbage collection failed
+    """
+    registry = registry or get_workflow_registry()
+    if registry is None:
+        return {"success": False, "deleted": [], "freed_bytes": 0, "remaining_bytes": 0,
+                "artifacts": None, "error": "Workflow registry is disabled"}
+
+    now = time.time()
+    runs = []
+    forgotten = []
+    for run in registry.query(limit=None):
+        if run["status"] == "running" and now - run["updated_at"] < STALE_RUNNING_AGE:
+            continue
+        if not run.get("workflow_dir") or not os.path.isdir(run["workflow_dir"]):
+            # Deleted by hand; drop it from the index
+            forgotten.append(run["workflow_id"])
+            continue
+        if run.get("size_bytes") is None:
+            # Runs that crashed or were indexed before sizes were recorded are measured once
+            run["size_bytes"] = reclaimable_bytes(run["workflow_dir"])
+            if not dry_run:
+                registry.set_size(run["workflow_id"], run["size_bytes"])
+        runs.append(run)
+    if forgotten and not dry_run:
+        registry.remove(forgotten)
+
+    store = (store or get_artifact_store()) if prune_artifacts else None
+    blobs = {}
+    if store is not None and policy.max_bytes is not None:
+        # Deleting a run frees shared blobs only with their last link, so they are counted separately;
+        # links of running runs are included, so their blobs are never counted as freed
+        blob_links = registry.blob_links()
+        blobs = _shared_blobs(blob_links, exclude=set(forgotten))
+        for run in runs:
+            run["blobs"] = list(blob_links.get(run["workflow_id"], {}))
+
+    deleted = []
+    for run in plan_deletions(runs, policy, now=now, blobs=blobs):
+        if not _is_deletable_dir(run):
+            logger.warning("Not deleting %s: not a directory named after workflow %s",
+                           run.get("workflow_dir"), run["workflow_id"])
+            continue
+        if not dry_run:
+            try:
+                shutil.rmtree(run["workflow_dir"])
+            except OSError as e:
+                logger.warning("Could not delete workflow directory %s: %s", run["workflow_dir"], e)
+                continue
+            registry.remove([run["workflow_id"]])
+        logger.info("%s workflow %s (%s, %d bytes)", "Would delete" if dry_run else "Deleted",
+                    run["workflow_id"], run["reason"], run["size_bytes"])
+        deleted.append({key: run[key] for key in ("workflow_id", "workflow_dir", "size_bytes", "reason")})
+
+    artifacts = None
+    if store is not None:
+        # In a dry run, blobs only linked from the runs above still have other links
+        artifacts = store.prune(keep_refs=False, dry_run=dry_run)
+
+    deleted_ids = {run["workflow_id"] for run in deleted}
+    links = {digest: n_links for digest, (size, n_links) in blobs.items()}
+    for run in runs:
+        if run["workflow_id"] in deleted_ids:
+            _release_blobs(run, blobs, links)
+    freed = sum(run["size_bytes"] for run in deleted)
+    remaining = sum(run["size_bytes"] for run in runs) - freed
+    remaining += sum(blobs[digest][0] for digest, n_links in links.items() if n_links > 0)
+    return {
+        "success": True,
+        "deleted": deleted,
+        "freed_bytes": freed,
+        "remaining_bytes": remaining,
+        "artifacts": artifacts,
+        "error": None
+    }
+
+def _format_bytes(size: int) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+def main():
+    """Command line interface for workflow garbage collection."""
+    import argparse
+    import json
+
+    defaults = RetentionPolicy.from_env()
+    parser = argparse.ArgumentParser(description='Delete old workflow directories according to a retention policy')
+    parser.add_argument('--max-age', type=_parse_seconds, default=defaults.max_age,
+                        help='Delete runs last updated longer ago than this, e.g. 30d')
+    parser.add_argument('--max-bytes', type=parse_size, default=defaults.max_bytes,
+                        help='Delete the oldest runs until the rest fit, e.g. 50G')
+    parser.add_argument('--keep-last', type=int, default=defaults.keep_last,
+                        help='Never delete the N most recent runs of each target')
+    parser.add_argument('--keep-failed', type=_parse_seconds, default=defaults.keep_failed,
+                        help='Keep failed runs this long, then delete them, e.g. 14d')
+    parser.add_argument('--no-prune-artifacts', action='store_true',
+                        help='Do not delete artifact store blobs no workflow links to any more')
+    parser.add_argument('--db', help='Path of the registry database')
+    parser.add_argument('--dry-run', action='store_true', help='Only print what would be deleted')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    policy = RetentionPolicy(
+        max_age=args.max_age,
+        max_bytes=args.max_bytes,
+        keep_last=args.keep_last,
+        keep_failed=args.keep_failed
+    )
+    if policy.is_empty():
+        parser.error('no retention limit given; use --max-age, --max-bytes or --keep-failed')
+
+    registry = WorkflowRegistry(args.db) if args.db else None
+    report = collect_garbage(policy, registry=registry, prune_artifacts=not args.no_prune_artifacts, dry_run=args.dry_run)
+    if not report["success"]:
+        print(f"Error: {report['error']}")
+        return 1
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+
+    verb = "Would delete" if args.dry_run else "Deleted"
+    for run in report["deleted"]:
+        print(f"{verb} {run['workflow_id']:<32} {run['reason']:<15} {_format_bytes(run['size_bytes'])}")
+    print(f"{verb} {len(report['deleted'])} workflows, {_format_bytes(report['freed_bytes'])}; "
+          f"{_format_bytes(report['remaining_bytes'])} remaining")
+    if report["artifacts"]:
+        print(f"{verb} {report['artifacts']['blobs']} artifact blobs, {_format_bytes(report['artifacts']['bytes'])}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+State and Result Serialization for Protein Binder Design Pipeline
+
+This module writes workflow states and node results with a pluggable
+backend: "orjson" for fast JSON, "msgpack" for compact binary files, or the
+standard library "json". Datetimes, dates, paths and numpy values are
+serialized natively by every backend; datetimes become ISO 8601 strings, as
+with the former DateTimeEncoder. Output is compact unless pretty-printing is
+requested, since indenting large states is a measurable cost in batches.
+
+Reading detects the format from the content, so files written with any
+backend can be loaded regardless of the current setting. Files are written
+atomically: to a temporary file in the same directory, renamed into place.
+Paths ending in a compression suffix such as .gz or .zst are compressed, and
+compressed files are decompressed transparently when loaded.
+
+The backend is configured from environment variables:
+    PLUGPEP_STATE_FORMAT: "orjson", "msgpack" or "json". Defaults to orjson
+        when installed, otherwise json. Paths ending in .msgpack or .mpk are
+        always written as msgpack.
+    PLUGPEP_PRETTY_JSON: set to "1" to indent JSON output
+"""
+
+import os
+import json
+import uuid
+import logging
+from datetime import date, datetime
+from pathlib import PurePath
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from .tools.compression import compress_bytes, decompress_bytes, detect_compression, split_compression_suffix
+
+logger = logging.getLogger(__name__)
+
+SERIALIZATION_FORMATS = ("orjson", "msgpack", "json")
+
+# File suffixes that select msgpack regardless of the configured format
+MSGPACK_SUFFIXES = (".msgpack", ".mpk")
+
+def _default(obj: Any) -> Any:
+    """Convert values the backends do not serialize themselves."""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, PurePath):
+        return str(obj)
+    # numpy scalars and arrays, without importing numpy
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+def json_format() -> str:
+    """The fastest available JSON backend."""
+    return "orjson" if orjson is not None else "json"
+
+def default_format() -> str:
+    """The configured serialization format."""
+    fmt = os.getenv("PLUGPEP_STATE_FORMAT", json_format()).lower()
+    if fmt not in SERIALIZATION_FORMATS:
+        raise ValueError(f"Unsupported serialization format: {fmt}")
+    return fmt
+
+def pretty_default() -> bool:
+    """Whether JSON output is indented by default."""
+    return os.getenv("PLUGPEP_PRETTY_JSON", "0").lower() in ("1", "true", "on", "yes")
+
+def detect_format(data: bytes) -> str:
+    """Detect the format of serialized data.
+
+    JSON documents start with a brace, bracket, quote, digit or literal after
+    optional whitespace; anything else is taken to be msgpack.
+
+    Returns:
+        "json" or "msgpack"
+    """
+    head = data.lstrip(b" \t\r\n\xef\xbb\xbf")[:1]
+    if not head or head in b'{["-0123456789tfn':
+        return "json"
+    return "msgpack"
+
+def dumps(obj: Any, format: Optional[str] = None, pretty: Optional[bool] = None) -> bytes:
+    """Serialize an object.
+
+    Args:
+        obj: Object to serialize
+        format: "orjson", "msgpack" or "json"; None for the configured default
+        pretty: Indent JSON output; None for the configured default. Ignored for msgpack.
+
+    Returns:
+        Serialized bytes
+    """
+    format = format or default_format()
+    pretty = pretty_default() if pretty is None else pretty
+    if format == "orjson":
+        if orjson is None:
+            raise ImportError("orjson is not installed")
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+    if format == "msgpack":
+        if msgpack is None:
+            raise ImportError("msgpack is not installed")
+        return msgpack.packb(obj, default=_default, use_bin_type=True)
+    if format == "json":
+        if pretty:
+            return json.dumps(obj, default=_default, indent=2).encode("utf-8")
+        return json.dumps(obj, default=_default, separators=(",", ":")).encode("utf-8")
+    raise ValueError(f"Unsupported serialization format: {format}")
+
+def loads(data: bytes, format: Optional[str] = None) -> Any:
+    """Deserialize data written by dumps.
+
+    Args:
+        data: Serialized bytes
+        format: "orjson", "msgpack" or "json"; None to detect from the content
+
+    Returns:
+        Deserialized object
+    """
+    format = format or detect_format(data)
+    if format == "msgpack":
+        if msgpack is None:
+            raise ImportError("msgpack is not installed; cannot read msgpack data")
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def format_for_path(path: str, format: Optional[str] = None) -> str:
+    """Resolve the format to write a file with: explicit, by suffix, or configured."""
+    if format:
+        return format
+    if split_compression_suffix(str(path))[0].lower().endswith(MSGPACK_SUFFIXES):
+        return "msgpack"
+    return default_format()
+
+def atomic_write(path: str, data: bytes, durable: bool = False) -> None:
+    """Replace a file atomically, so readers and crashes never see a partial file.
+
+    Args:
+        path: File path
+        data: New file content
+        durable: fsync the file and its directory, so the new content also
+            survives a power loss
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    # A unique name in the same directory, so the rename stays on one file system
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex[:12]}.tmp")
+    try:
+        with open(tmp_path, "xb") as f:
+            f.write(data)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if durable:
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def dump(
+    obj: Any,
+    path: str,
+    format: Optional[str] = None,
+    pretty: Optional[bool] = None,
+    durable: bool = False
+) -> None:
+    """Serialize an object to a file, atomically.
+
+    Args:
+        obj: Object to serialize
+        path: Output file path; a compression suffix, e.g. "result.json.zst",
+            compresses the file
+        format: "orjson", "msgpack" or "json"; None to choose by suffix or configuration
+        pretty: Indent JSON output; None for the configured default
+        durable: fsync the written file, see atomic_write
+    """
+    data = dumps(obj, format=format_for_path(path, format), pretty=pretty)
+    atomic_write(path, compress_bytes(data, detect_compression(path, sniff=False)), durable=durable)
+
+def load(path: str, format: Optional[str] = None) -> Any:
+    """Deserialize a file written by dump, detecting its format and compression.
+
+    Args:
+        path: Input file path
+        format: Format of the file; None to detect from the content
+
+    Returns:
+        Deserialized object
+    """
+    with open(path, "rb") as f:
+        return loads(decompress_bytes(f.read()), format=format)
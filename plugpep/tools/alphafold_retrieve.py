@@ -4,6 +4,11 @@ import json
 from typing import Dict, Any, Optional
 import logging
 
+from ..artifact_store import ArtifactStore, get_artifact_store, store_artifact
+from ..serialization import atomic_write
+from .compression import artifact_compression, compress_bytes, compressed_path, open_structure
+from ..utils.uniprot_index import get_uniprot_index, uniprot_backend
+
 logger = logging.getLogger(__name__)
 
 class AlphaFoldError(Exception):
@@ -46,20 +51,75 @@ def check_uniprot_exists(uniprot_id: str) -> bool:
     """
     Check if a UniProt ID exists in the AlphaFold database.
 
+    With the local UniProt backend no request is made; AlphaFold DB covers
+    Swiss-Prot, so entries of the offline index are assumed to have a model.
+
     Args:
         uniprot_id: UniProt ID to check
 
     Returns:
         True if exists, False otherwise
     """
+    if uniprot_backend() == "local":
+        return get_uniprot_index().exists(uniprot_id)
     url = f"https://alphafold.ebi.ac.uk/api/prediction/{uniprot_id}"
     response = requests.get(url)
     return response.status_code == 200
 
+def _fetch_file(
+    name: str,
+    path: str,
+    description: str,
+    store: Optional[ArtifactStore],
+    compression: Optional[str] = None
+) -> Optional[str]:
+    """
+    Download an AlphaFold DB file, or link it from the artifact store if stored before.
+
+    Args:
+        name: AlphaFold DB file name
+        path: Destination path
+        description: File description for error messages
+        store: Artifact store, or None
+        compression: Compression format of the saved file, or None
+
+    Returns:
+        SHA-256 digest of the file, or None without an artifact store
+    """
+    # Compressed and plain copies of a file are different artifacts
+    ref = compressed_path(name, compression)
+    digest = store.get_ref(ref) if store is not None else None
+    if digest:
+        logger.debug("Linking %s from the artifact store to: %s", ref, path)
+        try:
+            store.materialize(digest, path)
+            return digest
+        except FileNotFoundError:
+            # Pruned by garbage collection since the reference was read
+            logger.debug("%s was pruned from the artifact store", ref)
+
+    url = f"https://alphafold.ebi.ac.uk/files/{name}"
+    logger.debug("Fetching %s from: %s", description, url)
+    response = requests.get(url)
+    if response.status_code != 200:
+        error_msg = f"Failed to fetch {description}: {response.status_code} - {response.text}"
+        raise AlphaFoldError(error_msg)
+    # Replace rather than overwrite: the old file may be a link shared with other workflows
+    atomic_write(path, compress_bytes(response.content, compression))
+    logger.debug("Saved %s to: %s", description, path)
+
+    digest = store_artifact(path)
+    if digest:
+        store.set_ref(ref, digest)
+    return digest
+
 def fetch_alphafold_files(uniprot_id: str, output_dir: Optional[str] = None) -> Dict[str, Any]:
     """
     Fetch PDB, CIF, and PAE JSON files from AlphaFold database.
 
+    Files are compressed according to PLUGPEP_ARTIFACT_COMPRESSION, and the
+    returned paths carry the compression suffix, e.g. "P00533.pdb.zst".
+
     Args:
         uniprot_id: UniProt ID to fetch files for
         output_dir: Directory to save files in. If None, uses current directory.
@@ -70,72 +130,51 @@ def fetch_alphafold_files(uniprot_id: str, output_dir: Optional[str] = None) ->
         - pdb_path: Path to saved PDB file
         - cif_path: Path to saved CIF file
         - pae_path: Path to saved PAE JSON file
+        - digests: SHA-256 digests of the pdb, cif and pae files in the artifact store
         - confidence_score: Confidence score from PAE data
         - error: error message if fetch failed
     """
     try:
-        logger.info(f"Starting AlphaFold retrieval for UniProt ID: {uniprot_id}")
+        logger.debug("Starting AlphaFold retrieval for UniProt ID: %s", uniprot_id)
 
         # Validate UniProt ID
         if not validate_uniprot_id(uniprot_id):
             error_msg = f"Invalid UniProt ID format: {uniprot_id}"
-            logger.error(error_msg)
             raise InvalidUniProtIDError(error_msg)
 
-        # Check if UniProt ID exists
-        logger.info(f"Checking if UniProt ID exists in AlphaFold database: {uniprot_id}")
-        if not check_uniprot_exists(uniprot_id):
-            error_msg = f"UniProt ID not found in AlphaFold database: {uniprot_id}"
-            logger.error(error_msg)
-            raise UniProtIDNotFoundError(error_msg)
+        # Files of this model, keyed by their AlphaFold DB file names
+        files = {
+            "pdb": (f"AF-{uniprot_id}-F1-model_v4.pdb", f"{uniprot_id}.pdb", "PDB file"),
+            "cif": (f"AF-{uniprot_id}-F1-model_v4.cif", f"{uniprot_id}.cif", "CIF file"),
+            "pae": (f"AF-{uniprot_id}-F1-predicted_aligned_error_v4.json", f"{uniprot_id}_pae.json", "PAE JSON")
+        }
+
+        # Check if UniProt ID exists, unless the model is already in the artifact store
+        store = get_artifact_store()
+        compression = artifact_compression()
+        if store is None or not all(store.get_ref(compressed_path(name, compression)) for name, _, _ in files.values()):
+            logger.debug("Checking if UniProt ID exists in AlphaFold database: %s", uniprot_id)
+            if not check_uniprot_exists(uniprot_id):
+                error_msg = f"UniProt ID not found in AlphaFold database: {uniprot_id}"
+                raise UniProtIDNotFoundError(error_msg)
 
         # Create output directory if needed
         if output_dir is None:
             output_dir = os.path.join(os.getcwd(), "alphafold_output")
         os.makedirs(output_dir, exist_ok=True)
-        logger.info(f"Using output directory: {output_dir}")
-
-        # Fetch and save PDB file
-        pdb_url = f"https://alphafold.ebi.ac.uk/files/AF-{uniprot_id}-F1-model_v4.pdb"
-        logger.info(f"Fetching PDB file from: {pdb_url}")
-        pdb_response = requests.get(pdb_url)
-        if pdb_response.status_code != 200:
-            error_msg = f"Failed to fetch PDB file: {pdb_response.status_code} - {pdb_response.text}"
-            logger.error(error_msg)
-            raise AlphaFoldError(error_msg)
-        pdb_path = os.path.join(output_dir, f"{uniprot_id}.pdb")
-        with open(pdb_path, "w") as f:
-            f.write(pdb_response.text)
-        logger.info(f"Saved PDB file to: {pdb_path}")
-
-        # Fetch and save CIF file
-        cif_url = f"https://alphafold.ebi.ac.uk/files/AF-{uniprot_id}-F1-model_v4.cif"
-        logger.info(f"Fetching CIF file from: {cif_url}")
-        cif_response = requests.get(cif_url)
-        if cif_response.status_code != 200:
-            error_msg = f"Failed to fetch CIF file: {cif_response.status_code} - {cif_response.text}"
-            logger.error(error_msg)
-            raise AlphaFoldError(error_msg)
-        cif_path = os.path.join(output_dir, f"{uniprot_id}.cif")
-        with open(cif_path, "w") as f:
-            f.write(cif_response.text)
-        logger.info(f"Saved CIF file to: {cif_path}")
-
-        # Fetch and save PAE JSON
-        pae_url = f"https://alphafold.ebi.ac.uk/files/AF-{uniprot_id}-F1-predicted_aligned_error_v4.json"
-        logger.info(f"Fetching PAE JSON from: {pae_url}")
-        pae_response = requests.get(pae_url)
-        if pae_response.status_code != 200:
-            error_msg = f"Failed to fetch PAE JSON: {pae_response.status_code} - {pae_response.text}"
-            logger.error(error_msg)
-            raise AlphaFoldError(error_msg)
-        pae_path = os.path.join(output_dir, f"{uniprot_id}_pae.json")
-        with open(pae_path, "w") as f:
-            json.dump(pae_response.json(), f, indent=2)
-        logger.info(f"Saved PAE JSON to: {pae_path}")
+        logger.debug("Using output directory: %s", output_dir)
+
+        # Fetch and save the PDB, CIF and PAE files
+        paths = {}
+        digests = {}
+        for kind, (name, filename, description) in files.items():
+            paths[kind] = compressed_path(os.path.join(output_dir, filename), compression)
+            digests[kind] = _fetch_file(name, paths[kind], description, store, compression)
+        pdb_path, cif_path, pae_path = paths["pdb"], paths["cif"], paths["pae"]
 
         # Calculate confidence score from PAE data
-        pae_data = pae_response.json()
+        with open_structure(pae_path, "rb") as f:
+            pae_data = json.load(f)
         try:
             if isinstance(pae_data, dict) and "predicted_aligned_error" in pae_data:
                 pae_matrix = pae_data["predicted_aligned_error"]
@@ -146,27 +185,29 @@ def fetch_alphafold_files(uniprot_id: str, output_dir: Optional[str] = None) ->
                     confidence_score = 0.0  # Default if matrix structure is invalid
             else:
                 confidence_score = 0.0  # Default if expected keys not found
-            logger.info(f"Calculated confidence score: {confidence_score}")
+            logger.debug("Calculated confidence score: %s", confidence_score)
         except (TypeError, ValueError) as e:
-            logger.warning(f"Error calculating confidence score: {e}. Using default value.")
+            logger.warning("Error calculating confidence score: %s. Using default value.", e)
             confidence_score = 0.0
 
+        logger.info("Retrieved AlphaFold model for %s (confidence %.3f)", uniprot_id, confidence_score)
         return {
             "success": True,
             "pdb_path": pdb_path,
             "cif_path": cif_path,
             "pae_path": pae_path,
+            "digests": digests,
             "confidence_score": confidence_score
         }
 
     except (InvalidUniProtIDError, UniProtIDNotFoundError, AlphaFoldError) as e:
-        logger.error(f"AlphaFold retrieval failed: {str(e)}")
+        logger.error("AlphaFold retrieval failed: %s", e)
         return {
             "success": False,
             "error": str(e)
         }
     except Exception as e:
-        logger.error(f"Unexpected error during AlphaFold retrieval: {str(e)}")
+        logger.error("Unexpected error during AlphaFold retrieval: %s", e)
         return {
             "success": False,
             "error": f"Unexpected error: {str(e)}"
@@ -0,0 +1,419 @@
+import os
+import logging
+from typing import List, Optional, Dict, Any, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from .compression import open_structure
+
+logger = logging.getLogger(__name__)
+
+# Backbone atoms read per residue, in array order
+BACKBONE_ATOMS = ('N', 'CA', 'C', 'O')
+
+# DSSP electrostatic H-bond model: q1 * q2 * f in kcal/mol * Angstrom
+HBOND_COUPLING = 0.084 * 332.0
+HBOND_CUTOFF = -0.5
+
+# Residue pairs with CA atoms further apart than this cannot H-bond
+HBOND_CA_DISTANCE = 9.0
+
+# Maximum C(i-1)-N(i) distance for a peptide bond; longer means a chain break
+PEPTIDE_BOND_DISTANCE = 2.0
+
+# Number of residue pairs evaluated per energy chunk
+ENERGY_CHUNK_SIZE = 65536
+
+# Secondary structure classes used in the summary
+HELIX_CODES = {'H', 'G', 'I'}
+STRAND_CODES = {'E', 'B'}
+
+def read_backbone(input_pdb: str) -> Dict[str, np.ndarray]:
+    """
+    Read backbone atoms of the first model of a PDB file into per-residue arrays.
+
+    Missing atoms are filled with NaN coordinates.
+
+    Args:
+        input_pdb: Path to the input PDB file
+
+    Returns:
+        Dictionary containing chain, res_num, res_name arrays (R,) and a coords
+        array (R, 4, 3) with atoms in N, CA, C, O order
+    """
+    chains, res_nums, res_names, coords = [], [], [], []
+    current_key = None
+    with open_structure(input_pdb, 'r') as infile:
+        for line in infile:
+            if line.startswith(('ENDMDL', 'END')):
+                break
+            if not line.startswith('ATOM'):
+                continue
+            atom_name = line[12:16].strip()
+            if atom_name not in BACKBONE_ATOMS:
+                continue
+            key = (line[21:22], int(line[22:26]), line[26:27])
+            if key != current_key:
+                current_key = key
+                chains.append(key[0])
+                res_nums.append(key[1])
+                res_names.append(line[17:20].strip())
+                coords.append(np.full((4, 3), np.nan))
+            coords[-1][BACKBONE_ATOMS.index(atom_name)] = (
+                float(line[30:38]), float(line[38:46]), float(line[46:54])
+            )
+
+    return {
+        "chain": np.asarray(chains),
+        "res_num": np.asarray(res_nums, dtype=int),
+        "res_name": np.asarray(res_names),
+        "coords": np.asarray(coords, dtype=float).reshape(-1, 4, 3)
+    }
+
+def dihedral_angles(p0: np.ndarray, p1: np.ndarray, p2: np.ndarray, p3: np.ndarray) -> np.ndarray:
+    """
+    Compute dihedral angles for arrays of four points.
+
+    Args:
+        p0, p1, p2, p3: Point coordinates, each (M, 3)
+
+    Returns:
+        Dihedral angles in degrees (M,)
+    """
+    b0 = p0 - p1
+    b1 = p2 - p1
+    b2 = p3 - p2
+    b1 = b1 / np.linalg.norm(b1, axis=1, keepdims=True)
+    v = b0 - np.einsum('ij,ij->i', b0, b1)[:, None] * b1
+    w = b2 - np.einsum('ij,ij->i', b2, b1)[:, None] * b1
+    x = np.einsum('ij,ij->i', v, w)
+    y = np.einsum('ij,ij->i', np.cross(b1, v), w)
+    return np.degrees(np.arctan2(y, x))
+
+def backbone_dihedrals(backbone: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Compute phi, psi and omega for all residues in one vectorized pass.
+
+    Angles that span a chain break or a chain end are NaN. Omega of residue i
+    is the CA(i)-C(i)-N(i+1)-CA(i+1) torsion.
+
+    Args:
+        backbone: Per-residue backbone arrays as returned by read_backbone
+
+    Returns:
+        Dictionary with phi, psi, omega arrays (R,) in degrees and a boolean
+        linked array (R,) marking residues peptide-bonded to the previous one
+    """
+    coords = backbone["coords"]
+    n = len(coords)
+    N, CA, C = coords[:, 0], coords[:, 1], coords[:, 2]
+
+    linked = np.zeros(n, dtype=bool)
+    if n > 1:
+        same_chain = backbone["chain"][1:] == backbone["chain"][:-1]
+        bond = np.linalg.norm(N[1:] - C[:-1], axis=1)
+        linked[1:] = same_chain & (bond < PEPTIDE_BOND_DISTANCE)
+
+    phi = np.full(n, np.nan)
+    psi = np.full(n, np.nan)
+    omega = np.full(n, np.nan)
+    if n > 1:
+        with np.errstate(invalid='ignore'):
+            phi[1:] = dihedral_angles(C[:-1], N[1:], CA[1:], C[1:])
+            psi[:-1] = dihedral_angles(N[:-1], CA[:-1], C[:-1], N[1:])
+            omega[:-1] = dihedral_angles(CA[:-1], C[:-1], N[1:], CA[1:])
+        phi[~linked] = np.nan
+        psi[:-1][~linked[1:]] = np.nan
+        omega[:-1][~linked[1:]] = np.nan
+
+    return {"phi": phi, "psi": psi, "omega": omega, "linked": linked}
+
+def amide_hydrogens(backbone: Dict[str, np.ndarray], linked: np.ndarray) -> np.ndarray:
+    """
+    Place amide hydrogens the DSSP way, opposite the previous carbonyl.
+
+    Residues without a donor hydrogen (chain starts and prolines) get NaN.
+
+    Args:
+        backbone: Per-residue backbone arrays as returned by read_backbone
+        linked: Residues peptide-bonded to the previous one
+
+    Returns:
+        Hydrogen coordinates (R, 3)
+    """
+    coords = backbone["coords"]
+    H = np.full((len(coords), 3), np.nan)
+    if len(coords) > 1:
+        co = coords[:-1, 2] - coords[:-1, 3]
+        H[1:] = coords[1:, 0] + co / np.linalg.norm(co, axis=1, keepdims=True)
+    H[~linked | (backbone["res_name"] == 'PRO')] = np.nan
+    return H
+
+def hbond_pairs(
+    backbone: Dict[str, np.ndarray],
+    linked: np.ndarray,
+    chunk_size: int = ENERGY_CHUNK_SIZE
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find backbone H-bonds using the DSSP electrostatic energy.
+
+    Candidate pairs come from a CA neighbour list, and energies are evaluated
+    in chunks to bound memory on large structures.
+
+    Args:
+        backbone: Per-residue backbone arrays as returned by read_backbone
+        linked: Residues peptide-bonded to the previous one
+        chunk_size: Number of residue pairs evaluated per chunk
+
+    Returns:
+        Tuple of (acceptor, donor) residue index arrays: the C=O of acceptor
+        is H-bonded to the N-H of donor
+    """
+    coords = backbone["coords"]
+    CA = coords[:, 1]
+    valid = ~np.isnan(CA).any(axis=1)
+    if valid.sum() < 2:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+    valid_idx = np.flatnonzero(valid)
+    pairs = cKDTree(CA[valid]).query_pairs(r=HBOND_CA_DISTANCE, output_type='ndarray')
+    pairs = valid_idx[pairs]
+    # Each unordered pair can H-bond in both directions
+    pairs = np.concatenate([pairs, pairs[:, ::-1]])
+    pairs = pairs[np.abs(pairs[:, 0] - pairs[:, 1]) > 1]
+
+    H = amide_hydrogens(backbone, linked)
+    acceptors, donors = [np.zeros(0, dtype=int)], [np.zeros(0, dtype=int)]
+    for start in range(0, len(pairs), chunk_size):
+        chunk = pairs[start:start + chunk_size]
+        acc, don = chunk[:, 0], chunk[:, 1]
+        C, O = coords[acc, 2], coords[acc, 3]
+        N, Hd = coords[don, 0], H[don]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            energy = HBOND_COUPLING * (
+                1.0 / np.linalg.norm(O - N, axis=1)
+                + 1.0 / np.linalg.norm(C - Hd, axis=1)
+                - 1.0 / np.linalg.norm(O - Hd, axis=1)
+                - 1.0 / np.linalg.norm(C - N, axis=1)
+            )
+        bonded = energy < HBOND_CUTOFF
+        acceptors.append(acc[bonded])
+        donors.append(don[bonded])
+
+    return np.concatenate(acceptors), np.concatenate(donors)
+
+def assign_secondary_structure(
+    backbone: Dict[str, np.ndarray],
+    linked: np.ndarray
+) -> np.ndarray:
+    """
+    Assign DSSP-like secondary structure codes per residue.
+
+    Codes follow DSSP: H (alpha helix), G (3-10 helix), I (pi helix),
+    E (strand), B (isolated bridge), T (H-bonded turn), S (bend) and '-'
+    (coil), with DSSP priority H > B/E > G > I > T > S.
+
+    Args:
+        backbone: Per-residue backbone arrays as returned by read_backbone
+        linked: Residues peptide-bonded to the previous one
+
+    Returns:
+        Array of one-character codes (R,)
+    """
+    n = len(backbone["coords"])
+    ss = np.full(n, '-', dtype='<U1')
+    if n < 3:
+        return ss
+
+    acc, don = hbond_pairs(backbone, linked)
+    hbond_keys = np.sort(acc * n + don)
+
+    def has_hbond(i: np.ndarray, j: np.ndarray) -> np.ndarray:
+        """Vectorized lookup of Hbond(i, j) for index arrays, False out of range."""
+        if len(hbond_keys) == 0:
+            return np.zeros(np.shape(i), dtype=bool)
+        inside = (i >= 0) & (i < n) & (j >= 0) & (j < n)
+        keys = np.where(inside, i * n + j, -1)
+        pos = np.searchsorted(hbond_keys, keys).clip(max=len(hbond_keys) - 1)
+        return inside & (hbond_keys[pos] == keys)
+
+    # Residues i..i+k must lie on one unbroken chain segment
+    segment = np.cumsum(~linked)
+
+    def contiguous(i: np.ndarray, k: int) -> np.ndarray:
+        j = np.clip(i + k, 0, n - 1)
+        return (i + k < n) & (segment[j] == segment[i])
+
+    idx = np.arange(n)
+    turns = {}
+    for k in (3, 4, 5):
+        turns[k] = has_hbond(idx, idx + k) & contiguous(idx, k)
+
+    # Helices: two consecutive k-turns at i-1 and i make residues i..i+k-1 helical
+    helix = {}
+    for k in (3, 4, 5):
+        start = np.zeros(n, dtype=bool)
+        start[1:] = turns[k][1:] & turns[k][:-1]
+        mask = np.zeros(n, dtype=bool)
+        for offset in range(k):
+            mask[offset:] |= start[:n - offset]
+        helix[k] = mask
+
+    # Bridge candidates are the residue pairs implied by each H-bond pattern
+    candidates = np.concatenate([
+        np.stack([acc + 1, don], axis=1),      # Hbond(i-1, j)
+        np.stack([don, acc + 1], axis=1),      # Hbond(j-1, i)
+        np.stack([acc, don], axis=1),          # Hbond(i, j)
+        np.stack([acc + 1, don - 1], axis=1)   # Hbond(i-1, j+1)
+    ])
+    candidates = np.sort(candidates, axis=1)
+    candidates = np.unique(candidates[candidates[:, 1] - candidates[:, 0] > 2], axis=0)
+    i, j = candidates[:, 0], candidates[:, 1]
+    parallel = (has_hbond(i - 1, j) & has_hbond(j, i + 1)) | (has_hbond(j - 1, i) & has_hbond(i, j + 1))
+    antiparallel = (has_hbond(i, j) & has_hbond(j, i)) | (has_hbond(i - 1, j + 1) & has_hbond(j - 1, i + 1))
+    bridged = parallel | antiparallel
+    bridge = np.zeros(n, dtype=bool)
+    bridge[i[bridged]] = True
+    bridge[j[bridged]] = True
+    ladder = np.zeros(n, dtype=bool)
+    ladder[1:] |= bridge[1:] & bridge[:-1] & linked[1:]
+    ladder[:-1] |= bridge[:-1] & bridge[1:] & linked[1:]
+
+    # Bends: CA(i-2)->CA(i) and CA(i)->CA(i+2) at more than 70 degrees
+    CA = backbone["coords"][:, 1]
+    bend = np.zeros(n, dtype=bool)
+    if n >= 5:
+        v1 = CA[2:-2] - CA[:-4]
+        v2 = CA[4:] - CA[2:-2]
+        with np.errstate(invalid='ignore'):
+            cos = np.einsum('ij,ij->i', v1, v2) / (np.linalg.norm(v1, axis=1) * np.linalg.norm(v2, axis=1))
+        bend[2:-2] = (cos < np.cos(np.radians(70.0))) & contiguous(idx[:-4], 4)
+
+    turn_residue = np.zeros(n, dtype=bool)
+    for k in (3, 4, 5):
+        for offset in range(1, k):
+            turn_residue[offset:] |= turns[k][:n - offset]
+
+    # Apply in reverse priority so higher-priority codes overwrite lower ones
+    ss[bend] = 'S'
+    ss[turn_residue] = 'T'
+    ss[helix[5]] = 'I'
+    ss[helix[3]] = 'G'
+    ss[bridge] = 'B'
+    ss[ladder] = 'E'
+    ss[helix[4]] = 'H'
+    return ss
+
+def _segments(chains: np.ndarray, res_nums: np.ndarray, mask: np.ndarray) -> List[Dict[str, Any]]:
+    """Collapse a residue mask into contiguous residue ranges per chain."""
+    segments: List[Dict[str, Any]] = []
+    for i in np.flatnonzero(mask):
+        last = segments[-1] if segments else None
+        if last is not None and mask[i - 1] and last["chain"] == chains[i]:
+            last["end"] = int(res_nums[i])
+            last["length"] += 1
+        else:
+            segments.append({"chain": str(chains[i]), "start": int(res_nums[i]), "end": int(res_nums[i]), "length": 1})
+    return segments
+
+def analyze_backbone(input_pdb: str) -> Dict[str, Any]:
+    """
+    Compute backbone dihedrals and secondary structure for a PDB file.
+
+    Args:
+        input_pdb: Path to the input PDB file
+
+    Returns:
+        Dictionary containing:
+        - success: bool indicating if the analysis was successful
+        - residues: Per-residue chain, res_num, res_name, phi, psi, omega and ss
+        - summary: Residue count, per-code counts, helix/strand/coil fractions
+          and helix/strand segments
+        - error: error message if the analysis failed
+    """
+    try:
+        if not os.path.exists(input_pdb):
+            raise FileNotFoundError(f"Input PDB file not found: {input_pdb}")
+
+        backbone = read_backbone(input_pdb)
+        n = len(backbone["coords"])
+        if n == 0:
+            raise ValueError("No backbone atoms found")
+
+        angles = backbone_dihedrals(backbone)
+        ss = assign_secondary_structure(backbone, angles["linked"])
+
+        def _angle(value: float) -> Optional[float]:
+            return None if np.isnan(value) else round(float(value), 2)
+
+        residues = [
+            {
+                "chain": str(backbone["chain"][i]),
+                "res_num": int(backbone["res_num"][i]),
+                "res_name": str(backbone["res_name"][i]),
+                "phi": _angle(angles["phi"][i]),
+                "psi": _angle(angles["psi"][i]),
+                "omega": _angle(angles["omega"][i]),
+                "ss": str(ss[i])
+            }
+            for i in range(n)
+        ]
+
+        is_helix = np.isin(ss, list(HELIX_CODES))
+        is_strand = np.isin(ss, list(STRAND_CODES))
+        codes, counts = np.unique(ss, return_counts=True)
+        summary = {
+            "n_residues": n,
+            "counts": {str(code): int(count) for code, count in zip(codes, counts)},
+            "helix_fraction": round(float(is_helix.mean()), 3),
+            "strand_fraction": round(float(is_strand.mean()), 3),
+            "coil_fraction": round(float(1.0 - is_helix.mean() - is_strand.mean()), 3),
+            "helix_segments": _segments(backbone["chain"], backbone["res_num"], ss == 'H'),
+            "strand_segments": _segments(backbone["chain"], backbone["res_num"], ss == 'E'),
+            "sequence_ss": "".join(ss)
+        }
+
+        return {
+            "success": True,
+            "residues": residues,
+            "summary": summary
+        }
+
+    except Exception as e:
+        error_msg = f"Failed to analyze backbone: {str(e)}"
+        logger.error(error_msg)
+        return {
+            "success": False,
+            "error": error_msg
+        }
+
+def main():
+    """Command line interface for analyze_backbone."""
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Compute backbone dihedrals and secondary structure')
+    parser.add_argument('input_pdb', help='Path to input PDB file')
+    parser.add_argument('-o', '--output', help='Path to output JSON file (optional)')
+
+    args = parser.parse_args()
+
+    result = analyze_backbone(args.input_pdb)
+    if not result["success"]:
+        print(f"Error: {result['error']}")
+        return 1
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+    summary = result["summary"]
+    print(f"Residues: {summary['n_residues']}")
+    print(f"Helix: {summary['helix_fraction']:.1%}  Strand: {summary['strand_fraction']:.1%}  "
+          f"Coil: {summary['coil_fraction']:.1%}")
+    print(summary["sequence_ss"])
+    return 0
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+import io
+import os
+import bz2
+import gzip
+import lzma
+from typing import IO, Optional, Tuple
+
+# File suffixes mapped to their compression format
+COMPRESSION_SUFFIXES = {
+    ".gz": "gzip",
+    ".bz2": "bz2",
+    ".xz": "xz",
+    ".zst": "zstd"
+}
+
+# Suffix appended to paths written with each compression format
+COMPRESSION_EXTENSIONS = {compression: suffix for suffix, compression in COMPRESSION_SUFFIXES.items()}
+
+# Leading bytes identifying each compression format
+MAGIC_BYTES = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd")
+)
+
+# gzip level used for writing; level 9 is several times slower for ~1% smaller files
+GZIP_LEVEL = 6
+
+# zstd level used for writing; the library default, faster than gzip at a better ratio
+ZSTD_LEVEL = 3
+
+# Formats artifacts can be written with, see artifact_compression
+ARTIFACT_COMPRESSIONS = ("gzip", "zstd")
+
+def _zstandard():
+    """Import the optional zstandard package."""
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstandard is required for .zst files; install it with 'pip install zstandard'")
+    return zstandard
+
+def artifact_compression() -> Optional[str]:
+    """
+    Compression format for workflow artifacts, from PLUGPEP_ARTIFACT_COMPRESSION.
+
+    Returns:
+        "gzip", "zstd" or None to write artifacts uncompressed (the default)
+    """
+    compression = os.getenv("PLUGPEP_ARTIFACT_COMPRESSION", "").lower()
+    if compression in ("", "0", "none", "off", "false", "no"):
+        return None
+    if compression not in ARTIFACT_COMPRESSIONS:
+        raise ValueError(f"Unsupported artifact compression: {compression}")
+    return compression
+
+def compressed_path(path: str, compression: Optional[str]) -> str:
+    """Append the suffix of a compression format to a path, e.g. "P00533.pdb" -> "P00533.pdb.zst"."""
+    if compression is None:
+        return path
+    return path + COMPRESSION_EXTENSIONS[compression]
+
+def compress_bytes(data: bytes, compression: Optional[str]) -> bytes:
+    """
+    Compress data in memory.
+
+    Output is deterministic, so identical content compresses to identical
+    files and is deduplicated by the artifact store.
+
+    Args:
+        data: Data to compress
+        compression: "gzip", "bz2", "xz", "zstd" or None to return data as is
+
+    Returns:
+        Compressed data
+    """
+    if compression is None:
+        return data
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    if compression == "bz2":
+        return bz2.compress(data)
+    if compression == "xz":
+        return lzma.compress(data)
+    if compression == "zstd":
+        return _zstandard().ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    raise ValueError(f"Unsupported compression: {compression}")
+
+def decompress_bytes(data: bytes) -> bytes:
+    """Decompress data in memory, detecting the format from its magic bytes; plain data is returned as is."""
+    for magic, compression in MAGIC_BYTES:
+        if data.startswith(magic):
+            with open_structure(io.BytesIO(data), "rb", compression=compression) as f:
+                return f.read()
+    return data
+
+def split_compression_suffix(path: str) -> Tuple[str, Optional[str]]:
+    """
+    Split a compression suffix off a path.
+
+    Args:
+        path: File path, e.g. "P00533.pdb.gz"
+
+    Returns:
+        Tuple of the path without the compression suffix and the suffix, e.g.
+        ("P00533.pdb", ".gz"). The suffix is None for uncompressed paths.
+    """
+    base, ext = os.path.splitext(path)
+    if ext.lower() in COMPRESSION_SUFFIXES:
+        return base, ext
+    return path, None
+
+def detect_compression(path: str, sniff: bool = True) -> Optional[str]:
+    """
+    Detect the compression format of a file.
+
+    The file suffix is checked first; if it does not name a format and sniff is
+    set, the leading bytes of an existing file are inspected.
+
+    Args:
+        path: File path
+        sniff: Inspect the file's magic bytes when the suffix is inconclusive
+
+    Returns:
+        "gzip", "bz2", "xz" or None for uncompressed files
+    """
+    _, suffix = split_compression_suffix(path)
+    if suffix is not None:
+        return COMPRESSION_SUFFIXES[suffix.lower()]
+    if sniff and os.path.isfile(path):
+        with open(path, "rb") as f:
+            head = f.read(6)
+        for magic, compression in MAGIC_BYTES:
+            if head.startswith(magic):
+                return compression
+    return None
+
+def open_structure(path: str, mode: str = "r", compression: Optional[str] = "infer") -> IO:
+    """
+    Open a structure file, transparently streaming compressed formats.
+
+    Supports gzip (.gz), bz2 (.bz2), xz (.xz) and, with the zstandard
+    package, zstd (.zst). Data is decompressed or compressed on the fly;
+    nothing is written to disk uncompressed. Seeking a compressed file in
+    read mode is supported but costs a forward decompress; zstd files can
+    only be seeked forward.
+
+    Args:
+        path: File path, or a binary file object when compression is given
+        mode: File mode as for open(), e.g. "r", "w", "rb", "wb"
+        compression: "gzip", "bz2", "xz", "zstd", None for plain files, or
+            "infer" to detect from the suffix (and magic bytes when reading)
+
+    Returns:
+        File object
+    """
+    if compression == "infer":
+        compression = detect_compression(path, sniff="r" in mode)
+
+    binary = "b" in mode
+    if compression is None:
+        return open(path, mode)
+
+    # Compressed streams default to binary; request text mode explicitly
+    stream_mode = mode if binary else mode.replace("t", "") + "t"
+    if compression == "gzip":
+        if "r" in mode:
+            return gzip.open(path, stream_mode)
+        # A fixed timestamp keeps the output deterministic, see compress_bytes
+        if isinstance(path, (str, os.PathLike)):
+            stream = gzip.GzipFile(path, stream_mode.replace("t", "b"), compresslevel=GZIP_LEVEL, mtime=0)
+        else:
+            stream = gzip.GzipFile(fileobj=path, mode=stream_mode.replace("t", "b"), compresslevel=GZIP_LEVEL, mtime=0)
+        return stream if binary else io.TextIOWrapper(stream)
+    if compression == "bz2":
+        return bz2.open(path, stream_mode)
+    if compression == "xz":
+        return lzma.open(path, stream_mode)
+    if compression == "zstd":
+        zstandard = _zstandard()
+        if "r" in mode:
+            return zstandard.open(path, stream_mode)
+        return zstandard.open(path, stream_mode, cctx=zstandard.ZstdCompressor(level=ZSTD_LEVEL))
+    raise ValueError(f"Unsupported compression: {compression}")
@@ -1,20 +1,167 @@
 import os
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, Iterable, Iterator
 
-def extract_backbone(input_pdb: str, output_pdb: Optional[str] = None) -> Dict[str, Any]:
+import numpy as np
+
+from .compression import open_structure, split_compression_suffix
+from .structure_index import iter_selected_records, parse_residue_range
+
+# Header records copied verbatim into the backbone file
+HEADER_RECORDS = ('REMARK', 'TITLE', 'EXPDTA', 'AUTHOR', 'REVDAT', 'JRNL', 'SEQRES')
+
+def _residue_key(line: str) -> Tuple[str, int, str]:
+    """Return the (chain, residue number, insertion code) key of an ATOM record."""
+    return (line[21:22], int(line[22:26]), line[26:27].strip())
+
+def _iter_file_records(input_pdb: str) -> Iterator[str]:
+    """Yield the lines of a PDB file up to and including the first END record."""
+    with open_structure(input_pdb, 'r') as infile:
+        for line in infile:
+            yield line
+            if line.startswith('END'):
+                break
+
+def read_residue_plddt(lines: Iterable[str]) -> Tuple[List[Tuple[str, int, str]], np.ndarray]:
+    """
+    Read per-residue pLDDT values from the B-factor column of PDB records.
+
+    AlphaFold writes the same pLDDT into every atom of a residue; the CA value
+    is used when present, otherwise the first atom of the residue.
+
+    Args:
+        lines (Iterable[str]): PDB record lines
+
+    Returns:
+        Tuple[List[Tuple[str, int, str]], np.ndarray]: Residue keys in file order
+        and their pLDDT values
+    """
+    keys: List[Tuple[str, int, str]] = []
+    values: List[float] = []
+    index: Dict[Tuple[str, int, str], int] = {}
+
+    for line in lines:
+        if not line.startswith('ATOM'):
+            if line.startswith('ENDMDL'):
+                break
+            continue
+        key = _residue_key(line)
+        bfactor = float(line[60:66])
+        if key not in index:
+            index[key] = len(keys)
+            keys.append(key)
+            values.append(bfactor)
+        elif line[12:16].strip() == 'CA':
+            values[index[key]] = bfactor
+
+    return keys, np.asarray(values, dtype=float)
+
+def find_confident_segments(
+    chains: np.ndarray,
+    res_nums: np.ndarray,
+    plddt: np.ndarray,
+    threshold: float,
+    min_segment_length: int = 1,
+    max_segments: Optional[int] = None
+) -> np.ndarray:
+    """
+    Select residues that belong to confident contiguous segments.
+
+    A segment is a run of residues on the same chain with consecutive residue
+    numbers and pLDDT >= threshold. Segments shorter than min_segment_length are
+    dropped, and if max_segments is given only the longest segments are kept.
+
+    Args:
+        chains (np.ndarray): Chain identifier per residue
+        res_nums (np.ndarray): Residue number per residue
+        plddt (np.ndarray): pLDDT per residue
+        threshold (float): Minimum pLDDT for a residue to be kept
+        min_segment_length (int): Minimum number of residues in a kept segment
+        max_segments (Optional[int]): Keep at most this many of the longest segments
+
+    Returns:
+        np.ndarray: Boolean mask over residues marking the kept residues
+    """
+    n = len(plddt)
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+
+    confident = plddt >= threshold
+
+    # A new run starts wherever the chain changes, numbering jumps or confidence flips
+    breaks = np.ones(n, dtype=bool)
+    breaks[1:] = (
+        (chains[1:] != chains[:-1])
+        | (np.diff(res_nums) > 1)
+        | (confident[1:] != confident[:-1])
+    )
+    run_ids = np.cumsum(breaks) - 1
+    run_lengths = np.bincount(run_ids)
+    run_confident = confident[breaks]
+
+    keep_run = run_confident & (run_lengths >= min_segment_length)
+    if max_segments is not None and keep_run.sum() > max_segments:
+        candidates = np.flatnonzero(keep_run)
+        # Stable sort so ties keep the earliest segments
+        order = np.argsort(-run_lengths[candidates], kind='stable')
+        keep_run = np.zeros_like(keep_run)
+        keep_run[candidates[order[:max_segments]]] = True
+
+    return keep_run[run_ids]
+
+def _mask_to_ranges(
+    keys: List[Tuple[str, int, str]],
+    mask: np.ndarray
+) -> List[Dict[str, Any]]:
+    """Collapse a residue mask into contiguous residue ranges per chain."""
+    ranges: List[Dict[str, Any]] = []
+    for i in np.flatnonzero(mask):
+        chain, res_num, _ = keys[i]
+        last = ranges[-1] if ranges else None
+        if (last is not None and last["chain"] == chain and mask[i - 1]
+                and 0 <= res_num - last["end"] <= 1):
+            last["end"] = res_num
+            last["length"] += 1
+        else:
+            ranges.append({"chain": chain, "start": res_num, "end": res_num, "length": 1})
+    return ranges
+
+def extract_backbone(
+    input_pdb: str,
+    output_pdb: Optional[str] = None,
+    plddt_threshold: Optional[float] = None,
+    min_segment_length: int = 1,
+    max_segments: Optional[int] = None,
+    chains: Optional[List[str]] = None,
+    residue_range: Optional[Tuple[int, int]] = None
+) -> Dict[str, Any]:
     """
     Extract backbone atoms (N, CA, C, O) from a PDB file.
 
+    Compressed input and output (.gz, .bz2, .xz) are streamed transparently.
+    When chains or residue_range is set, only the selected residues are read,
+    using the cached byte-offset index of the file (see structure_index).
+    When plddt_threshold is set, residues whose pLDDT (read from the B-factor
+    column) falls below it are dropped, and only confident contiguous segments
+    of at least min_segment_length residues are written.
+
     Args:
         input_pdb (str): Path to the input PDB file
-        output_pdb (Optional[str]): Path to the output PDB file. If None, will use input filename with '_backbone' suffix.
+        output_pdb (Optional[str]): Path to the output PDB file. If None, will use input filename with '_backbone' suffix
+            and the input's compression.
+        plddt_threshold (Optional[float]): Minimum pLDDT for a residue to be kept. If None, no trimming is done.
+        min_segment_length (int): Minimum length of a confident segment to be kept
+        max_segments (Optional[int]): Keep only this many of the longest confident segments
+        chains (Optional[List[str]]): Chain IDs to extract. If None, all chains are extracted.
+        residue_range (Optional[Tuple[int, int]]): Inclusive residue number range to extract
 
     Returns:
         Dict[str, Any]: A dictionary containing:
             - success (bool): Whether the operation was successful
             - output_pdb (str): Path to the output PDB file (if successful)
             - error (str): Error message (if unsuccessful)
+            - kept_ranges (list): Residue ranges written (if trimming was requested)
+            - trimmed_ranges (list): Residue ranges dropped (if trimming was requested)
     """
     # Initialize response dictionary
     response = {
@@ -30,8 +177,9 @@ def extract_backbone(input_pdb: str, output_pdb: Optional[str] = None) -> Dict[s
 
     # Set default output path if not provided
     if output_pdb is None:
-        base_name = os.path.splitext(input_pdb)[0]
-        output_pdb = f"{base_name}_backbone.pdb"
+        uncompressed, suffix = split_compression_suffix(input_pdb)
+        base_name = os.path.splitext(uncompressed)[0]
+        output_pdb = f"{base_name}_backbone.pdb{suffix or ''}"
 
     # Backbone atom names to keep
     backbone_atoms = {'N', 'CA', 'C', 'O'}
@@ -39,7 +187,7 @@ def extract_backbone(input_pdb: str, output_pdb: Optional[str] = None) -> Dict[s
     try:
         # First pass: validate PDB format
         has_valid_atom = False
-        with open(input_pdb, 'r') as infile:
+        with open_structure(input_pdb, 'r') as infile:
             for line in infile:
                 if line.startswith(('ATOM', 'HETATM')):
                     if len(line) >= 16:  # Minimum length for atom name field
@@ -50,16 +198,57 @@ def extract_backbone(input_pdb: str, output_pdb: Optional[str] = None) -> Dict[s
             response["error"] = "Invalid PDB format: no valid ATOM records found"
             return response
 
+        # Selected records are read through the index; otherwise the file is scanned
+        if chains is not None or residue_range is not None:
+            residue_range = tuple(residue_range) if residue_range is not None else None
+            records = list(iter_selected_records(input_pdb, chains=chains, residue_range=residue_range))
+            if not any(line.startswith(('ATOM', 'HETATM')) for line in records):
+                response["error"] = f"No residues match selection chains={chains} residue_range={residue_range}"
+                return response
+            response["chains"] = chains
+            response["residue_range"] = list(residue_range) if residue_range is not None else None
+            read_records = lambda: records
+        else:
+            read_records = lambda: _iter_file_records(input_pdb)
+
+        # Optional pass: select confident residues from the B-factor column
+        kept_residues = None
+        if plddt_threshold is not None:
+            keys, plddt = read_residue_plddt(read_records())
+            chain_ids = np.array([key[0] for key in keys])
+            res_nums = np.array([key[1] for key in keys], dtype=int)
+            mask = find_confident_segments(
+                chain_ids, res_nums, plddt,
+                threshold=plddt_threshold,
+                min_segment_length=min_segment_length,
+                max_segments=max_segments
+            )
+            if len(keys) and not mask.any():
+                response["error"] = (
+                    f"No confident segment of at least {min_segment_length} residues "
+                    f"with pLDDT >= {plddt_threshold}"
+                )
+                return response
+            kept_residues = {key for key, keep in zip(keys, mask) if keep}
+            response["plddt_threshold"] = plddt_threshold
+            response["min_segment_length"] = min_segment_length
+            response["residues_total"] = len(keys)
+            response["residues_kept"] = int(mask.sum())
+            response["kept_ranges"] = _mask_to_ranges(keys, mask)
+            response["trimmed_ranges"] = _mask_to_ranges(keys, ~mask)
+
         # Second pass: extract backbone atoms
-        with open(input_pdb, 'r') as infile, open(output_pdb, 'w') as outfile:
+        with open_structure(output_pdb, 'w') as outfile:
             # Copy header lines (REMARK, TITLE, etc.)
-            for line in infile:
-                if line.startswith(('REMARK', 'TITLE', 'EXPDTA', 'AUTHOR', 'REVDAT', 'JRNL', 'SEQRES')):
+            for line in read_records():
+                if line.startswith(HEADER_RECORDS):
                     outfile.write(line)
                 elif line.startswith('ATOM') or line.startswith('HETATM'):
                     # Check if this is a backbone atom
                     atom_name = line[12:16].strip()
                     if atom_name in backbone_atoms:
+                        if kept_residues is not None and _residue_key(line) not in kept_residues:
+                            continue
                         outfile.write(line)
                 elif line.startswith('END'):
                     outfile.write(line)
@@ -88,12 +277,28 @@ def main():
     parser = argparse.ArgumentParser(description='Extract backbone atoms from a PDB file')
     parser.add_argument('input_pdb', help='Path to input PDB file')
     parser.add_argument('-o', '--output', help='Path to output PDB file (optional)')
+    parser.add_argument('--plddt-threshold', type=float, help='Drop residues with pLDDT below this value')
+    parser.add_argument('--min-segment-length', type=int, default=1,
+                        help='Minimum length of a confident segment to keep (default: 1)')
+    parser.add_argument('--max-segments', type=int, help='Keep only the N longest confident segments')
+    parser.add_argument('--chains', help='Comma-separated chain IDs to extract (e.g. A,B)')
+    parser.add_argument('--residues', help='Residue range to extract (e.g. 100-160)')
 
     args = parser.parse_args()
 
-    result = extract_backbone(args.input_pdb, args.output)
+    result = extract_backbone(
+        args.input_pdb,
+        args.output,
+        plddt_threshold=args.plddt_threshold,
+        min_segment_length=args.min_segment_length,
+        max_segments=args.max_segments,
+        chains=args.chains.split(',') if args.chains else None,
+        residue_range=parse_residue_range(args.residues) if args.residues else None
+    )
     if result["success"]:
         print(f"Successfully extracted backbone to: {result['output_pdb']}")
+        for seg in result.get("trimmed_ranges", []):
+            print(f"Trimmed {seg['chain']}:{seg['start']}-{seg['end']} ({seg['length']} residues)")
         return 0
     else:
         print(f"Error: {result['error']}")
@@ -0,0 +1,299 @@
+import os
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Dict, Any, Tuple
+
+import numpy as np
+from scipy.spatial import Delaunay, cKDTree
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from .compression import open_structure
+
+logger = logging.getLogger(__name__)
+
+# Alpha sphere radius bounds in Angstrom (fpocket defaults)
+MIN_ALPHA_RADIUS = 3.4
+MAX_ALPHA_RADIUS = 6.2
+
+# Sphere centres closer than this are merged into the same pocket
+CLUSTER_DISTANCE = 2.5
+
+# Radius of the neighbourhood used to measure how buried a sphere is
+BURIEDNESS_RADIUS = 8.0
+
+# Elements counted as apolar when scoring pocket hydrophobicity
+APOLAR_ELEMENTS = {'C', 'S'}
+
+def read_heavy_atoms(input_pdb: str) -> Dict[str, np.ndarray]:
+    """
+    Read heavy protein atoms from the first model of a PDB file.
+
+    Args:
+        input_pdb: Path to the input PDB file
+
+    Returns:
+        Dictionary of per-atom arrays: coords (N, 3), chain, res_num, res_name,
+        atom_name, element and bfactor
+    """
+    coords, chains, res_nums, res_names, atom_names, elements, bfactors = [], [], [], [], [], [], []
+    with open_structure(input_pdb, 'r') as infile:
+        for line in infile:
+            if line.startswith(('ENDMDL', 'END')):
+                break
+            if not line.startswith('ATOM'):
+                continue
+            atom_name = line[12:16].strip()
+            element = line[76:78].strip() or atom_name[0]
+            if element.upper() == 'H':
+                continue
+            coords.append((float(line[30:38]), float(line[38:46]), float(line[46:54])))
+            chains.append(line[21:22])
+            res_nums.append(int(line[22:26]))
+            res_names.append(line[17:20].strip())
+            atom_names.append(atom_name)
+            elements.append(element.upper())
+            bfactors.append(float(line[60:66]) if len(line) >= 66 else 0.0)
+
+    return {
+        "coords": np.asarray(coords, dtype=float).reshape(-1, 3),
+        "chain": np.asarray(chains),
+        "res_num": np.asarray(res_nums, dtype=int),
+        "res_name": np.asarray(res_names),
+        "atom_name": np.asarray(atom_names),
+        "element": np.asarray(elements),
+        "bfactor": np.asarray(bfactors, dtype=float)
+    }
+
+def circumspheres(points: np.ndarray, simplices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the circumscribed spheres of tetrahedra in one batched solve.
+
+    Args:
+        points: Vertex coordinates (N, 3)
+        simplices: Vertex indices of each tetrahedron (M, 4)
+
+    Returns:
+        Tuple of sphere centres (M, 3) and radii (M,). Degenerate tetrahedra get
+        an infinite radius.
+    """
+    p = points[simplices]
+    edges = p[:, 1:] - p[:, :1]
+    rhs = 0.5 * np.einsum('mij,mij->mi', edges, edges)
+    det = np.linalg.det(edges)
+    valid = np.abs(det) > 1e-8
+
+    offsets = np.zeros((len(simplices), 3))
+    if valid.any():
+        offsets[valid] = np.linalg.solve(edges[valid], rhs[valid][..., None])[..., 0]
+    centres = p[:, 0] + offsets
+    radii = np.where(valid, np.linalg.norm(offsets, axis=1), np.inf)
+    return centres, radii
+
+def detect_pockets(
+    input_pdb: str,
+    min_radius: float = MIN_ALPHA_RADIUS,
+    max_radius: float = MAX_ALPHA_RADIUS,
+    min_spheres: int = 15,
+    min_buriedness: int = 45,
+    max_pockets: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Detect pockets in a protein structure using alpha spheres.
+
+    The heavy atoms are Delaunay-tessellated; the circumsphere of each
+    tetrahedron touches four atoms and contains none (an alpha sphere).
+    Spheres of pocket-like size whose centres are buried in the protein are
+    clustered by centre distance, and each cluster with at least min_spheres
+    spheres is reported as a pocket. Neighbour queries use a KD-tree.
+
+    Pockets are ranked by score, the number of spheres weighted by their mean
+    buriedness and apolar fraction.
+
+    Args:
+        input_pdb: Path to the input PDB file
+        min_radius: Minimum alpha sphere radius in Angstrom
+        max_radius: Maximum alpha sphere radius in Angstrom
+        min_spheres: Minimum number of alpha spheres in a pocket
+        min_buriedness: Minimum number of atoms within BURIEDNESS_RADIUS of a sphere centre
+        max_pockets: Report at most this many pockets. If None, all are reported.
+
+    Returns:
+        Dictionary containing:
+        - success: bool indicating if detection was successful
+        - pockets: Ranked list of pockets, each with rank, score, sphere count,
+          mean radius, buriedness, apolar fraction, mean pLDDT, centre,
+          residues and sphere centres/radii
+        - n_atoms: Number of heavy atoms used
+        - error: error message if detection failed
+    """
+    try:
+        if not os.path.exists(input_pdb):
+            raise FileNotFoundError(f"Input PDB file not found: {input_pdb}")
+
+        atoms = read_heavy_atoms(input_pdb)
+        coords = atoms["coords"]
+        if len(coords) < 4:
+            raise ValueError("Not enough heavy atoms for pocket detection")
+
+        tree = cKDTree(coords)
+        simplices = Delaunay(coords).simplices
+        centres, radii = circumspheres(coords, simplices)
+
+        # Keep pocket-sized spheres, then only those buried in the protein
+        keep = (radii >= min_radius) & (radii <= max_radius)
+        centres, radii, simplices = centres[keep], radii[keep], simplices[keep]
+        buriedness = tree.query_ball_point(centres, r=BURIEDNESS_RADIUS, return_length=True)
+        keep = buriedness >= min_buriedness
+        centres, radii, simplices, buriedness = centres[keep], radii[keep], simplices[keep], buriedness[keep]
+
+        pockets: List[Dict[str, Any]] = []
+        if len(centres):
+            # Single-linkage clustering of sphere centres
+            pairs = cKDTree(centres).query_pairs(r=CLUSTER_DISTANCE, output_type='ndarray')
+            graph = coo_matrix(
+                (np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])),
+                shape=(len(centres), len(centres))
+            )
+            _, labels = connected_components(graph, directed=False)
+            apolar = np.isin(atoms["element"], list(APOLAR_ELEMENTS))
+
+            for label in np.unique(labels):
+                members = np.flatnonzero(labels == label)
+                if len(members) < min_spheres:
+                    continue
+                contact_atoms = np.unique(simplices[members])
+                residues = sorted(
+                    {(str(c), int(r), str(n)) for c, r, n in zip(
+                        atoms["chain"][contact_atoms],
+                        atoms["res_num"][contact_atoms],
+                        atoms["res_name"][contact_atoms]
+                    )},
+                    key=lambda res: (res[0], res[1])
+                )
+                mean_buriedness = float(buriedness[members].mean())
+                apolar_fraction = float(apolar[contact_atoms].mean())
+                pockets.append({
+                    "score": round(len(members) * mean_buriedness / 100.0 * (0.5 + apolar_fraction), 3),
+                    "n_spheres": int(len(members)),
+                    "mean_radius": round(float(radii[members].mean()), 3),
+                    "buriedness": round(mean_buriedness, 2),
+                    "apolar_fraction": round(apolar_fraction, 3),
+                    "mean_plddt": round(float(atoms["bfactor"][contact_atoms].mean()), 2),
+                    "center": [round(float(x), 3) for x in centres[members].mean(axis=0)],
+                    "residues": [{"chain": c, "res_num": r, "res_name": n} for c, r, n in residues],
+                    "spheres": [
+                        [round(float(x), 3) for x in centre] + [round(float(radius), 3)]
+                        for centre, radius in zip(centres[members], radii[members])
+                    ]
+                })
+
+        pockets.sort(key=lambda pocket: pocket["score"], reverse=True)
+        if max_pockets is not None:
+            pockets = pockets[:max_pockets]
+        for rank, pocket in enumerate(pockets, start=1):
+            pocket["rank"] = rank
+
+        logger.info(f"Detected {len(pockets)} pockets in {input_pdb}")
+        return {
+            "success": True,
+            "pockets": pockets,
+            "n_atoms": int(len(coords))
+        }
+
+    except Exception as e:
+        error_msg = f"Failed to detect pockets: {str(e)}"
+        logger.error(error_msg)
+        return {
+            "success": False,
+            "pockets": [],
+            "error": error_msg
+        }
+
+def write_pocket_pdb(pockets: List[Dict[str, Any]], output_pdb: str) -> str:
+    """
+    Write pocket alpha sphere centres as pseudo-atoms, one residue per pocket.
+
+    The sphere radius is stored in the B-factor column, following the STP
+    convention of fpocket output files.
+
+    Args:
+        pockets: Pockets as returned by detect_pockets
+        output_pdb: Path to the output PDB file
+
+    Returns:
+        Path to the written file
+    """
+    serial = 1
+    with open_structure(output_pdb, 'w') as outfile:
+        for pocket in pockets:
+            for x, y, z, radius in pocket["spheres"]:
+                outfile.write(
+                    f"HETATM{serial:5d}  C   STP P{pocket['rank']:4d}    "
+                    f"{x:8.3f}{y:8.3f}{z:8.3f}  1.00{radius:6.2f}           C  \n"
+                )
+                serial += 1
+        outfile.write("END\n")
+    return output_pdb
+
+def detect_pockets_many(
+    pdb_paths: List[str],
+    max_workers: Optional[int] = None,
+    **kwargs: Any
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Detect pockets in many structures in parallel worker processes.
+
+    Args:
+        pdb_paths: Paths to the input PDB files
+        max_workers: Number of worker processes. If None, uses the CPU count.
+        **kwargs: Additional arguments passed to detect_pockets
+
+    Returns:
+        Mapping of input path to its detect_pockets result
+    """
+    if len(pdb_paths) <= 1 or max_workers == 1:
+        return {path: detect_pockets(path, **kwargs) for path in pdb_paths}
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {path: executor.submit(detect_pockets, path, **kwargs) for path in pdb_paths}
+        return {path: future.result() for path, future in futures.items()}
+
+def main():
+    """Command line interface for detect_pockets."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Detect pockets in one or more PDB files')
+    parser.add_argument('input_pdb', nargs='+', help='Path(s) to input PDB file(s)')
+    parser.add_argument('-o', '--output', help='Path to output JSON file (optional)')
+    parser.add_argument('--min-spheres', type=int, default=15, help='Minimum alpha spheres per pocket')
+    parser.add_argument('--max-pockets', type=int, help='Report at most this many pockets')
+    parser.add_argument('-j', '--jobs', type=int, help='Number of worker processes')
+
+    args = parser.parse_args()
+
+    results = detect_pockets_many(
+        args.input_pdb,
+        max_workers=args.jobs,
+        min_spheres=args.min_spheres,
+        max_pockets=args.max_pockets
+    )
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    failed = 0
+    for path, result in results.items():
+        if not result["success"]:
+            print(f"{path}: Error: {result['error']}")
+            failed += 1
+            continue
+        print(f"{path}: {len(result['pockets'])} pockets")
+        for pocket in result["pockets"][:5]:
+            print(f"  #{pocket['rank']} score={pocket['score']} spheres={pocket['n_spheres']} "
+                  f"residues={len(pocket['residues'])}")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+import os
+import json
+import logging
+from typing import List, Optional, Dict, Any, Tuple, Iterator
+
+from .compression import open_structure
+
+logger = logging.getLogger(__name__)
+
+# Version of the on-disk index layout; bump when the format changes
+INDEX_VERSION = 1
+
+# Suffix of the cached index written next to the structure file
+INDEX_SUFFIX = ".idx.json"
+
+def index_path_for(structure_path: str) -> str:
+    """
+    Get the path of the cached index for a structure file.
+
+    Args:
+        structure_path: Path to the structure file
+
+    Returns:
+        Path to the index file stored next to the structure
+    """
+    return f"{structure_path}{INDEX_SUFFIX}"
+
+def build_structure_index(structure_path: str) -> Dict[str, Any]:
+    """
+    Build a chain -> residue -> byte offset index of a PDB file.
+
+    Only the first model is indexed. Offsets of compressed files refer to the
+    decompressed stream. Each residue is stored as
+    [residue number, insertion code, start offset, end offset] in file order,
+    so the records of any residue can be read with a single seek.
+
+    Args:
+        structure_path: Path to the PDB file
+
+    Returns:
+        Dictionary containing:
+        - version: Index layout version
+        - source_size: Size of the indexed file in bytes
+        - source_mtime_ns: Modification time of the indexed file
+        - header_end: Byte offset of the first coordinate record
+        - chains: Mapping of chain ID to its list of residue entries
+    """
+    stat = os.stat(structure_path)
+    chains: Dict[str, List[List[Any]]] = {}
+    header_end: Optional[int] = None
+    current_key: Optional[Tuple[str, int, str]] = None
+    current_entry: Optional[List[Any]] = None
+    offset = 0
+
+    with open_structure(structure_path, "rb") as f:
+        for line in f:
+            line_end = offset + len(line)
+            if line.startswith((b"ATOM", b"HETATM")):
+                if header_end is None:
+                    header_end = offset
+                key = (line[21:22].decode(), int(line[22:26]), line[26:27].decode().strip())
+                if key != current_key:
+                    current_key = key
+                    current_entry = [key[1], key[2], offset, line_end]
+                    chains.setdefault(key[0], []).append(current_entry)
+                else:
+                    current_entry[3] = line_end
+            elif line.startswith((b"ENDMDL", b"END")):
+                break
+            offset = line_end
+
+    return {
+        "version": INDEX_VERSION,
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "header_end": header_end if header_end is not None else offset,
+        "chains": chains
+    }
+
+def _index_is_current(index: Dict[str, Any], structure_path: str) -> bool:
+    """Check that a cached index still describes the structure file."""
+    stat = os.stat(structure_path)
+    return (
+        index.get("version") == INDEX_VERSION
+        and index.get("source_size") == stat.st_size
+        and index.get("source_mtime_ns") == stat.st_mtime_ns
+    )
+
+def load_structure_index(structure_path: str, rebuild: bool = False) -> Dict[str, Any]:
+    """
+    Load the cached index of a structure file, building it if needed.
+
+    The index is rebuilt when it is missing, unreadable or stale (the structure
+    file changed size or modification time). Failing to write the cache is not
+    an error; the freshly built index is returned either way.
+
+    Args:
+        structure_path: Path to the PDB file
+        rebuild: Force rebuilding the index even if a current one exists
+
+    Returns:
+        Index dictionary as returned by build_structure_index
+    """
+    cache_path = index_path_for(structure_path)
+
+    if not rebuild and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "r") as f:
+                index = json.load(f)
+            if _index_is_current(index, structure_path):
+                return index
+            logger.info(f"Structure index is stale, rebuilding: {cache_path}")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read structure index {cache_path}: {e}")
+
+    index = build_structure_index(structure_path)
+    try:
+        with open(cache_path, "w") as f:
+            json.dump(index, f, separators=(",", ":"))
+    except OSError as e:
+        logger.warning(f"Could not write structure index {cache_path}: {e}")
+    return index
+
+def select_residue_spans(
+    index: Dict[str, Any],
+    chains: Optional[List[str]] = None,
+    residue_range: Optional[Tuple[int, int]] = None
+) -> List[Tuple[int, int]]:
+    """
+    Resolve chain and residue-range selectors into byte spans.
+
+    Spans of neighbouring residues are merged so that each contiguous block of
+    the file is read with one seek.
+
+    Args:
+        index: Structure index
+        chains: Chain IDs to keep. If None, all chains are kept.
+        residue_range: Inclusive (start, end) residue numbers to keep. If None, all residues are kept.
+
+    Returns:
+        List of (start offset, end offset) spans in file order
+    """
+    selected_chains = chains if chains is not None else list(index["chains"])
+    spans: List[Tuple[int, int]] = []
+    for chain in selected_chains:
+        for res_num, _, start, end in index["chains"].get(chain, []):
+            if residue_range is not None and not (residue_range[0] <= res_num <= residue_range[1]):
+                continue
+            spans.append((start, end))
+
+    spans.sort()
+    merged: List[Tuple[int, int]] = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def iter_selected_records(
+    structure_path: str,
+    chains: Optional[List[str]] = None,
+    residue_range: Optional[Tuple[int, int]] = None,
+    index: Optional[Dict[str, Any]] = None
+) -> Iterator[str]:
+    """
+    Yield the header and the selected coordinate records of a PDB file.
+
+    Header records before the first coordinate record are yielded first,
+    followed by the records of the selected residues and a closing END record.
+    Only the selected byte ranges are read; spans are visited in file order, so
+    a compressed file is decompressed in a single forward pass.
+
+    Args:
+        structure_path: Path to the PDB file
+        chains: Chain IDs to keep. If None, all chains are kept.
+        residue_range: Inclusive (start, end) residue numbers to keep. If None, all residues are kept.
+        index: Preloaded structure index. If None, the cached index is loaded.
+
+    Yields:
+        Lines of the selected records
+    """
+    if index is None:
+        index = load_structure_index(structure_path)
+    spans = select_residue_spans(index, chains=chains, residue_range=residue_range)
+
+    with open_structure(structure_path, "rb") as f:
+        header = f.read(index["header_end"])
+        for line in header.decode().splitlines(keepends=True):
+            yield line
+        for start, end in spans:
+            f.seek(start)
+            for line in f.read(end - start).decode().splitlines(keepends=True):
+                yield line
+    yield "END\n"
+
+def parse_residue_range(text: str) -> Tuple[int, int]:
+    """
+    Parse a residue range such as "100-160" or a single residue such as "42".
+
+    Args:
+        text: Residue range text
+
+    Returns:
+        Inclusive (start, end) residue numbers
+    """
+    start, sep, end = text.strip().partition("-")
+    if start == "" and sep:
+        # Negative start residue, e.g. "-5-10"
+        start, _, end = end.partition("-")
+        start = f"-{start}"
+    first = int(start)
+    last = int(end) if end else first
+    if last < first:
+        raise ValueError(f"Invalid residue range: {text}")
+    return first, last
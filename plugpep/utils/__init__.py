@@ -1,5 +1,14 @@
 """Utility functions for the protein binder design pipeline."""
 
-from .uniprot import search_uniprot
+from .uniprot import UniProtClient, get_uniprot_client, search_uniprot, search_uniprot_many
+from .uniprot_index import LocalUniProtIndex, get_uniprot_index, import_uniprot_dump
+from .uniprot_stream import stream_uniprot_records, fetch_uniprot_annotations
+from .target_index import TargetIndex, get_target_index, resolve_target
+from .query_cache import QueryCache, get_query_cache
 
-__all__ = ["search_uniprot"]
+__all__ = [
+    "UniProtClient", "get_uniprot_client", "search_uniprot", "search_uniprot_many",
+    "LocalUniProtIndex", "get_uniprot_index", "import_uniprot_dump",
+    "stream_uniprot_records", "fetch_uniprot_annotations",
+    "TargetIndex", "get_target_index", "resolve_target", "QueryCache", "get_query_cache"
+]
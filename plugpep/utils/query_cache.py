@@ -0,0 +1,228 @@
+"""Fuzzy cache of past planning results keyed by query similarity.
+
+Past queries are embedded as TF-IDF vectors over character n-grams, which
+tolerates rephrasing, inflection and typos. Filler words common to every
+planning query are dropped first so that similarity reflects the target
+description. A new query is compared with the stored ones by cosine
+similarity, and the stored identification is reused if the best match clears
+a threshold and mentions the same identifiers (tokens with digits, such as
+HER2 or IL-6), which character n-grams alone cannot tell apart.
+
+Entries are appended to a JSON Lines file so the cache survives restarts and
+can be shared between runs. The vectorizer is refit lazily, only when entries
+were added since the last lookup.
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default cache location, overridable with PLUGPEP_QUERY_CACHE_PATH
+DEFAULT_CACHE_PATH = os.path.join(Path.home(), ".cache", "plugpep", "query_cache.jsonl")
+
+# Minimum cosine similarity for a stored result to be reused,
+# overridable with PLUGPEP_QUERY_CACHE_THRESHOLD
+DEFAULT_THRESHOLD = 0.75
+
+# Number of most similar past queries checked against the identifier guard
+CANDIDATES = 5
+
+# Words shared by most planning queries that carry no information about the target
+FILLER_WORDS = {
+    "a", "an", "the", "find", "design", "designing", "make", "create", "binder",
+    "binders", "binding", "for", "against", "to", "of", "protein", "proteins",
+    "that", "which", "is", "in", "on", "with", "target", "targeting", "please"
+}
+
+IDENTIFIER_PATTERN = re.compile(r"[a-z0-9]*\d[a-z0-9]*")
+
+def _compact(query: str) -> str:
+    """Lowercase a query and join hyphenated identifiers, e.g. 'IL-6' to 'il6'."""
+    return re.sub(r"(?<=[a-z])-(?=\d)", "", query.lower())
+
+def normalize_query(query: str) -> str:
+    """Lowercase a query and drop filler words and punctuation."""
+    words = re.findall(r"[a-z0-9]+", _compact(query))
+    return " ".join(word for word in words if word not in FILLER_WORDS)
+
+def query_identifiers(query: str) -> set:
+    """Extract identifier-like tokens, e.g. 'her2' or 'il6' from 'IL-6'."""
+    return set(IDENTIFIER_PATTERN.findall(_compact(query)))
+
+class QueryCache:
+    """Near-duplicate query cache over TF-IDF vectors."""
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH, threshold: float = DEFAULT_THRESHOLD):
+        """Initialize the cache.
+
+        Args:
+            path: JSON Lines file holding cached entries. None keeps the cache in memory.
+            threshold: Minimum cosine similarity for a match
+        """
+        self.path = path
+        self.threshold = threshold
+        self.entries: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._vectorizer = None
+        self._matrix = None
+        self._fitted_size = 0
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        """Read entries from the cache file, keeping the latest entry per query."""
+        latest: Dict[str, Dict[str, Any]] = {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    latest[entry["query"]] = entry
+                except (ValueError, KeyError):
+                    # A partially written last line from a crashed writer
+                    continue
+        self.entries = list(latest.values())
+        logger.info(f"Loaded {len(self.entries)} cached queries from {self.path}")
+
+    def _fit(self) -> bool:
+        """Refit the vectorizer if entries changed. Returns False if unavailable."""
+        if self._fitted_size == len(self.entries) and self._matrix is not None:
+            return True
+        try:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+        except ImportError:
+            logger.warning("scikit-learn is not installed; fuzzy query cache disabled")
+            return False
+        self._vectorizer = TfidfVectorizer(
+            analyzer="char_wb",
+            ngram_range=(3, 5),
+            lowercase=True,
+            sublinear_tf=True
+        )
+        self._matrix = self._vectorizer.fit_transform([normalize_query(entry["query"]) for entry in self.entries])
+        self._fitted_size = len(self.entries)
+        return True
+
+    def _query_vector(self, query: str) -> Any:
+        """Build the L2-normalized TF-IDF row of a query.
+
+        Unlike TfidfVectorizer.transform, n-grams missing from the fitted
+        vocabulary still count towards the norm (with the idf of an unseen
+        term), so words absent from every cached query lower the similarity
+        instead of being ignored.
+        """
+        import numpy as np
+        from scipy.sparse import csr_matrix
+
+        vocabulary = self._vectorizer.vocabulary_
+        idf = self._vectorizer.idf_
+        unseen_idf = np.log(len(self.entries) + 1) + 1.0
+        columns, weights, norm = [], [], 0.0
+        for gram, count in Counter(self._vectorizer.build_analyzer()(normalize_query(query))).items():
+            column = vocabulary.get(gram)
+            weight = (1.0 + np.log(count)) * (idf[column] if column is not None else unseen_idf)
+            norm += weight * weight
+            if column is not None:
+                columns.append(column)
+                weights.append(weight)
+        norm = np.sqrt(norm) or 1.0
+        return csr_matrix(
+            (np.asarray(weights) / norm, ([0] * len(columns), columns)),
+            shape=(1, len(vocabulary))
+        )
+
+    def nearest(self, query: str, limit: int = CANDIDATES, min_similarity: float = 0.0) -> List[Tuple[float, Dict[str, Any]]]:
+        """Find the most similar past queries.
+
+        Args:
+            query: User query
+            limit: Maximum number of entries returned
+            min_similarity: Minimum cosine similarity of returned entries
+
+        Returns:
+            List of (similarity, entry) pairs, most similar first
+        """
+        with self._lock:
+            if not self.entries or not self._fit():
+                return []
+            # TF-IDF rows are L2-normalized, so the dot product is the cosine similarity
+            scores = (self._matrix @ self._query_vector(query).T).toarray().ravel()
+            return [
+                (float(scores[i]), self.entries[i])
+                for i in scores.argsort()[::-1][:limit]
+                if scores[i] >= min_similarity
+            ]
+
+    def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        """Find the stored result of the most similar past query.
+
+        Args:
+            query: User query
+
+        Returns:
+            The stored result extended with matched_query, similarity and
+            source, or None if no past query is similar enough
+        """
+        identifiers = query_identifiers(query)
+        for similarity, entry in self.nearest(query, min_similarity=self.threshold):
+            if query_identifiers(entry["query"]) == identifiers:
+                break
+        else:
+            return None
+
+        result = dict(entry["result"])
+        result.update({
+            "matched_query": entry["query"],
+            "similarity": round(similarity, 4),
+            "source": "query_cache"
+        })
+        return result
+
+    def add(self, query: str, result: Dict[str, Any]) -> None:
+        """Store the result of a query and append it to the cache file."""
+        entry = {"query": query, "result": result, "timestamp": time.time()}
+        with self._lock:
+            self.entries = [e for e in self.entries if e["query"] != query]
+            self.entries.append(entry)
+            self._fitted_size = -1
+            if self.path:
+                try:
+                    Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(entry) + "\n")
+                except OSError as e:
+                    logger.warning(f"Could not write query cache {self.path}: {str(e)}")
+
+_default_cache: Optional[QueryCache] = None
+
+def get_query_cache() -> Optional[QueryCache]:
+    """Get the process-wide fuzzy query cache.
+
+    The cache is configured from environment variables:
+        PLUGPEP_QUERY_CACHE: set to "0", "false" or "off" to disable it
+        PLUGPEP_QUERY_CACHE_PATH: cache file path
+        PLUGPEP_QUERY_CACHE_THRESHOLD: minimum cosine similarity for a match
+
+    Returns:
+        The shared cache, or None if disabled
+    """
+    global _default_cache
+    if os.getenv("PLUGPEP_QUERY_CACHE", "1").lower() in ("0", "false", "off", "no"):
+        return None
+    if _default_cache is None:
+        try:
+            _default_cache = QueryCache(
+                path=os.getenv("PLUGPEP_QUERY_CACHE_PATH", DEFAULT_CACHE_PATH),
+                threshold=float(os.getenv("PLUGPEP_QUERY_CACHE_THRESHOLD", DEFAULT_THRESHOLD))
+            )
+        except (OSError, ValueError) as e:
+            logger.warning(f"Query cache unavailable: {str(e)}")
+            return None
+    return _default_cache
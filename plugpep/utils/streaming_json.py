@@ -0,0 +1,129 @@
+"""Incremental parsing of a JSON object arriving in chunks.
+
+LLM responses are streamed token by token. StreamingJSONParser scans each
+chunk once and reports every top-level field of the response object as soon
+as its value is complete, so callers can act on early fields (such as the
+UniProt ID) while later ones are still being generated. Text before the
+opening brace, such as a Markdown code fence, is skipped.
+
+The parser only reports fields; the complete response is still validated by
+the regular parser once the stream ends.
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+class StreamingJSONParser:
+    """Report the top-level fields of a streamed JSON object as they complete."""
+
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._done = False
+        # Position of the current depth-1 string or value, and the last key seen
+        self._token_start: Optional[int] = None
+        self._value_start: Optional[int] = None
+        self._expect_value = False
+        self._key: Optional[str] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume a chunk of the response.
+
+        Args:
+            chunk: Next piece of the response text
+
+        Returns:
+            List of (key, value) pairs completed by this chunk, in order
+        """
+        self._buffer += chunk
+        completed: List[Tuple[str, Any]] = []
+        buffer = self._buffer
+        for i in range(self._pos, len(buffer)):
+            if self._done:
+                break
+            char = buffer[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._end_string(i, completed)
+                continue
+
+            if self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    if self._expect_value:
+                        self._value_start = i
+                    else:
+                        self._token_start = i
+            elif char in "{[":
+                if self._depth == 1 and self._expect_value:
+                    self._value_start = i
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._value_start is not None:
+                    self._emit(i + 1, completed)
+                elif self._depth == 0:
+                    # End of the object; close a trailing literal value
+                    if self._value_start is not None:
+                        self._emit(i, completed)
+                    self._done = True
+            elif self._depth == 1:
+                if char == ":":
+                    self._expect_value = True
+                elif char == ",":
+                    if self._value_start is not None:
+                        self._emit(i, completed)
+                    self._expect_value = False
+                elif self._expect_value and self._value_start is None and not char.isspace():
+                    # Start of a number or literal
+                    self._value_start = i
+
+        self._pos = len(buffer)
+        return completed
+
+    def _end_string(self, end: int, completed: List[Tuple[str, Any]]) -> None:
+        """Handle the closing quote of a depth-1 string."""
+        if self._expect_value and self._value_start is not None:
+            self._emit(end + 1, completed)
+        elif self._token_start is not None:
+            try:
+                self._key = json.loads(self._buffer[self._token_start:end + 1])
+            except ValueError:
+                self._key = None
+            self._token_start = None
+
+    def _emit(self, end: int, completed: List[Tuple[str, Any]]) -> None:
+        """Decode the current value and record it under the current key."""
+        raw = self._buffer[self._value_start:end].strip()
+        self._value_start = None
+        self._expect_value = False
+        if self._key is None:
+            return
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return
+        self.fields[self._key] = value
+        completed.append((self._key, value))
+        self._key = None
+
+    @property
+    def text(self) -> str:
+        """All text fed so far."""
+        return self._buffer
@@ -0,0 +1,210 @@
+"""Local target resolution from a synonym/function dictionary.
+
+Queries are matched against known phrases (protein names, gene names and
+function descriptions) with an Aho-Corasick automaton, so a query is scanned
+once regardless of how many phrases the index holds. A confident match lets
+the planning step skip the LLM entirely.
+
+Index files are JSON documents of the form::
+
+    {"targets": [{"uniprot_id": "P00742", "target_name": "...",
+                  "target_description": "...", "organism": "...",
+                  "confidence": 0.95, "validation_steps": ["..."],
+                  "synonyms": ["prothrombin", {"phrase": "factor xa", "confidence": 0.98}]}]}
+
+A synonym without its own confidence inherits the target's confidence.
+"""
+
+import os
+import re
+import json
+import logging
+from collections import deque
+from typing import Optional, Dict, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Index shipped with the package
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(__file__), "target_synonyms.json")
+
+# Matches below this confidence are left to the LLM
+DEFAULT_MIN_CONFIDENCE = 0.9
+
+def normalize_text(text: str) -> str:
+    """Lowercase text and collapse runs of whitespace to single spaces."""
+    return re.sub(r"\s+", " ", text.lower()).strip()
+
+class TargetIndex:
+    """Aho-Corasick phrase matcher mapping query phrases to UniProt targets."""
+
+    def __init__(self):
+        self.targets: Dict[str, Dict[str, Any]] = {}
+        # Trie as parallel lists: goto transitions, failure links, and outputs
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, str, float]]] = [[]]
+        self._compiled = True
+
+    @classmethod
+    def from_file(cls, path: str) -> "TargetIndex":
+        """Build an index from a JSON index file."""
+        index = cls()
+        index.load(path)
+        return index
+
+    def load(self, path: str) -> None:
+        """Add all targets of a JSON index file to the index."""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for target in data.get("targets", []):
+            self.add_target(target)
+        logger.info(f"Loaded {len(data.get('targets', []))} targets from {path}")
+
+    def add_target(self, target: Dict[str, Any]) -> None:
+        """Add a target and its synonyms to the index.
+
+        Args:
+            target: Target record with uniprot_id, identification fields,
+                an optional default confidence and a list of synonyms
+        """
+        uniprot_id = target["uniprot_id"]
+        default_confidence = float(target.get("confidence", 1.0))
+        self.targets[uniprot_id] = {
+            key: value for key, value in target.items() if key != "synonyms"
+        }
+        for synonym in target.get("synonyms", []):
+            if isinstance(synonym, dict):
+                phrase = synonym["phrase"]
+                confidence = float(synonym.get("confidence", default_confidence))
+            else:
+                phrase, confidence = synonym, default_confidence
+            self.add_phrase(phrase, uniprot_id, confidence)
+
+    def add_phrase(self, phrase: str, uniprot_id: str, confidence: float) -> None:
+        """Insert one phrase into the trie."""
+        phrase = normalize_text(phrase)
+        if not phrase:
+            return
+        node = 0
+        for char in phrase:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = next_node
+        self._out[node].append((phrase, uniprot_id, confidence))
+        self._compiled = False
+
+    def _compile(self) -> None:
+        """Compute failure links breadth-first over the trie."""
+        queue = deque(self._goto[0].values())
+        for child in queue:
+            self._fail[child] = 0
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+        self._compiled = True
+
+    def find_matches(self, text: str) -> List[Dict[str, Any]]:
+        """Find all whole-word phrase occurrences in a text.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            List of matches with phrase, uniprot_id, confidence and start offset
+        """
+        if not self._compiled:
+            self._compile()
+        text = normalize_text(text)
+        matches = []
+        node = 0
+        for end, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            # Walk the failure chain to report phrases ending here
+            state = node
+            while state:
+                for phrase, uniprot_id, confidence in self._out[state]:
+                    start = end - len(phrase) + 1
+                    if self._is_word_boundary(text, start, end + 1):
+                        matches.append({
+                            "phrase": phrase,
+                            "uniprot_id": uniprot_id,
+                            "confidence": confidence,
+                            "start": start
+                        })
+                state = self._fail[state]
+        return matches
+
+    @staticmethod
+    def _is_word_boundary(text: str, start: int, end: int) -> bool:
+        """Check that text[start:end] is not part of a longer word."""
+        before = text[start - 1] if start > 0 else " "
+        after = text[end] if end < len(text) else " "
+        return not before.isalnum() and not after.isalnum()
+
+    def resolve(self, query: str, min_confidence: float = DEFAULT_MIN_CONFIDENCE) -> Optional[Dict[str, Any]]:
+        """Resolve a query to a target without calling the LLM.
+
+        The match with the highest confidence wins; ties go to the longest
+        phrase, which is the most specific one.
+
+        Args:
+            query: User query
+            min_confidence: Minimum match confidence to accept
+
+        Returns:
+            Protein identification dictionary (the planning output fields plus
+            matched_phrase and source), or None if nothing matched confidently
+        """
+        matches = self.find_matches(query)
+        if not matches:
+            return None
+        best = max(matches, key=lambda match: (match["confidence"], len(match["phrase"])))
+        if best["confidence"] < min_confidence:
+            return None
+
+        target = self.targets[best["uniprot_id"]]
+        return {
+            "uniprot_id": target["uniprot_id"],
+            "target_name": target.get("target_name", target["uniprot_id"]),
+            "target_description": target.get("target_description", ""),
+            "organism": target.get("organism", "Homo sapiens"),
+            "confidence": best["confidence"],
+            "validation_steps": list(target.get("validation_steps", [])),
+            "matched_phrase": best["phrase"],
+            "source": "target_index"
+        }
+
+_default_index: Optional[TargetIndex] = None
+
+def get_target_index() -> TargetIndex:
+    """Get the process-wide target index.
+
+    Loads the packaged index, then any extra index files listed in the
+    PLUGPEP_TARGET_INDEX environment variable (separated by os.pathsep).
+    """
+    global _default_index
+    if _default_index is None:
+        index = TargetIndex.from_file(DEFAULT_INDEX_PATH)
+        for path in filter(None, os.getenv("PLUGPEP_TARGET_INDEX", "").split(os.pathsep)):
+            try:
+                index.load(path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Error loading target index {path}: {str(e)}")
+        _default_index = index
+    return _default_index
+
+def resolve_target(query: str, min_confidence: float = DEFAULT_MIN_CONFIDENCE) -> Optional[Dict[str, Any]]:
+    """Resolve a query against the process-wide target index."""
+    return get_target_index().resolve(query, min_confidence=min_confidence)
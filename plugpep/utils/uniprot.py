@@ -1,71 +1,331 @@
-"""UniProt API utilities."""
+"""UniProt API utilities.
 
-import requests
+Searches go through a shared UniProtClient, which reuses pooled HTTP
+connections, applies timeouts and retries, and caches results in memory.
+A search queries reviewed human entries and, concurrently, reviewed entries
+of any organism, preferring the human hit. search_uniprot_many resolves many
+queries with as few REST calls as possible: accessions are fetched in batches
+from the accessions endpoint and gene symbols are combined into OR queries.
+"""
+
+import os
+import re
+import time
 import logging
-from typing import Optional, Dict, Any
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
+BASE_URL = "https://rest.uniprot.org/uniprotkb"
+
+SEARCH_FIELDS = "accession,id,protein_name,organism_name,gene_names,length,sequence"
+
+HUMAN_TAXON_ID = 9606
+
+# Connect/read timeout in seconds, overridable with PLUGPEP_UNIPROT_TIMEOUT
+DEFAULT_TIMEOUT = 10.0
+
+# Cached results and their lifetime in seconds, overridable with
+# PLUGPEP_UNIPROT_CACHE_SIZE / PLUGPEP_UNIPROT_CACHE_TTL
+DEFAULT_CACHE_SIZE = 2048
+DEFAULT_CACHE_TTL = 24 * 3600
+
+# Concurrent requests, also the size of the connection pool
+MAX_WORKERS = 8
+
+# Accessions per request to the accessions endpoint
+ACCESSION_BATCH_SIZE = 100
+
+# Gene symbols combined into one OR query
+GENE_BATCH_SIZE = 25
+
+# UniProtKB accession format, see https://www.uniprot.org/help/accession_numbers
+ACCESSION_PATTERN = re.compile(r"^(?:[OPQ][0-9][A-Z0-9]{3}[0-9]|[A-NR-Z][0-9](?:[A-Z][A-Z0-9]{2}[0-9]){1,2})$")
+
+# Upper-case terms such as "EGFR" or "TP53" are searched as exact gene names
+GENE_SYMBOL_PATTERN = re.compile(r"^[A-Z][A-Z0-9-]{1,14}$")
+
+def clean_query(query: str) -> str:
+    """Prepare a free-text query for UniProt search."""
+    return query.replace("Receptor", "").strip()  # Remove "Receptor" as it's too generic
+
+def parse_entry(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a UniProtKB JSON entry to the dictionary returned by searches.
+
+    Args:
+        result: Entry from the "results" list of a UniProtKB JSON response
+
+    Returns:
+        Dictionary with uniprot_id, target_name, organism, gene_names
+        (space-separated, synonyms included), length and sequence
+    """
+    description = result.get("proteinDescription", {})
+    name = description.get("recommendedName") or next(iter(description.get("submissionNames", [])), {})
+    gene_names: List[str] = []
+    for gene in result.get("genes", []):
+        if "geneName" in gene:
+            gene_names.append(gene["geneName"]["value"])
+        gene_names.extend(synonym["value"] for synonym in gene.get("synonyms", []))
+    sequence = result.get("sequence", {})
+    return {
+        "uniprot_id": result["primaryAccession"],
+        "target_name": name.get("fullName", {}).get("value", ""),
+        "organism": result.get("organism", {}).get("scientificName", ""),
+        "gene_names": " ".join(gene_names),
+        "length": sequence.get("length", 0),
+        "sequence": sequence.get("value", "")
+    }
+
+def _batches(items: List[str], size: int) -> Iterable[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+class UniProtClient:
+    """UniProt REST client with connection pooling, retries and a result cache."""
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        cache_ttl: Optional[float] = DEFAULT_CACHE_TTL
+    ):
+        """Initialize the client.
+
+        Args:
+            timeout: Connect and read timeout of each request in seconds
+            cache_size: Maximum number of cached results. 0 disables caching.
+            cache_ttl: Seconds before a cached result expires. None disables expiry.
+        """
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.session = requests.Session()
+        retries = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",)
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS, max_retries=retries)
+        self.session.mount("https://", adapter)
+        self._cache: "OrderedDict[str, Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="uniprot")
+
+    def _cache_get(self, key: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """Return (found, result) for a cache key."""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return False, None
+            stored_at, result = entry
+            if self.cache_ttl is not None and time.time() - stored_at > self.cache_ttl:
+                del self._cache[key]
+                return False, None
+            self._cache.move_to_end(key)
+            return True, result
+
+    def _cache_set(self, key: str, result: Optional[Dict[str, Any]]) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[key] = (time.time(), result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _get(self, path: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """GET an endpoint and return the "results" list of the JSON response."""
+        response = self.session.get(f"{BASE_URL}/{path}", params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json().get("results", [])
+
+    def _query(self, query: str, size: int = 1) -> List[Dict[str, Any]]:
+        return self._get("search", {"query": query, "format": "json", "fields": SEARCH_FIELDS, "size": size})
+
+    def _submit(self, fn, *args: Any) -> Future:
+        return self._executor.submit(contextvars.copy_context().run, fn, *args)
+
+    def _start_search(self, query: str) -> Tuple[Future, Future]:
+        """Start the human-only and any-organism searches of a cleaned query."""
+        human = self._submit(self._query, f"{query} AND reviewed:true AND organism_id:{HUMAN_TAXON_ID}")
+        fallback = self._submit(self._query, f"{query} AND reviewed:true")
+        return human, fallback
+
+    def _finish_search(self, key: str, human: Future, fallback: Future) -> Optional[Dict[str, Any]]:
+        """Combine the two searches, preferring a human hit, and cache the result."""
+        try:
+            results = human.result()
+            if results:
+                fallback.cancel()
+            else:
+                results = fallback.result()
+        except (requests.RequestException, ValueError) as e:
+            fallback.cancel()
+            logger.error("Error searching UniProt: %s", e)
+            return None
+        result = parse_entry(results[0]) if results else None
+        self._cache_set(key, result)
+        return result
+
+    def search(self, query: str) -> Optional[Dict[str, Any]]:
+        """Search UniProt for a protein, preferring reviewed human entries.
+
+        Args:
+            query: Protein name or description to search for
+
+        Returns:
+            Dictionary containing UniProt ID, name, and organism if found, None otherwise
+        """
+        query = clean_query(query)
+        key = f"search:{query.lower()}"
+        found, result = self._cache_get(key)
+        if found:
+            return result
+        return self._finish_search(key, *self._start_search(query))
+
+    def _fetch_accessions(self, accessions: List[str], results: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """Fetch entries by accession in batches and fill in the results."""
+        for batch in _batches(accessions, ACCESSION_BATCH_SIZE):
+            entries = self._get("accessions", {"accessions": ",".join(batch), "format": "json", "fields": SEARCH_FIELDS})
+            for entry in map(parse_entry, entries):
+                if entry["uniprot_id"] in results:
+                    results[entry["uniprot_id"]] = entry
+                    self._cache_set(f"search:{entry['uniprot_id'].lower()}", entry)
+
+    def _fetch_genes(self, symbols: List[str], results: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """Search human gene symbols with combined OR queries and fill in the results."""
+        for batch in _batches(symbols, GENE_BATCH_SIZE):
+            genes = " OR ".join(f'gene_exact:"{symbol}"' for symbol in batch)
+            entries = self._query(f"({genes}) AND reviewed:true AND organism_id:{HUMAN_TAXON_ID}", size=500)
+            for entry in map(parse_entry, entries):
+                names = set(entry["gene_names"].upper().split())
+                for symbol in batch:
+                    if results[symbol] is None and symbol in names:
+                        results[symbol] = entry
+                        self._cache_set(f"search:{symbol.lower()}", entry)
+
+    def search_many(self, queries: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Search UniProt for many proteins with as few requests as possible.
+
+        Cached queries are answered from the cache. Accessions are fetched in
+        batches and upper-case gene symbols are searched with combined
+        queries; whatever these do not resolve is searched individually, all
+        searches running concurrently.
+
+        Args:
+            queries: Accessions, gene symbols, protein names or descriptions
+
+        Returns:
+            Dictionary mapping each query to its search result, or None if not found
+        """
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        pending: Dict[str, str] = {}
+        for query in queries:
+            cleaned = clean_query(query)
+            found, result = self._cache_get(f"search:{cleaned.lower()}")
+            results[query] = result
+            if not found:
+                pending[query] = cleaned
+
+        accessions = {c: None for c in pending.values() if ACCESSION_PATTERN.match(c)}
+        symbols = {c: None for c in pending.values() if c not in accessions and GENE_SYMBOL_PATTERN.match(c)}
+        try:
+            batch_jobs = []
+            if accessions:
+                batch_jobs.append(self._submit(self._fetch_accessions, list(accessions), accessions))
+            if symbols:
+                batch_jobs.append(self._submit(self._fetch_genes, list(symbols), symbols))
+            for job in batch_jobs:
+                job.result()
+        except (requests.RequestException, ValueError) as e:
+            logger.warning("Batched UniProt lookup failed, searching individually: %s", e)
+        resolved = {**{k: v for k, v in accessions.items() if v}, **{k: v for k, v in symbols.items() if v}}
+
+        searches = {}
+        for cleaned in set(pending.values()) - set(resolved):
+            searches[cleaned] = self._start_search(cleaned)
+        for cleaned, (human, fallback) in searches.items():
+            resolved[cleaned] = self._finish_search(f"search:{cleaned.lower()}", human, fallback)
+
+        for query, cleaned in pending.items():
+            results[query] = resolved.get(cleaned)
+        logger.info(
+            "Resolved %d UniProt queries: %d cached, %d batched, %d searched",
+            len(results), len(results) - len(pending), len(set(pending.values())) - len(searches), len(searches)
+        )
+        return results
+
+    def clear(self) -> None:
+        """Forget all cached results."""
+        with self._lock:
+            self._cache.clear()
+
+_default_client: Optional[UniProtClient] = None
+_default_client_lock = threading.Lock()
+
+def get_uniprot_client() -> UniProtClient:
+    """Get the process-wide UniProt client.
+
+    The client is configured from environment variables:
+        PLUGPEP_UNIPROT_TIMEOUT: request timeout in seconds
+        PLUGPEP_UNIPROT_CACHE_SIZE: maximum number of cached results, 0 to disable
+        PLUGPEP_UNIPROT_CACHE_TTL: cached result lifetime in seconds
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = UniProtClient(
+                timeout=float(os.getenv("PLUGPEP_UNIPROT_TIMEOUT", DEFAULT_TIMEOUT)),
+                cache_size=int(os.getenv("PLUGPEP_UNIPROT_CACHE_SIZE", DEFAULT_CACHE_SIZE)),
+                cache_ttl=float(os.getenv("PLUGPEP_UNIPROT_CACHE_TTL", DEFAULT_CACHE_TTL))
+            )
+    return _default_client
+
 def search_uniprot(query: str) -> Optional[Dict[str, Any]]:
     """Search UniProt for a protein and return its information.
 
+    The offline index is searched first when configured, see uniprot_index.
+
     Args:
         query: Protein name or description to search for
 
     Returns:
         Dictionary containing UniProt ID, name, and organism if found, None otherwise
     """
-    try:
-        # Clean up the query
-        query = query.replace("Receptor", "").strip()  # Remove "Receptor" as it's too generic
-
-        # Construct the search URL
-        base_url = "https://rest.uniprot.org/uniprotkb/search"
-        params = {
-            "query": f"{query} AND reviewed:true AND organism_id:9606",  # Human proteins only, reviewed
-            "format": "json",
-            "fields": "accession,id,protein_name,organism_name,gene_names,length,sequence",
-            "size": 1
-        }
-
-        # Make the request
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
+    from .uniprot_index import get_uniprot_index, uniprot_backend
 
-        # Parse the response
-        data = response.json()
-
-        # Check if we got any results
-        if data["results"]:
-            result = data["results"][0]
-            return {
-                "uniprot_id": result["primaryAccession"],
-                "target_name": result["proteinName"],
-                "organism": result["organismName"],
-                "gene_names": result.get("geneNames", ""),
-                "length": result.get("length", 0),
-                "sequence": result.get("sequence", {}).get("value", "")
-            }
-
-        # If no results with human proteins, try without organism filter
-        params["query"] = f"{query} AND reviewed:true"
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        if data["results"]:
-            result = data["results"][0]
-            return {
-                "uniprot_id": result["primaryAccession"],
-                "target_name": result["proteinName"],
-                "organism": result["organismName"],
-                "gene_names": result.get("geneNames", ""),
-                "length": result.get("length", 0),
-                "sequence": result.get("sequence", {}).get("value", "")
-            }
-
-        return None
-
-    except Exception as e:
-        logger.error(f"Error searching UniProt: {str(e)}")
-        return None
+    index = get_uniprot_index()
+    if index is not None:
+        result = index.search(query)
+        if result is not None or uniprot_backend() == "local":
+            return result
+    return get_uniprot_client().search(query)
+
+def search_uniprot_many(queries: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Search UniProt for many proteins at once.
+
+    Args:
+        queries: Accessions, gene symbols, protein names or descriptions
+
+    Returns:
+        Dictionary mapping each query to its search result, or None if not found
+    """
+    from .uniprot_index import get_uniprot_index, uniprot_backend
+
+    index = get_uniprot_index()
+    if index is None:
+        return get_uniprot_client().search_many(queries)
+    results = {query: index.search(query) for query in queries}
+    missing = [query for query, result in results.items() if result is None]
+    if missing and uniprot_backend() != "local":
+        results.update(get_uniprot_client().search_many(missing))
+    return results
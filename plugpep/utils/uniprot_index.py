@@ -0,0 +1,404 @@
+"""Offline UniProt index in SQLite.
+
+A Swiss-Prot dump, either the UniProtKB flat file (uniprot_sprot.dat[.gz]) or
+a TSV download, is streamed into a SQLite database with an FTS5 full-text
+index on protein names, gene names and function text. LocalUniProtIndex
+searches it with the same result shape as search_uniprot, without network
+access. Accessions and gene symbols are resolved with B-tree lookups; other
+queries go through the full-text index.
+
+Build an index with:
+    python -m plugpep.utils.uniprot_index uniprot_sprot.dat.gz [--db PATH]
+
+search_uniprot uses the index according to PLUGPEP_UNIPROT_BACKEND:
+    "remote": always query the UniProt REST API
+    "local": only query the index
+    "auto" (default): query the index if it exists, then the REST API on a miss
+"""
+
+import os
+import re
+import csv
+import sys
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterator, List, Tuple
+
+from ..tools.compression import open_structure
+from .query_cache import FILLER_WORDS
+from .uniprot import ACCESSION_PATTERN, GENE_SYMBOL_PATTERN, HUMAN_TAXON_ID, clean_query
+
+logger = logging.getLogger(__name__)
+
+# Default index location, overridable with PLUGPEP_UNIPROT_INDEX
+DEFAULT_INDEX_PATH = os.path.join(Path.home(), ".cache", "plugpep", "uniprot.sqlite")
+
+UNIPROT_BACKENDS = ("remote", "local", "auto")
+
+# Rows inserted per transaction during import
+IMPORT_BATCH_SIZE = 5000
+
+# Full-text hits examined when preferring a human entry over a better-ranked one
+HUMAN_PREFERENCE_WINDOW = 20
+
+# bm25 weights of the protein names, gene names and function columns
+BM25_WEIGHTS = (10.0, 10.0, 1.0)
+
+# Evidence tags such as {ECO:0000269|PubMed:123} in flat file lines
+EVIDENCE_PATTERN = re.compile(r"\s*\{[^}]*\}")
+
+SCHEMA = (
+    """CREATE TABLE entries (
+        accession TEXT PRIMARY KEY,
+        entry_name TEXT,
+        protein_name TEXT NOT NULL,
+        protein_names TEXT,
+        gene_names TEXT,
+        organism TEXT,
+        taxon_id INTEGER,
+        length INTEGER,
+        sequence TEXT,
+        function TEXT
+    )""",
+    # Secondary accessions and gene names/synonyms, for exact lookups
+    "CREATE TABLE secondary_accessions (accession TEXT PRIMARY KEY, entry INTEGER NOT NULL) WITHOUT ROWID",
+    "CREATE TABLE genes (gene TEXT NOT NULL, entry INTEGER NOT NULL)",
+    """CREATE VIRTUAL TABLE entries_fts USING fts5(
+        protein_names, gene_names, function,
+        content='entries', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+    )"""
+)
+
+def _strip_evidence(text: str) -> str:
+    return EVIDENCE_PATTERN.sub("", text).strip()
+
+def parse_flat_file(stream) -> Iterator[Dict[str, Any]]:
+    """Parse UniProtKB flat file records.
+
+    Args:
+        stream: Text stream of a .dat file
+
+    Yields:
+        Entry dictionaries with accessions, entry_name, protein_names,
+        gene_names, organism, taxon_id, length, sequence and function
+    """
+    entry: Dict[str, Any] = {}
+    sequence: List[str] = []
+    gene_lines: List[str] = []
+    in_function = False
+    for line in stream:
+        code, value = line[:2], line[5:].rstrip("\n")
+        if code == "ID":
+            entry = {"entry_name": value.split()[0], "accessions": [], "protein_names": [],
+                     "gene_names": [], "organism": "", "taxon_id": None, "function": []}
+            sequence = []
+            gene_lines = []
+            in_function = False
+        elif code == "AC":
+            entry["accessions"].extend(a.strip() for a in value.split(";") if a.strip())
+        elif code == "DE":
+            match = re.search(r"(?:Full|Short)=([^;]+);", value)
+            if match:
+                entry["protein_names"].append(_strip_evidence(match.group(1)))
+        elif code == "GN":
+            # Name lists can wrap, so GN lines are parsed together at the end of the record;
+            # "and" lines only separate the names of different genes
+            if value.strip() != "and":
+                gene_lines.append(value)
+        elif code == "OS":
+            entry["organism"] = f"{entry['organism']} {value}".strip()
+        elif code == "OX":
+            match = re.search(r"NCBI_TaxID=(\d+)", value)
+            if match:
+                entry["taxon_id"] = int(match.group(1))
+        elif code == "CC":
+            if value.startswith("-!- "):
+                in_function = value.startswith("-!- FUNCTION:")
+                if in_function:
+                    entry["function"].append(value[len("-!- FUNCTION:"):].strip())
+            elif in_function and value.startswith("    "):
+                entry["function"].append(value.strip())
+            else:
+                in_function = False
+        elif code == "  ":
+            sequence.append(value.replace(" ", ""))
+        elif code == "//":
+            # Evidence tags may list several codes separated by commas, so they go before splitting
+            for part in _strip_evidence(" ".join(gene_lines)).split(";"):
+                key, _, names = part.strip().partition("=")
+                if key in ("Name", "Synonyms", "OrderedLocusNames", "ORFNames"):
+                    entry["gene_names"].extend(n.strip() for n in names.split(",") if n.strip())
+            entry["organism"] = re.sub(r"\s*\(.*\)\.?$", "", entry["organism"]).rstrip(".")
+            entry["function"] = _strip_evidence(" ".join(entry["function"]))
+            entry["sequence"] = "".join(sequence)
+            entry["length"] = len(entry["sequence"])
+            yield entry
+
+def parse_tsv(stream) -> Iterator[Dict[str, Any]]:
+    """Parse a UniProtKB TSV download.
+
+    Expects the default column headers, e.g. Entry, Entry Name, Protein names,
+    Gene Names, Organism, Organism (ID), Length, Sequence and Function [CC].
+    Missing columns are left empty.
+
+    Args:
+        stream: Text stream of a TSV file with a header row
+
+    Yields:
+        Entry dictionaries as from parse_flat_file
+    """
+    for row in csv.DictReader(stream, delimiter="\t"):
+        # "Name (EC 1.2.3.4) (Alternative name)" lists the recommended name first
+        head, _, rest = row.get("Protein names", "").partition(" (")
+        names = [head] + re.findall(r"\(([^()]*)\)", f"({rest}" if rest else "")
+        function = _strip_evidence(row.get("Function [CC]", ""))
+        sequence = row.get("Sequence", "")
+        yield {
+            "entry_name": row.get("Entry Name", ""),
+            "accessions": [row["Entry"]],
+            "protein_names": [n.strip() for n in names if n.strip() and not n.startswith("EC ")],
+            "gene_names": row.get("Gene Names", "").split(),
+            "organism": re.sub(r"\s*\(.*\)$", "", row.get("Organism", "")),
+            "taxon_id": int(row["Organism (ID)"]) if row.get("Organism (ID)") else None,
+            "function": function[len("FUNCTION:"):].strip() if function.startswith("FUNCTION:") else function,
+            "sequence": sequence,
+            "length": int(row["Length"]) if row.get("Length") else len(sequence)
+        }
+
+def import_uniprot_dump(source: str, db_path: str = DEFAULT_INDEX_PATH) -> int:
+    """Build the SQLite index from a Swiss-Prot dump.
+
+    The dump is streamed, so memory use does not grow with its size. The
+    database is written next to db_path and moved into place when complete,
+    so readers never see a partial index.
+
+    Args:
+        source: Flat file (.dat) or TSV (.tsv) dump, optionally gzip, bz2 or xz compressed
+        db_path: Path of the index database
+
+    Returns:
+        Number of imported entries
+    """
+    base = re.sub(r"\.(gz|bz2|xz)$", "", source)
+    parse = parse_tsv if base.endswith((".tsv", ".tab")) else parse_flat_file
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{db_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    count = 0
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        for statement in SCHEMA:
+            conn.execute(statement)
+        with open_structure(source, "r") as stream:
+            batch: List[Dict[str, Any]] = []
+            for entry in parse(stream):
+                batch.append(entry)
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    count += _insert_batch(conn, batch)
+                    batch = []
+            count += _insert_batch(conn, batch)
+        conn.execute("CREATE INDEX genes_gene ON genes (gene COLLATE NOCASE)")
+        conn.execute("INSERT INTO entries_fts(entries_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO entries_fts(entries_fts, rank) VALUES ('rank', ?)",
+                     (f"bm25({', '.join(map(str, BM25_WEIGHTS))})",))
+        conn.execute("INSERT INTO entries_fts(entries_fts) VALUES ('optimize')")
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+    logger.info("Imported %d UniProt entries from %s into %s", count, source, db_path)
+    return count
+
+def _insert_batch(conn: sqlite3.Connection, batch: List[Dict[str, Any]]) -> int:
+    """Insert parsed entries in one transaction.
+
+    Returns:
+        Number of inserted entries; entries whose accession is already indexed are skipped
+    """
+    inserted = 0
+    with conn:
+        for entry in batch:
+            names = entry["protein_names"] or [entry["entry_name"]]
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (entry["accessions"][0], entry["entry_name"], names[0], " ; ".join(names),
+                 " ".join(entry["gene_names"]), entry["organism"], entry["taxon_id"],
+                 entry["length"], entry["sequence"], entry["function"])
+            )
+            if not cursor.rowcount:
+                continue
+            inserted += 1
+            rowid = cursor.lastrowid
+            conn.executemany("INSERT OR IGNORE INTO secondary_accessions VALUES (?, ?)",
+                             [(accession, rowid) for accession in entry["accessions"][1:]])
+            conn.executemany("INSERT INTO genes VALUES (?, ?)",
+                             [(gene, rowid) for gene in set(entry["gene_names"])])
+    return inserted
+
+def _match_expression(query: str, operator: str) -> Optional[str]:
+    """Build an FTS5 query of the non-filler terms of a query."""
+    terms = [t for t in re.findall(r"[a-z0-9]+(?:-[a-z0-9]+)*", query.lower()) if t not in FILLER_WORDS]
+    if not terms:
+        return None
+    # Quoted terms are phrases, so "il-6" matches the tokens "il" "6" in sequence
+    return f" {operator} ".join(f'"{term}"' for term in terms)
+
+class LocalUniProtIndex:
+    """Read-only searches of an imported UniProt index."""
+
+    COLUMNS = "e.accession, e.protein_name, e.organism, e.gene_names, e.length, e.sequence, e.taxon_id"
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        """Open an index.
+
+        Args:
+            path: Path of the index database built by import_uniprot_dump
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"UniProt index not found: {path}")
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        """Connection of the calling thread, opened read-only once."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        return conn
+
+    @staticmethod
+    def _result(row: Tuple) -> Dict[str, Any]:
+        return {
+            "uniprot_id": row[0],
+            "target_name": row[1],
+            "organism": row[2],
+            "gene_names": row[3],
+            "length": row[4],
+            "sequence": row[5]
+        }
+
+    @staticmethod
+    def _prefer_human(rows: List[Tuple]) -> Optional[Dict[str, Any]]:
+        """Pick the first human entry, or else the first entry."""
+        if not rows:
+            return None
+        human = next((row for row in rows if row[6] == HUMAN_TAXON_ID), rows[0])
+        return LocalUniProtIndex._result(human)
+
+    def get(self, accession: str) -> Optional[Dict[str, Any]]:
+        """Look up an entry by primary or secondary accession."""
+        row = self._conn().execute(
+            f"""SELECT {self.COLUMNS} FROM entries e WHERE e.accession = ?
+                UNION ALL
+                SELECT {self.COLUMNS} FROM secondary_accessions s JOIN entries e ON e.rowid = s.entry
+                WHERE s.accession = ? LIMIT 1""",
+            (accession, accession)
+        ).fetchone()
+        return self._result(row) if row else None
+
+    def exists(self, accession: str) -> bool:
+        """Check whether an accession is in the index."""
+        return self.get(accession) is not None
+
+    def search_gene(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Find an entry by exact gene name or synonym, preferring human entries."""
+        rows = self._conn().execute(
+            f"SELECT {self.COLUMNS} FROM genes g JOIN entries e ON e.rowid = g.entry WHERE g.gene = ? COLLATE NOCASE",
+            (symbol,)
+        ).fetchall()
+        return self._prefer_human(rows)
+
+    def search_text(self, query: str) -> Optional[Dict[str, Any]]:
+        """Full-text search of names and function, preferring human entries.
+
+        All terms must match; if no entry contains all of them, entries
+        matching any term are ranked instead.
+        """
+        for operator in ("AND", "OR"):
+            expression = _match_expression(query, operator)
+            if expression is None:
+                return None
+            rows = self._conn().execute(
+                f"""SELECT {self.COLUMNS} FROM entries_fts JOIN entries e ON e.rowid = entries_fts.rowid
+                    WHERE entries_fts MATCH ? ORDER BY rank LIMIT ?""",
+                (expression, HUMAN_PREFERENCE_WINDOW)
+            ).fetchall()
+            if rows:
+                return self._prefer_human(rows)
+        return None
+
+    def search(self, query: str) -> Optional[Dict[str, Any]]:
+        """Search the index for a protein.
+
+        Args:
+            query: Accession, gene symbol, protein name or description
+
+        Returns:
+            Dictionary containing UniProt ID, name, and organism if found, None otherwise
+        """
+        query = clean_query(query)
+        if ACCESSION_PATTERN.match(query):
+            result = self.get(query)
+            if result:
+                return result
+        if GENE_SYMBOL_PATTERN.match(query):
+            result = self.search_gene(query)
+            if result:
+                return result
+        return self.search_text(query)
+
+_default_index: Optional[LocalUniProtIndex] = None
+
+def uniprot_backend() -> str:
+    """Get the configured UniProt backend from PLUGPEP_UNIPROT_BACKEND."""
+    backend = os.getenv("PLUGPEP_UNIPROT_BACKEND", "auto").lower()
+    if backend not in UNIPROT_BACKENDS:
+        raise ValueError(f"Unsupported UniProt backend: {backend}")
+    return backend
+
+def get_uniprot_index() -> Optional[LocalUniProtIndex]:
+    """Get the process-wide local UniProt index.
+
+    The index path is read from PLUGPEP_UNIPROT_INDEX.
+
+    Returns:
+        The index, or None for the remote backend or when no index exists
+        in auto mode
+
+    Raises:
+        FileNotFoundError: If the local backend is selected and no index exists
+    """
+    global _default_index
+    backend = uniprot_backend()
+    if backend == "remote":
+        return None
+    path = os.getenv("PLUGPEP_UNIPROT_INDEX", DEFAULT_INDEX_PATH)
+    if _default_index is None or _default_index.path != path:
+        if backend == "auto" and not os.path.exists(path):
+            return None
+        _default_index = LocalUniProtIndex(path)
+    return _default_index
+
+def main():
+    """Command line interface for import_uniprot_dump."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Import a Swiss-Prot dump into the offline UniProt index')
+    parser.add_argument('dump', help='UniProtKB flat file (.dat) or TSV (.tsv), optionally compressed')
+    parser.add_argument('--db', default=os.getenv("PLUGPEP_UNIPROT_INDEX", DEFAULT_INDEX_PATH),
+                        help='Path of the index database')
+
+    args = parser.parse_args()
+
+    count = import_uniprot_dump(args.dump, args.db)
+    print(f"Imported {count} entries into {args.db}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
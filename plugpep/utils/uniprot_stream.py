@@ -0,0 +1,225 @@
+"""Bulk retrieval of UniProt sequences and feature annotations.
+
+Records for many accessions are read from the UniProtKB stream endpoint in
+TSV format, or from a local TSV file with the same columns, and parsed line
+by line into compact records of sequence, domains, active sites, binding
+sites and disulfide bonds. Records are written in row groups to a Parquet
+file (requires pyarrow) or to JSON Lines, so neither the response nor the
+output is ever held in memory as a whole.
+
+A local stand-in for the stream endpoint can be downloaded once with e.g.
+    curl "https://rest.uniprot.org/uniprotkb/stream?query=reviewed:true&format=tsv&compressed=true&fields=accession,length,sequence,ft_domain,ft_act_site,ft_binding,ft_disulfid" -o sprot_features.tsv.gz
+"""
+
+import re
+import json
+import logging
+from typing import Dict, Any, Optional, Iterable, Iterator, List
+
+from ..tools.compression import open_structure
+from .uniprot import BASE_URL, get_uniprot_client
+
+logger = logging.getLogger(__name__)
+
+STREAM_URL = f"{BASE_URL}/stream"
+
+STREAM_FIELDS = "accession,length,sequence,ft_domain,ft_act_site,ft_binding,ft_disulfid"
+
+# TSV column headers of the feature fields, mapped to record keys
+FEATURE_COLUMNS = {
+    "Domain [FT]": "domains",
+    "Active site": "active_sites",
+    "Binding site": "binding_sites",
+    "Disulfide bond": "disulfides"
+}
+
+# Accessions per stream request; the query is sent in the URL
+STREAM_BATCH_SIZE = 200
+
+# Records buffered before a row group is written
+ROW_GROUP_SIZE = 1000
+
+# One feature, e.g. DOMAIN 57..167; /note="Ig-like V-type"; /evidence="ECO:0000255"
+FEATURE_PATTERN = re.compile(r'([A-Z_]+) ([<>?]?\d*\??)(?:\.\.([<>?]?\d*\??))?((?:; /\w+="[^"]*")*)')
+# Description of a feature: its note, or the ligand of a binding site
+NOTE_PATTERN = re.compile(r'/(?:note|ligand)="([^"]*)"')
+
+def _position(text: Optional[str]) -> Optional[int]:
+    """Feature position, or None when unknown ("?")."""
+    digits = (text or "").strip("<>?")
+    return int(digits) if digits else None
+
+def parse_features(text: str) -> List[Dict[str, Any]]:
+    """Parse a UniProt TSV feature column.
+
+    Args:
+        text: Column value, e.g. 'DISULFID 30..115; /evidence="ECO:0000255"'
+
+    Returns:
+        List of features with start, end and note. Single-residue features
+        have equal start and end; unknown positions are None.
+    """
+    features = []
+    for match in FEATURE_PATTERN.finditer(text or ""):
+        start = _position(match.group(2))
+        end = _position(match.group(3)) if match.group(3) is not None else start
+        note = NOTE_PATTERN.search(match.group(4))
+        features.append({"start": start, "end": end, "note": note.group(1) if note else ""})
+    return features
+
+def parse_record(row: Dict[str, str]) -> Dict[str, Any]:
+    """Convert a TSV row to a compact annotation record."""
+    sequence = row.get("Sequence", "")
+    record: Dict[str, Any] = {
+        "accession": row["Entry"],
+        "length": int(row["Length"]) if row.get("Length") else len(sequence),
+        "sequence": sequence
+    }
+    for column, key in FEATURE_COLUMNS.items():
+        record[key] = parse_features(row.get(column, ""))
+    return record
+
+def _parse_tsv_lines(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Parse TSV lines incrementally, starting with the header line."""
+    header: Optional[List[str]] = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line:
+            continue
+        if header is None:
+            header = line.split("\t")
+            continue
+        yield parse_record(dict(zip(header, line.split("\t"))))
+
+def _stream_remote(accessions: List[str], batch_size: int) -> Iterator[Dict[str, Any]]:
+    """Stream records from the UniProtKB stream endpoint, one request per batch."""
+    client = get_uniprot_client()
+    for start in range(0, len(accessions), batch_size):
+        batch = accessions[start:start + batch_size]
+        params = {
+            "query": " OR ".join(f"accession:{accession}" for accession in batch),
+            "format": "tsv",
+            "fields": STREAM_FIELDS
+        }
+        with client.session.get(STREAM_URL, params=params, stream=True, timeout=client.timeout) as response:
+            response.raise_for_status()
+            yield from _parse_tsv_lines(response.iter_lines(decode_unicode=True))
+
+def _stream_local(accessions: List[str], source: str) -> Iterator[Dict[str, Any]]:
+    """Stream the records of the requested accessions from a local TSV file."""
+    wanted = set(accessions)
+    with open_structure(source, "r") as f:
+        for record in _parse_tsv_lines(f):
+            if record["accession"] in wanted:
+                yield record
+
+def stream_uniprot_records(
+    accessions: Iterable[str],
+    source: Optional[str] = None,
+    batch_size: int = STREAM_BATCH_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """Stream sequence and feature records for UniProt accessions.
+
+    Args:
+        accessions: UniProt accessions; duplicates are fetched once
+        source: Local TSV file (optionally compressed) to read instead of
+            the UniProt stream endpoint
+        batch_size: Accessions per stream request
+
+    Yields:
+        Records with accession, length, sequence, domains, active_sites,
+        binding_sites and disulfides
+    """
+    accessions = list(dict.fromkeys(accessions))
+    if source is not None:
+        return _stream_local(accessions, source)
+    return _stream_remote(accessions, batch_size)
+
+class _JSONLinesWriter:
+    """Writes records as JSON Lines, compressed according to the file suffix."""
+
+    def __init__(self, path: str):
+        self._file = open_structure(path, "w")
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        self._file.writelines(json.dumps(record) + "\n" for record in records)
+
+    def close(self) -> None:
+        self._file.close()
+
+class _ParquetWriter:
+    """Writes records to a Parquet file, one row group per write."""
+
+    def __init__(self, path: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        feature = pa.list_(pa.struct([("start", pa.int32()), ("end", pa.int32()), ("note", pa.string())]))
+        self._pa = pa
+        self._schema = pa.schema(
+            [("accession", pa.string()), ("length", pa.int32()), ("sequence", pa.string())]
+            + [(key, feature) for key in FEATURE_COLUMNS.values()]
+        )
+        self._writer = pq.ParquetWriter(path, self._schema, compression="zstd")
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        self._writer.write_table(self._pa.Table.from_pylist(records, schema=self._schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+def open_record_writer(path: str):
+    """Open a record writer; Parquet for .parquet paths, otherwise JSON Lines."""
+    if path.endswith(".parquet"):
+        try:
+            return _ParquetWriter(path)
+        except ImportError:
+            raise ImportError("pyarrow is required to write Parquet files; use a .jsonl path instead")
+    return _JSONLinesWriter(path)
+
+def fetch_uniprot_annotations(
+    accessions: Iterable[str],
+    output_path: str,
+    source: Optional[str] = None,
+    batch_size: int = STREAM_BATCH_SIZE
+) -> Dict[str, Any]:
+    """Retrieve sequences and feature annotations of many accessions to a file.
+
+    Args:
+        accessions: UniProt accessions
+        output_path: Output file; .parquet for Parquet (requires pyarrow),
+            otherwise JSON Lines, compressed if the path ends in .gz, .bz2 or .xz
+        source: Local TSV file to read instead of the UniProt stream endpoint
+        batch_size: Accessions per stream request
+
+    Returns:
+        Dictionary containing:
+        - success: bool indicating if retrieval was successful
+        - output_path: Path to the written file
+        - records: Number of records written
+        - missing: Requested accessions without a record
+        - error: error message if retrieval failed
+    """
+    accessions = list(dict.fromkeys(accessions))
+    found = set()
+    try:
+        writer = open_record_writer(output_path)
+        try:
+            buffer: List[Dict[str, Any]] = []
+            for record in stream_uniprot_records(accessions, source=source, batch_size=batch_size):
+                buffer.append(record)
+                found.add(record["accession"])
+                if len(buffer) >= ROW_GROUP_SIZE:
+                    writer.write(buffer)
+                    buffer = []
+            if buffer:
+                writer.write(buffer)
+        finally:
+            writer.close()
+    except Exception as e:
+        logger.error("Error retrieving UniProt annotations: %s", e)
+        return {"success": False, "output_path": output_path, "records": len(found), "missing": [], "error": str(e)}
+
+    missing = [accession for accession in accessions if accession not in found]
+    logger.info("Wrote %d UniProt records to %s (%d missing)", len(found), output_path, len(missing))
+    return {"success": True, "output_path": output_path, "records": len(found), "missing": missing, "error": None}
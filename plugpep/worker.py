@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Workflow Worker Daemon for Protein Binder Design Pipeline
+
+A worker stays resident and runs workflow jobs from the job queue, so each
+run no longer pays interpreter startup, the langchain import, client
+construction and cold caches. Node modules and process-wide clients (LLM,
+UniProt, registry, artifact store and caches) are loaded once at startup
+and shared by all jobs. Up to `concurrency` jobs run at a time, in threads,
+since workflow steps mostly wait on the network.
+
+On SIGTERM or SIGINT the worker stops claiming jobs and exits once the
+running jobs finish. A second signal exits at once; the running jobs are
+put back in the queue and resume from their journal on the next claim.
+
+Usage:
+    plugpep worker [--concurrency N]
+    plugpep submit "design a binder for EGFR"
+
+The worker is configured from environment variables:
+    PLUGPEP_WORKER_CONCURRENCY: jobs run at a time
+    PLUGPEP_QUEUE_PATH: job queue database, see plugpep.job_queue
+    PLUGPEP_WORKFLOW_ROOT: directory for workflow directories
+"""
+
+import os
+import time
+import signal
+import socket
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+from .job_queue import JobQueue
+
+logger = logging.getLogger(__name__)
+
+# Jobs run at a time, overridable with PLUGPEP_WORKER_CONCURRENCY
+DEFAULT_CONCURRENCY = 2
+
+# Seconds between queue polls while idle
+POLL_INTERVAL = 1.0
+
+# Seconds between heartbeats of running jobs; well below STALE_JOB_TIMEOUT
+HEARTBEAT_INTERVAL = 30.0
+
+def warm_up() -> None:
+    """Load the node modules and create the process-wide clients and caches."""
+    # Importing the nodes pays the langchain import once
+    from .nodes import orchestrator_node, llm_node, alphafold_retrieve_node, fpocket_node, extract_backbone_node  # noqa: F401
+    from .registry import get_workflow_registry
+    from .artifact_store import get_artifact_store
+    from .llm_cache import get_llm_cache
+    from .utils.uniprot import get_uniprot_client
+    from .utils.query_cache import get_query_cache
+    from .utils.target_index import get_target_index
+    from .prompts import get_llm
+
+    for factory in (get_workflow_registry, get_artifact_store, get_llm_cache, get_uniprot_client,
+                    get_query_cache, get_target_index, get_llm):
+        try:
+            factory()
+        except Exception as e:
+            logger.warning("Could not initialize %s: %s", factory.__name__, e)
+
+def _new_state(job: Dict[str, Any], workflow_dir: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    """Initial workflow state of a job, as set up by test_workflow_new.py."""
+    from .nodes.utils import initialize_workflow_state
+
+    state = initialize_workflow_state()
+    state.update({
+        "workflow_id": job["workflow_id"],
+        "workflow_dir": workflow_dir,
+        "timestamp": datetime.now().isoformat(),
+        "config": config,
+        "input": {**job["options"], "query": job["query"], "target_name": None},
+        "orchestrator": {
+            "workflow_status": "initialized",
+            "current_step": "llm_planning",
+            "next_step": "alphafold_retrieve",
+            "completed_steps": [],
+            "pending_steps": ["llm_planning", "alphafold_retrieve", "fpocket", "extract_backbone", "llm_report"],
+            "last_error": None
+        }
+    })
+    return state
+
+def run_job(job: Dict[str, Any], config: Dict[str, Any]) -> Tuple[str, Optional[str], str]:
+    """Run the workflow of a job, resuming it from its journal if it was started before.
+
+    Args:
+        job: Claimed job
+        config: AgentConfig dictionary stored in the state
+
+    Returns:
+        Tuple of the job status ("completed" or "failed"), error message and workflow directory
+    """
+    from .agent_graph import create_workflow_directory, save_state
+    from .journal import recover_state
+    from .nodes.orchestrator_node import orchestrate_workflow
+    from .nodes.utils import create_workflow_dirs
+
+    workflow_dir = job.get("workflow_dir") or create_workflow_directory(job["workflow_id"])
+    create_workflow_dirs(workflow_dir)
+
+    state = recover_state(workflow_dir) if job["attempts"] > 1 else None
+    if state is not None and state.get("current_step") is None:
+        logger.info("Workflow %s already finished", job["workflow_id"])
+    else:
+        if state is not None:
+            logger.info("Resuming workflow %s from step %s", job["workflow_id"], state["current_step"])
+        else:
+            state = _new_state(job, workflow_dir, config)
+        state = orchestrate_workflow(state)
+        save_state(state, os.path.join(workflow_dir, "state.json"))
+
+    errors = [info.get("error") for info in (state.get("steps") or {}).values() if info.get("error")]
+    return ("failed", errors[-1], workflow_dir) if errors else ("completed", None, workflow_dir)
+
+class Worker:
+    """Runs queued workflow jobs with a fixed number of concurrent jobs."""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        concurrency: Optional[int] = None,
+        poll_interval: float = POLL_INTERVAL,
+        worker_id: Optional[str] = None
+    ):
+        """Create a worker.
+
+        Args:
+            queue: Job queue to consume
+            concurrency: Jobs run at a time; None reads PLUGPEP_WORKER_CONCURRENCY
+            poll_interval: Seconds between queue polls while idle
+            worker_id: Identifier recorded with claimed jobs; defaults to host and PID
+        """
+        if concurrency is None:
+            concurrency = int(os.getenv("PLUGPEP_WORKER_CONCURRENCY", DEFAULT_CONCURRENCY))
+        self.queue = queue
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._active: Dict[str, Future] = {}
+        # Reentrant, since the signal handler may run while the main thread holds it
+        self._lock = threading.RLock()
+        self._stopping = threading.Event()
+        # Set when a job finishes or the worker is stopped, to end an idle wait early
+        self._wakeup = threading.Event()
+
+    def stop(self) -> None:
+        """Stop claiming jobs; run() returns once the running jobs finish."""
+        if not self._stopping.is_set():
+            logger.info("Worker %s stopping after %d running jobs", self.worker_id, len(self._active))
+        self._stopping.set()
+        self._wakeup.set()
+
+    def requeue_active(self) -> int:
+        """Put the running jobs back in the queue, before exiting without waiting for them."""
+        with self._lock:
+            job_ids = list(self._active)
+        for job_id in job_ids:
+            self.queue.finish(job_id, "queued")
+        return len(job_ids)
+
+    def _execute(self, job: Dict[str, Any], config: Dict[str, Any]) -> None:
+        logger.info("Running job %s: %s", job["job_id"], job["query"][:80])
+        try:
+            status, error, workflow_dir = run_job(job, config)
+        except Exception as e:
+            logger.exception("Job %s failed", job["job_id"])
+            status, error, workflow_dir = "failed", str(e), job.get("workflow_dir")
+        self.queue.finish(job["job_id"], status, error=error, workflow_dir=workflow_dir)
+        logger.info("Job %s %s", job["job_id"], status)
+
+    def _job_done(self, job_id: str) -> None:
+        with self._lock:
+            self._active.pop(job_id, None)
+        self._wakeup.set()
+
+    def run(self, config: Optional[Dict[str, Any]] = None) -> None:
+        """Claim and run jobs until stop() is called.
+
+        Args:
+            config: AgentConfig dictionary stored in each workflow's state
+        """
+        config = config or {}
+        self.queue.requeue_stale()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="plugpep-job")
+        last_heartbeat = 0.0
+        logger.info("Worker %s running up to %d jobs", self.worker_id, self.concurrency)
+        try:
+            while True:
+                self._wakeup.clear()
+                now = time.monotonic()
+                if now - last_heartbeat >= HEARTBEAT_INTERVAL:
+                    with self._lock:
+                        job_ids = list(self._active)
+                    self.queue.heartbeat(job_ids)
+                    # Also reclaim jobs of workers that died
+                    self.queue.requeue_stale()
+                    last_heartbeat = now
+
+                with self._lock:
+                    n_active = len(self._active)
+                if self._stopping.is_set():
+                    if n_active == 0:
+                        break
+                elif n_active < self.concurrency:
+                    job = self.queue.claim(self.worker_id)
+                    if job is not None:
+                        with self._lock:
+                            future = executor.submit(self._execute, job, config)
+                            self._active[job["job_id"]] = future
+                        future.add_done_callback(lambda _, job_id=job["job_id"]: self._job_done(job_id))
+                        continue
+
+                self._wakeup.wait(min(self.poll_interval, HEARTBEAT_INTERVAL))
+        finally:
+            executor.shutdown(wait=True)
+        logger.info("Worker %s stopped", self.worker_id)
+
+def serve(queue: JobQueue, concurrency: Optional[int] = None, config: Optional[Dict[str, Any]] = None) -> None:
+    """Run a worker in the foreground until SIGTERM or SIGINT.
+
+    Args:
+        queue: Job queue to consume
+        concurrency: Jobs run at a time; None reads PLUGPEP_WORKER_CONCURRENCY
+        config: AgentConfig dictionary stored in each workflow's state
+    """
+    worker = Worker(queue, concurrency=concurrency)
+
+    def handle_signal(signum, frame):
+        if worker._stopping.is_set():
+            requeued = worker.requeue_active()
+            logger.warning("Exiting immediately; requeued %d running jobs", requeued)
+            os._exit(128 + signum)
+        worker.stop()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    warm_up()
+    worker.run(config=config)
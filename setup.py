@@ -11,12 +11,18 @@ setup(
     name="plugpep",
     version="0.1.0",
     packages=find_packages(),
+    package_data={
+        "plugpep": ["prompts/*.txt", "prompts/*.json", "utils/*.json"]
+    },
     author="Foad Nazari",
     author_email="foadnazari@gmail.com",
     description="A protein binder design pipeline using LLM planning and structure prediction",
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/foadnazari/plug-pep",
+    entry_points={
+        "console_scripts": ["plugpep=plugpep.cli:main"]
+    },
     install_requires=[
         "langchain>=0.1.5",
         "langchain-core>=0.1.5",
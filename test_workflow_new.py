@@ -8,14 +8,13 @@ Usage:
 
 import os
 import sys
-import json
 import uuid
 import argparse
 from datetime import datetime
 from pathlib import Path
 from typing import cast
 from plugpep import AgentConfig
-from plugpep.agent_graph import AgentState
+from plugpep.agent_graph import AgentState, save_state
 from plugpep.nodes.orchestrator_node import agent_orchestrator
 from plugpep.nodes.utils import initialize_workflow_state, create_workflow_dirs
 
@@ -25,7 +24,7 @@ def test_full_workflow(query: str):
 
     # Create a unique workflow ID
     workflow_id = f"test_workflow_{uuid.uuid4().hex[:8]}"
-    workflow_dir = os.path.join(current_dir, workflow_id)
+    workflow_dir = os.path.join(os.getenv("PLUGPEP_WORKFLOW_ROOT", current_dir), workflow_id)
 
     # Create configuration with absolute paths
     config = AgentConfig(
@@ -55,7 +54,7 @@ def test_full_workflow(query: str):
             "current_step": "llm_planning",  # Start with LLM planning
             "next_step": "alphafold_retrieve",
             "completed_steps": [],
-            "pending_steps": ["llm_planning", "alphafold_retrieve", "extract_backbone", "llm_report"],
+            "pending_steps": ["llm_planning", "alphafold_retrieve", "fpocket", "extract_backbone", "llm_report"],
             "last_error": None
         }
     })
@@ -69,8 +68,7 @@ def test_full_workflow(query: str):
 
         # Save initial state
         state_file_path = os.path.join(workflow_dir, "state.json")
-        with open(state_file_path, "w") as f:
-            json.dump(state, f, indent=2)
+        save_state(cast(AgentState, state), state_file_path)
 
         print(f"Initial state saved to: {state_file_path}")
 
@@ -80,8 +78,7 @@ def test_full_workflow(query: str):
         agent_state = agent_orchestrator(cast(AgentState, state))
 
         # Save final state
-        with open(state_file_path, "w") as f:
-            json.dump(agent_state, f, indent=2)
+        save_state(agent_state, state_file_path)
 
         print(f"Final state saved to: {state_file_path}")
 